@@ -8,7 +8,6 @@ import time
 from datetime import datetime, timedelta
 import pytz
 import ccxt
-import pandas_ta as ta
 from telegram import Bot
 import telegram
 import logging
@@ -19,6 +18,20 @@ from flask import Flask, render_template, jsonify, request, redirect, url_for, s
 import atexit
 import asyncio
 from dotenv import load_dotenv
+from indicators import IndicatorEngine, batch_indicators
+from feeds import TradeBarFeed, WebSocketFeed
+from trade_bars import TradeBarBuilder, parse_bar_spec
+from candle_store import CandleStore
+from db_pool import ReadPool, connect_writer, discard_wal, remove_database, snapshot
+from migrations import SCHEMA_VERSION, migrate
+from telemetry import INSERT_TELEMETRY_SQL, SIGNAL_COLUMNS, telemetry_row
+from fetcher import AsyncOhlcvFetcher
+from markets import MarketCache
+from ledger import AccountLedger
+from scheduler import RequestScheduler, ScheduledExchange
+from signal_writer import SignalWriter
+from resilience import CircuitOpenError, backoff_delay, breaker_status, get_breaker, retry_call
+from candles import BarAggregator, CandleBuffer, CandleCache, TIMEFRAME_SECONDS, batch_views, closed_candles, load_state, ohlcv_panel, save_state, timeframe_ms
 
 pd.set_option('future.no_silent_downcasting', True)
 
@@ -77,6 +90,28 @@ GITHUB_PATH = os.getenv("GITHUB_PATH", "rnn_bot.db")
 BINANCE_API_KEY = os.getenv("BINANCE_API_KEY", "BINANCE_API_KEY")
 BINANCE_API_SECRET = os.getenv("BINANCE_API_SECRET", "BINANCE_API_SECRET")
 AMOUNTS = float(os.getenv("AMOUNTS", "AMOUNTS"))
+WINDOW_BARS = int(os.getenv("WINDOW_BARS", 100))
+CANDLE_GRACE_SECONDS = float(os.getenv("CANDLE_GRACE_SECONDS", 10))
+STATE_PATH = os.getenv("STATE_PATH", "indicator_state.pkl")
+# Store candle windows as float32 (see candles.py for the tolerance)
+COMPACT_FLOAT32 = os.getenv("COMPACT_FLOAT32", "false").lower() in ("1", "true", "yes")
+CANDLE_DTYPE = np.float32 if COMPACT_FLOAT32 else np.float64
+# "rest" polls fetch_ohlcv each bar; "websocket" waits for candles pushed by a kline stream
+MARKET_FEED = os.getenv("MARKET_FEED", "rest")
+FEED_URL = os.getenv("FEED_URL", "")  # defaults to Binance; ws://127.0.0.1:8765/ws for feeds.py replay
+FEED_HISTORY_URL = os.getenv("FEED_HISTORY_URL", "")  # /klines endpoint for the warmup, e.g. the replay server's
+# Symbols scanned concurrently on every TIMEFRAME bar (signals only, no orders)
+SCAN_SYMBOLS = [s.strip() for s in os.getenv("SCAN_SYMBOLS", "").split(",") if s.strip()]
+# Extra timeframes (e.g. "5m,15m,1h") paper-traded in this process from one 1m feed
+EXTRA_TIMEFRAMES = [tf.strip() for tf in os.getenv("EXTRA_TIMEFRAMES", "").split(",") if tf.strip()]
+# Bars built from the trade stream (e.g. "volume:100,dollar:5000000,tick:1000"), paper-traded like EXTRA_TIMEFRAMES
+TRADE_BARS = [spec.strip() for spec in os.getenv("TRADE_BARS", "").split(",") if spec.strip()]
+TRADE_FEED_URL = os.getenv("TRADE_FEED_URL", "")  # defaults to Binance's aggTrade stream
+# Seconds between intrabar stop-loss/take-profit checks of an open position; 0 checks only on candle close
+INTRABAR_MONITOR_SECONDS = float(os.getenv("INTRABAR_MONITOR_SECONDS", 2))
+# Hold bars go to the telemetry table: keep every Nth bar (0 disables), and N days of it (0 keeps all)
+TELEMETRY_SAMPLE_EVERY = int(os.getenv("TELEMETRY_SAMPLE_EVERY", 1))
+TELEMETRY_RETENTION_DAYS = float(os.getenv("TELEMETRY_RETENTION_DAYS", 30))
 
 """
 this bot is still now on DOGE trade
@@ -99,6 +134,8 @@ HEADERS = {
 
 # Database path
 db_path = 'rnn_bot.db'
+# Local OHLCV store; fetches only ask the exchange for candles not stored yet
+candle_store = CandleStore(os.getenv("CANDLE_DB_PATH", "candles.db"))
 
 # Timezone setup
 EU_TZ = pytz.utc
@@ -107,15 +144,27 @@ EU_TZ = pytz.utc
 bot_thread = None
 bot_active = True
 bot_lock = threading.Lock()
-db_lock = threading.Lock()
+# Guards the writer connection `conn`; reentrant since a failing write reinitializes the database
+db_lock = threading.RLock()
 conn = None
-exchange = ccxt.binance({
+# Read-only connections for the routes and reports; the database runs in WAL mode so they never wait on a write
+read_pool = ReadPool(db_path, size=int(os.getenv("DB_READ_POOL_SIZE", 4)))
+# Every exchange request is admitted by one scheduler sharing the request weight budget
+request_scheduler = RequestScheduler(weight_per_minute=int(os.getenv("EXCHANGE_WEIGHT_PER_MINUTE", 4800)))
+exchange = ScheduledExchange(ccxt.binance({
     'apiKey': BINANCE_API_KEY,
     'secret': BINANCE_API_SECRET,
-    'enableRateLimit': True,
-})
+    'enableRateLimit': False,
+}), request_scheduler)
+# Step sizes and order limits per symbol, reloaded every MARKETS_TTL_SECONDS
+market_cache = MarketCache(exchange, ttl=float(os.getenv("MARKETS_TTL_SECONDS", 3600)))
+# Free balances kept from order fills, reconciled with the exchange every LEDGER_RECONCILE_SECONDS
+account_ledger = AccountLedger(exchange, reconcile_seconds=float(os.getenv("LEDGER_RECONCILE_SECONDS", 300)))
 position = None
 buy_price = None
+# Market feed and candle window of the trading loop, shared with the intrabar monitor
+market_feed = None
+live_candles = None
 total_profit = 0
 pause_duration = 0
 pause_start = None
@@ -128,6 +177,15 @@ start_time = datetime.now(EU_TZ)
 stop_time = None
 last_valid_price = None
 
+# GitHub API request behind the github circuit breaker; 5xx responses count as failures
+def github_request(method, **kwargs):
+    def send():
+        response = requests.request(method, GITHUB_API_URL, headers=HEADERS, timeout=15, **kwargs)
+        if response.status_code >= 500:
+            response.raise_for_status()
+        return response
+    return retry_call(send, attempts=2, breaker=get_breaker("github"), retry_on=(requests.RequestException,))
+
 # GitHub database functions
 def upload_to_github(file_path, file_name):
     try:
@@ -141,9 +199,14 @@ def upload_to_github(file_path, file_name):
             logger.error("GITHUB_PATH is not set.")
             return
         logger.debug(f"Uploading {file_name} to GitHub: {GITHUB_REPO}/{GITHUB_PATH}")
-        with open(file_path, "rb") as f:
-            content = base64.b64encode(f.read()).decode("utf-8")
-        response = requests.get(GITHUB_API_URL, headers=HEADERS)
+        if file_path == db_path:
+            # Not the file itself: committed rows may still be in the write-ahead log only
+            data = snapshot(db_path)
+        else:
+            with open(file_path, "rb") as f:
+                data = f.read()
+        content = base64.b64encode(data).decode("utf-8")
+        response = github_request("GET")
         sha = None
         if response.status_code == 200:
             sha = response.json().get("sha")
@@ -157,11 +220,13 @@ def upload_to_github(file_path, file_name):
         }
         if sha:
             payload["sha"] = sha
-        response = requests.put(GITHUB_API_URL, headers=HEADERS, json=payload)
+        response = github_request("PUT", json=payload)
         if response.status_code in [200, 201]:
             logger.info(f"Successfully uploaded {file_name} to GitHub")
         else:
             logger.error(f"Failed to upload {file_name} to GitHub: {response.status_code} - {response.text}")
+    except CircuitOpenError as e:
+        logger.warning(f"Skipping upload of {file_name}: {e}")
     except Exception as e:
         logger.error(f"Error uploading {file_name} to GitHub: {e}", exc_info=True)
 
@@ -177,7 +242,7 @@ def download_from_github(file_name, destination_path):
             logger.error("GITHUB_PATH is not set.")
             return False
         logger.debug(f"Downloading {file_name} from GitHub: {GITHUB_REPO}/{GITHUB_PATH}")
-        response = requests.get(GITHUB_API_URL, headers=HEADERS)
+        response = github_request("GET")
         if response.status_code == 404:
             logger.info(f"No {file_name} found in GitHub repository. Starting with a new database.")
             return False
@@ -208,17 +273,35 @@ def keep_alive():
 def periodic_db_backup():
     while True:
         try:
-            with db_lock:
-                if os.path.exists(db_path) and conn is not None:
-                    logger.info("Performing periodic database backup to GitHub")
-                    upload_to_github(db_path, 'rnn_bot.db')
-                else:
-                    logger.warning("Database file or connection not available for periodic backup")
+            # Queued signals go into this backup too
+            signal_writer.flush()
+            prune_telemetry()
+            if os.path.exists(db_path) and conn is not None:
+                logger.info("Performing periodic database backup to GitHub")
+                upload_to_github(db_path, 'rnn_bot.db')
+            else:
+                logger.warning("Database file or connection not available for periodic backup")
             time.sleep(300)
         except Exception as e:
             logger.error(f"Error during periodic database backup: {e}")
             time.sleep(60)
 
+# Periodic reconciliation of the local balance ledger with the exchange
+def ledger_reconciler():
+    while True:
+        try:
+            if account_ledger.due():
+                account_ledger.reconcile()
+            time.sleep(30)
+        except Exception as e:
+            logger.error(f"Error reconciling account ledger: {e}")
+            time.sleep(60)
+
+# Jittered backoff between the attempts of a database operation, none after the last one
+def db_retry_pause(attempt, attempts=3):
+    if attempt < attempts - 1:
+        time.sleep(backoff_delay(attempt, base_delay=1.0, max_delay=8.0))
+
 # SQLite database setup
 def setup_database(first_attempt=False):
     global conn
@@ -228,7 +311,7 @@ def setup_database(first_attempt=False):
                 logger.info(f"Database setup attempt {attempt + 1}/3")
                 if not os.path.exists(db_path):
                     logger.info(f"Database file {db_path} does not exist. Creating new database.")
-                    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+                    conn = connect_writer(db_path)
                     logger.info(f"Created new database file at {db_path}")
                 else:
                     try:
@@ -239,14 +322,21 @@ def setup_database(first_attempt=False):
                         test_conn.close()
                     except sqlite3.DatabaseError as e:
                         logger.error(f"Existing database at {db_path} is corrupted: {e}")
-                        os.remove(db_path)
+                        remove_database(db_path)
+                        read_pool.invalidate()
                         logger.info(f"Removed corrupted database file at {db_path}")
-                        conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+                        conn = connect_writer(db_path)
                         logger.info(f"Created new database file at {db_path} after corruption")
 
                 if not first_attempt:
                     logger.info(f"Attempting to download database from GitHub: {GITHUB_API_URL}")
+                    # The download replaces the database file; no connection may keep the old one
+                    if conn is not None:
+                        conn.close()
+                        conn = None
+                    read_pool.invalidate()
                     if download_from_github('rnn_bot.db', db_path):
+                        discard_wal(db_path)
                         logger.info(f"Downloaded database from GitHub to {db_path}")
                         try:
                             test_conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
@@ -257,187 +347,45 @@ def setup_database(first_attempt=False):
                             test_conn.close()
                         except sqlite3.DatabaseError as e:
                             logger.error(f"Downloaded database is corrupted: {e}")
-                            os.remove(db_path)
+                            remove_database(db_path)
                             logger.info(f"Removed invalid downloaded database file at {db_path}")
-                            conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+                            conn = connect_writer(db_path)
                             logger.info(f"Created new database file at {db_path} after failed download")
 
                 if conn is None:
-                    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+                    conn = connect_writer(db_path)
                 logger.info(f"Connected to database at {db_path}")
 
-                c = conn.cursor()
-                c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='trades';")
-                if not c.fetchone():
-                    logger.info("Trades table does not exist. Creating new trades table.")
-                    c.execute('''
-                        CREATE TABLE trades (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            time TEXT,
-                            action TEXT,
-                            symbol TEXT,
-                            price REAL,
-                            open_price REAL,
-                            close_price REAL,
-                            volume REAL,
-                            percent_change REAL,
-                            stop_loss REAL,
-                            take_profit REAL,
-                            profit REAL,
-                            total_profit REAL,
-                            return_profit REAL,
-                            total_return_profit REAL,
-                            ema1 REAL,
-                            ema2 REAL,
-                            rsi REAL,
-                            k REAL,
-                            d REAL,
-                            j REAL,
-                            diff REAL,
-                            diff1e REAL,
-                            diff2m REAL,
-                            diff3k REAL,
-                            macd REAL,
-                            macd_signal REAL,
-                            macd_hist REAL,
-                            macd_hollow REAL,
-                            lst_diff REAL,
-                            supertrend REAL,
-                            supertrend_trend TEXT,
-                            stoch_rsi REAL,
-                            stoch_k REAL,
-                            stoch_d REAL,
-                            obv REAL,
-                            message TEXT,
-                            timeframe TEXT,
-                            order_id TEXT,
-                            strategy TEXT
-                        )
-                    ''')
-                    c.execute("CREATE INDEX IF NOT EXISTS idx_trades_time ON trades(time)")
-                    logger.info("Created new trades table and index")
-                    conn.commit()
-
-                c.execute("PRAGMA table_info(trades);")
-                existing_columns = {col[1] for col in c.fetchall()}
-                required_columns = {
-                    'time': 'TEXT',
-                    'action': 'TEXT',
-                    'symbol': 'TEXT',
-                    'price': 'REAL',
-                    'open_price': 'REAL',
-                    'close_price': 'REAL',
-                    'volume': 'REAL',
-                    'percent_change': 'REAL',
-                    'stop_loss': 'REAL',
-                    'take_profit': 'REAL',
-                    'profit': 'REAL',
-                    'total_profit': 'REAL',
-                    'return_profit': 'REAL',
-                    'total_return_profit': 'REAL',
-                    'ema1': 'REAL',
-                    'ema2': 'REAL',
-                    'rsi': 'REAL',
-                    'k': 'REAL',
-                    'd': 'REAL',
-                    'j': 'REAL',
-                    'diff': 'REAL',
-                    'diff1e': 'REAL',
-                    'diff2m': 'REAL',
-                    'diff3k': 'REAL',
-                    'macd': 'REAL',
-                    'macd_signal': 'REAL',
-                    'macd_hist': 'REAL',
-                    'macd_hollow': 'REAL',
-                    'lst_diff': 'REAL',
-                    'supertrend': 'REAL',
-                    'supertrend_trend': 'TEXT',
-                    'stoch_rsi': 'REAL',
-                    'stoch_k': 'REAL',
-                    'stoch_d': 'REAL',
-                    'obv': 'REAL',
-                    'message': 'TEXT',
-                    'timeframe': 'TEXT',
-                    'order_id': 'TEXT',
-                    'strategy': 'TEXT'
-                }
-
-                for col, col_type in required_columns.items():
-                    if col not in existing_columns:
-                        logger.info(f"Column {col} missing in trades table. Adding column with type {col_type}.")
-                        c.execute(f"ALTER TABLE trades ADD COLUMN {col} {col_type};")
-                        conn.commit()
-                        logger.info(f"Added column {col} to trades table")
-
-                logger.info(f"Database initialized successfully at {db_path}, size: {os.path.getsize(db_path)} bytes")
-                upload_to_github(db_path, 'rnn_bot.db')
+                # A single user_version read when the schema is current
+                version = migrate(conn)
+                logger.info(f"Database initialized successfully at {db_path}, schema version {SCHEMA_VERSION}, size: {os.path.getsize(db_path)} bytes")
+                if version != SCHEMA_VERSION:
+                    upload_to_github(db_path, 'rnn_bot.db')
                 return True
             except sqlite3.Error as e:
                 logger.error(f"SQLite error during database setup (attempt {attempt + 1}/3): {e}", exc_info=True)
                 if conn:
                     conn.close()
                     conn = None
-                time.sleep(2)
+                db_retry_pause(attempt)
             except Exception as e:
                 logger.error(f"Unexpected error during database setup (attempt {attempt + 1}/3): {e}", exc_info=True)
                 if conn:
                     conn.close()
                     conn = None
-                time.sleep(2)
+                db_retry_pause(attempt)
 
         logger.error("Failed to initialize database after 3 attempts. Forcing creation of new database.")
         try:
+            if conn is not None:
+                conn.close()
+                conn = None
+            read_pool.invalidate()
             if os.path.exists(db_path):
-                os.remove(db_path)
+                remove_database(db_path)
                 logger.info(f"Removed existing database file at {db_path} to force new creation")
-            conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
-            c = conn.cursor()
-            c.execute('''
-                CREATE TABLE trades (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    time TEXT,
-                    action TEXT,
-                    symbol TEXT,
-                    price REAL,
-                    open_price REAL,
-                    close_price REAL,
-                    volume REAL,
-                    percent_change REAL,
-                    stop_loss REAL,
-                    take_profit REAL,
-                    profit REAL,
-                    total_profit REAL,
-                    return_profit REAL,
-                    total_return_profit REAL,
-                    ema1 REAL,
-                    ema2 REAL,
-                    rsi REAL,
-                    k REAL,
-                    d REAL,
-                    j REAL,
-                    diff REAL,
-                    diff1e REAL,
-                    diff2m REAL,
-                    diff3k REAL,
-                    macd REAL,
-                    macd_signal REAL,
-                    macd_hist REAL,
-                    macd_hollow REAL,
-                    lst_diff REAL,
-                    supertrend REAL,
-                    supertrend_trend TEXT,
-                    stoch_rsi REAL,
-                    stoch_k REAL,
-                    stoch_d REAL,
-                    obv REAL,
-                    message TEXT,
-                    timeframe TEXT,
-                    order_id TEXT,
-                    strategy TEXT
-                )
-            ''')
-            c.execute("CREATE INDEX IF NOT EXISTS idx_trades_time ON trades(time)")
-            conn.commit()
+            conn = connect_writer(db_path)
+            migrate(conn)
             logger.info(f"Forced creation of new database and trades table at {db_path}")
             upload_to_github(db_path, 'rnn_bot.db')
             return True
@@ -456,171 +404,147 @@ if not setup_database(first_attempt=True):
         logger.critical("Failed to force create new database. Flask routes may fail.")
 
 # Fetch price data
-def get_simulated_price(symbol=SYMBOL, exchange=exchange, timeframe=TIMEFRAME, retries=3, delay=5):
+def get_simulated_price(symbol=SYMBOL, exchange=exchange, timeframe=TIMEFRAME, retries=3):
     global last_valid_price
-    for attempt in range(retries):
-        try:
-            ohlcv = exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=5)
-            if not ohlcv:
-                logger.warning(f"No data returned for {symbol}. Retrying...")
-                time.sleep(delay)
-                continue
-            data = pd.DataFrame(ohlcv, columns=['timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
-            data['timestamp'] = pd.to_datetime(data['timestamp'], unit='ms').dt.tz_localize('UTC').dt.tz_convert(EU_TZ)
-            data['diff'] = data['Close'] - data['Open']
-            non_zero_diff = data[abs(data['diff']) > 0]
-            selected_data = non_zero_diff.iloc[-1] if not non_zero_diff.empty else data.iloc[-1]
-            if abs(selected_data['diff']) < 0.00:
-                logger.warning(f"Open and Close similar for {symbol} (diff={selected_data['diff']}). Accepting data.")
-            last_valid_price = selected_data
-            logger.debug(f"Fetched price data: {selected_data.to_dict()}")
-            return selected_data
-        except Exception as e:
-            logger.error(f"Error fetching price (attempt {attempt + 1}/{retries}): {e}")
-            if attempt < retries - 1:
-                time.sleep(delay)
-    logger.error(f"Failed to fetch price for {symbol} after {retries} attempts.")
+
+    def fetch_closed():
+        closed = candle_store.fetch(exchange, symbol, timeframe, limit=5)
+        if not closed:
+            raise ValueError(f"No closed {timeframe} candle for {symbol}")
+        return closed
+
+    # Retries stop before the next bar so a failing fetch never delays it
+    deadline = time.time() + get_next_timeframe_boundary(datetime.now(EU_TZ), TIMEFRAME_SECONDS.get(timeframe, TIMEFRAMES))
+    try:
+        closed = retry_call(fetch_closed, attempts=retries, deadline=deadline)
+        data = pd.DataFrame(closed, columns=['timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
+        data['candle_ts'] = data['timestamp']
+        data['timestamp'] = pd.to_datetime(data['timestamp'], unit='ms').dt.tz_localize('UTC').dt.tz_convert(EU_TZ)
+        data['diff'] = data['Close'] - data['Open']
+        selected_data = data.iloc[-1]
+        if abs(selected_data['diff']) < 0.00:
+            logger.warning(f"Open and Close similar for {symbol} (diff={selected_data['diff']}). Accepting data.")
+        last_valid_price = selected_data
+        logger.debug(f"Fetched price data: {selected_data.to_dict()}")
+        return selected_data
+    except Exception as e:
+        logger.error(f"Failed to fetch price for {symbol}: {e}")
     if last_valid_price is not None:
         logger.info("Using last valid price data as fallback.")
         return last_valid_price
-    return pd.Series({'Open': np.nan, 'Close': np.nan, 'High': np.nan, 'Low': np.nan, 'Volume': np.nan, 'diff': np.nan})
+    return pd.Series({'Open': np.nan, 'Close': np.nan, 'High': np.nan, 'Low': np.nan, 'Volume': np.nan, 'diff': np.nan, 'candle_ts': np.nan})
 
-# Calculate technical indicators
-def add_technical_indicators(df):
+# Next closed candle pushed by the market feed, in the same shape as get_simulated_price()
+def get_feed_price(feed, timeout):
+    global last_valid_price
+    candle = feed.next_closed(timeout=timeout)
+    if candle is None:
+        logger.warning(f"No closed candle from the {MARKET_FEED} feed within {timeout:.0f}s, polling REST")
+        return get_simulated_price()
+    candle_store.add(SYMBOL, TIMEFRAME, [candle])
+    selected_data = candle_data(candle)
+    last_valid_price = selected_data
+    logger.debug(f"Feed candle {candle[0]} received {time.time() * 1000 - candle[0] - timeframe_ms(TIMEFRAME, TIMEFRAMES):.0f}ms after close")
+    return selected_data
+
+# One closed ccxt candle in the shape get_simulated_price() returns
+def candle_data(candle):
+    candle_ts, open_, high, low, close, volume = candle
+    return pd.Series({
+        'timestamp': pd.to_datetime(candle_ts, unit='ms').tz_localize('UTC').tz_convert(EU_TZ),
+        'Open': open_,
+        'High': high,
+        'Low': low,
+        'Close': close,
+        'Volume': volume,
+        'candle_ts': candle_ts,
+        'diff': close - open_,
+    })
+
+# Calculate technical indicators for many symbols in one pass
+def add_technical_indicators_batch(ohlcv_by_symbol):
+    """Takes {symbol: fetch_ohlcv rows}; returns {symbol: CandleView} for ai_decision."""
     start_time = time.time()
     try:
-        df = df.copy()
-        df['Close'] = df['Close'].ffill()
-        df['High'] = df['High'].ffill()
-        df['Low'] = df['Low'].ffill()
-        df['Volume'] = df['Volume'].ffill()
-
-        df['ema1'] = ta.ema(df['Close'], length=12)
-        df['ema2'] = ta.ema(df['Close'], length=26)
-        df['rsi'] = ta.rsi(df['Close'], length=14)
-        kdj = ta.kdj(df['High'], df['Low'], df['Close'], length=9, signal=3)
-        df['k'] = kdj['K_9_3']
-        df['d'] = kdj['D_9_3']
-        df['j'] = kdj['J_9_3']
-        macd = ta.macd(df['Close'], fast=12, slow=26, signal=9)
-        df['macd'] = macd['MACD_12_26_9']
-        df['macd_signal'] = macd['MACDs_12_26_9']
-        df['macd_hist'] = macd['MACDh_12_26_9']
-        df['diff'] = df['Close'] - df['Open']
-        df['diff1e'] = df['ema1'] - df['ema2']
-        df['diff2m'] = df['macd'] - df['macd_signal']
-        df['diff3k'] = df['j'] - df['d']
-        df['lst_diff'] = df['ema1'].shift(1) - df['ema1']
-        
-        df['macd_hollow'] = 0.0
-        # Long grow + Short grow (confirmed growth, keep positive)
-        df.loc[(df['macd_hist'] > 0) &
-        (df['macd_hist'] > df['macd_hist'].shift(1)), 'macd_hollow'] = df['macd_hist']
-        # Long fall + Short fall (confirmed fall, keep negative)
-        df.loc[(df['macd_hist'] < 0) &
-        (df['macd_hist'] < df['macd_hist'].shift(1)), 'macd_hollow'] = df['macd_hist']
-
-        st_length = 10
-        st_multiplier = 3.0
-        high_low = df['High'] - df['Low']
-        high_close_prev = (df['High'] - df['Close'].shift()).abs()
-        low_close_prev = (df['Low'] - df['Close'].shift()).abs()
-        tr = pd.concat([high_low, high_close_prev, low_close_prev], axis=1).max(axis=1)
-        atr = tr.rolling(st_length, min_periods=1).mean()
-        hl2 = (df['High'] + df['Low']) / 2
-        basic_upperband = hl2 + (st_multiplier * atr)
-        basic_lowerband = hl2 - (st_multiplier * atr)
-        final_upperband = basic_upperband.copy()
-        final_lowerband = basic_lowerband.copy()
-
-        for i in range(1, len(df)):
-            if (basic_upperband.iloc[i] < final_upperband.iloc[i-1]) or (df['Close'].iloc[i-1] > final_upperband.iloc[i-1]):
-                final_upperband.iloc[i] = basic_upperband.iloc[i]
-            else:
-                final_upperband.iloc[i] = final_upperband.iloc[i-1]
-            if (basic_lowerband.iloc[i] > final_lowerband.iloc[i-1]) or (df['Close'].iloc[i-1] < final_lowerband.iloc[i-1]):
-                final_lowerband.iloc[i] = basic_lowerband.iloc[i]
-            else:
-                final_lowerband.iloc[i] = final_lowerband.iloc[i-1]
-
-        supertrend = final_upperband.where(df['Close'] <= final_upperband, final_lowerband)
-        supertrend_trend = df['Close'] > final_upperband.shift()
-        supertrend_trend = supertrend_trend.fillna(True)
-        df['supertrend'] = supertrend
-        df['supertrend_trend'] = np.where(supertrend_trend, 'Up', 'Down')
-        df['supertrend_signal'] = np.where(
-            supertrend_trend & ~supertrend_trend.shift().fillna(True), 'buy',
-            np.where(~supertrend_trend & supertrend_trend.shift().fillna(True), 'sell', None)
-        )
-
-        stoch_rsi_len = 14
-        stoch_k_len = 3
-        stoch_d_len = 3
-        rsi = df['rsi'].ffill()
-        rsi_min = rsi.rolling(stoch_rsi_len, min_periods=1).min()
-        rsi_max = rsi.rolling(stoch_rsi_len, min_periods=1).max()
-        stochrsi = (rsi - rsi_min) / (rsi_max - rsi_min + 1e-12)
-        df['stoch_rsi'] = stochrsi
-        df['stoch_k'] = stochrsi.rolling(stoch_k_len, min_periods=1).mean() * 100
-        df['stoch_d'] = df['stoch_k'].rolling(stoch_d_len, min_periods=1).mean()
-
-        close_diff = df['Close'].diff().fillna(0)
-        direction = np.sign(close_diff)
-        df['obv'] = (direction * df['Volume']).fillna(0).cumsum()
-
+        panel = ohlcv_panel(ohlcv_by_symbol)
+        views = batch_views(panel, batch_indicators(panel), dtype=CANDLE_DTYPE)
         elapsed = time.time() - start_time
-        logger.debug(f"Technical indicators calculated in {elapsed:.3f}s: {df.iloc[-1][['ema1', 'ema2', 'rsi', 'k', 'd', 'j', 'macd', 'macd_signal', 'macd_hist', 'diff', 'diff1e', 'diff2m', 'diff3k', 'macd_hollow', 'lst_diff', 'supertrend', 'supertrend_trend', 'stoch_rsi', 'stoch_k', 'stoch_d', 'obv']].to_dict()}")
-        return df
+        logger.debug(f"Technical indicators calculated for {len(views)} symbols x {len(panel['Close'])} bars in {elapsed:.3f}s")
+        return views
     except Exception as e:
         elapsed = time.time() - start_time
-        logger.error(f"Error calculating indicators after {elapsed:.3f}s: {e}")
-        return df
+        logger.error(f"Error calculating batch indicators after {elapsed:.3f}s: {e}")
+        return {}
+
+# Feed closed candles through the window's engine, as if each had been processed live
+def replay_candles(candles, ohlcv):
+    for candle_ts, open_, high, low, close, volume in ohlcv:
+        high = close if high is None else high
+        low = close if low is None else low
+        indicators = candles.engine.update(open_, high, low, close, volume)
+        candles.append(candle_ts, {'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume, **indicators})
+
+# Closed candles between the window's last bar and candle_ts that the loop never received
+def missed_candles(candles, candle_ts, symbol=SYMBOL, exchange=exchange, timeframe=TIMEFRAME):
+    tf_millis = timeframe_ms(timeframe, TIMEFRAMES)
+    last = candles.last_timestamp()
+    if last is None or candle_ts <= last + tf_millis:
+        return []
+    candle_store.backfill(exchange, symbol, timeframe, last + tf_millis)
+    missing = candle_store.load(symbol, timeframe, since=last + tf_millis, until=candle_ts - tf_millis)
+    expected = (candle_ts - last) // tf_millis - 1
+    if len(missing) != expected:
+        logger.warning(f"Only {len(missing)} of {expected} missed {symbol} {timeframe} candles before {candle_ts} available")
+    return missing
+
+# Reload the indicator state saved by the previous run
+def restore_candles(columns, symbol=SYMBOL, exchange=exchange, timeframe=TIMEFRAME, limit=1000):
+    """Reload the saved candle window and indicator state, topped up with the candles closed since.
+
+    Returns (candles, pending): the newest candle closed while the bot was down
+    is not replayed but returned as `pending`, for the loop to decide on.
+    """
+    candles = load_state(STATE_PATH, symbol=symbol, timeframe=timeframe, columns=list(columns), window=WINDOW_BARS, compact=COMPACT_FLOAT32)
+    if candles is None:
+        return None, None
+    try:
+        tf_millis = timeframe_ms(timeframe, TIMEFRAMES)
+        since = candles.last_timestamp() + tf_millis
+        candle_store.fetch(exchange, symbol, timeframe, limit=limit)
+        missing = candle_store.load(symbol, timeframe, since=since)
+        gaps = any(b[0] - a[0] != tf_millis for a, b in zip(missing, missing[1:]))
+        if len(missing) >= limit or gaps or (missing and missing[0][0] != since):
+            logger.info(f"Saved indicator state for {symbol} {timeframe} is too far behind, rebuilding")
+            return None, None
+        replay_candles(candles, missing[:-1])
+        logger.info(f"Restored indicator state for {symbol} {timeframe}: {len(candles)} bars, {max(len(missing) - 1, 0)} missing candles replayed")
+        return candles, missing[-1] if missing else None
+    except Exception as e:
+        logger.error(f"Error restoring indicator state for {symbol}: {e}")
+        return None, None
+
 # 4 *
+# Columns read by ai_decision; only these (and their inputs) are computed every bar.
+# Add a column here before using it in a rule below.
+AI_DECISION_COLUMNS = ['Close', 'rsi', 'stoch_rsi', 'stoch_k', 'stoch_d']
+
 # AI decision logic with market order placement
-def ai_decision(df, stop_loss_percent=STOP_LOSS_PERCENT, take_profit_percent=TAKE_PROFIT_PERCENT, position=None, buy_price=None):
-    if df.empty or len(df) < 1:
-        logger.warning("DataFrame is empty or too small for decision.")
+def ai_decision(candles, stop_loss_percent=STOP_LOSS_PERCENT, take_profit_percent=TAKE_PROFIT_PERCENT, position=None, buy_price=None, symbol=SYMBOL, place_orders=True):
+    if candles.empty or len(candles) < 1:
+        logger.warning("Candle window is empty or too small for decision.")
         return "hold", None, None, None
 
-    latest = df.iloc[-1]
+    latest = candles.row(-1, AI_DECISION_COLUMNS)
     close_price = latest['Close']
-    open_price = latest['Open']
-    kdj_k = latest['k'] if not pd.isna(latest['k']) else 0.0
-    kdj_d = latest['d'] if not pd.isna(latest['d']) else 0.0
-    kdj_j = latest['j'] if not pd.isna(latest['j']) else 0.0
-    ema1 = latest['ema1'] if not pd.isna(latest['ema1']) else 0.0
-    ema2 = latest['ema2'] if not pd.isna(latest['ema2']) else 0.0
-    macd = latest['macd'] if not pd.isna(latest['macd']) else 0.0
-    macd_signal = latest['macd_signal'] if not pd.isna(latest['macd_signal']) else 0.0
-    macd_hist = latest['macd_hist'] if not pd.isna(latest['macd_hist']) else 0.0
     rsi = latest['rsi'] if not pd.isna(latest['rsi']) else 0.0
-    lst_diff = latest['lst_diff'] if not pd.isna(latest['lst_diff']) else 0.0
-    diff = latest['diff'] if not pd.isna(latest['diff']) else 0.0
-    diff3k = latest['diff3k'] if not pd.isna(latest['diff3k']) else 0.0
-    diff2m = latest['diff2m'] if not pd.isna(latest['diff2m']) else 0.0
-    diff1e = latest['diff1e'] if not pd.isna(latest['diff1e']) else 0.0
     stoch_rsi = latest['stoch_rsi'] if not pd.isna(latest['stoch_rsi']) else 0.0
     stoch_k = latest['stoch_k'] if not pd.isna(latest['stoch_k']) else 0.0
     stoch_d = latest['stoch_d'] if not pd.isna(latest['stoch_d']) else 0.0
-    obv = latest['obv'] if not pd.isna(latest['obv']) else 0.0 #
-    macd_hollow = latest['macd_hollow'] if not pd.isna(latest['macd_hollow']) else 0.0
-    supertrend_trend = latest['supertrend_trend']
     stop_loss = None
     take_profit = None
     action = "hold"
     order_id = None
 
-    usdt_amount = AMOUNTS
-    try:
-        quantity = usdt_amount / close_price
-        market = exchange.load_markets()[SYMBOL]
-        quantity_precision = market['precision']['amount']
-        quantity = exchange.amount_to_precision(SYMBOL, quantity)
-        logger.debug(f"Calculated quantity: {quantity} for {usdt_amount} USDT at price {close_price:.2f}")
-    except Exception as e:
-        logger.error(f"Error calculating quantity: {e}")
-        return "hold", None, None, None
-
     if position == "long" and buy_price is not None:
         stop_loss = buy_price * (1 - stop_loss_percent / 100)
         take_profit = buy_price * (1 + take_profit_percent / 100)
@@ -634,36 +558,11 @@ def ai_decision(df, stop_loss_percent=STOP_LOSS_PERCENT, take_profit_percent=TAK
         elif (stoch_rsi >= 0.99 and stoch_k >= 99.99 and stoch_d >= 94.97 and rsi > 55.00):
             logger.info(f"Sell triggered by macd_hollow: macd_hollow=Up, close={close_price:.2f}")
             action = "sell"
-        #elif (diff <= -0.00 and diff3k <= -0.00):
-        #    logger.info(f"Sell triggered by Supertrend: supertrend_trend=Up, close={close_price:.2f}")
-        #    action = "sell"
-        #elif (kdj_j > kdj_d and kdj_j > 115.00 and macd > macd_signal and ema1 > ema2 and rsi < 83.00):
-        #    logger.info(f"Sell triggered by Supertrend: supertrend_trend=Up, close={close_price:.2f}")
-        #    action = "sell"
-        #elif (lst_diff <  -0.01 and macd_hollow >= 0.00 and stoch_k >= 99.98  and macd > macd_signal and rsi <= 72.00):
-        #    logger.info(f"Sell triggered by Supertrend: supertrend_trend=Down, close={close_price:.2f}")
-        #    action = "sell"
-        #elif (supertrend_trend == 'up' and stoch_rsi >= 1.00 and stoch_k >= 100.00 and stoch_d > 94.00 and obv >= 419.00 and diff1e > 0.00 and diff2m > 0.00 and diff3k > 0.00 and rsi > 62.00):
-        #    logger.info(f"Sell triggered by KDJ/MACD: kdj_j={kdj_j:.2f}, kdj_d={kdj_d:.2f}, "f"macd_hist={(macd - macd_signal):.2f}, close={close_price:.2f}")
-        #    action = "sell"
-
-    #if action == "hold" and position is None:
-    #    if (diff >= 0.00 and diff3k >= 0.00 and diff2m >= 0.00):
-    #        logger.info(f"Buy triggered by macd_hollow: macd_hollow=Down, close={close_price:.2f}")
-    #        action = "buy"
+
     if action == "hold" and position is None:
         if (stoch_rsi <= 0.01 and stoch_k <= 0.01 and stoch_d < 25.00 and rsi < 19.00):
             logger.info(f"Buy triggered by macd_hollow: macd_hollow=Down, close={close_price:.2f}")
             action = "buy"
-    #    elif (kdj_j < kdj_d and kdj_j < -15.00 and macd < macd_signal and ema1 < ema2 and rsi < 17.00 and stoch_k <= 0.01):
-    #        logger.info(f"Buy triggered by KDJ/MACD: kdj_j={kdj_j:.2f}, kdj_d={kdj_d:.2f}, "f"macd_hist={(macd - macd_signal):.2f}, close={close_price:.2f}")
-    #        action = "buy"
-    #    elif (lst_diff >  0.01 and macd_hollow <= 0.01 and stoch_k <= 0.01  and macd < macd_signal and diff1e <= -0.01 and rsi <= 19.00):
-    #        logger.info(f"Buy triggered by Supertrend: supertrend_trend=Down, close={close_price:.2f}")
-    #        action = "buy"
-    #    elif (supertrend_trend == 'down' and stoch_rsi <= 0.00 and stoch_k <= 0.01 and stoch_d <= 0.15 and obv <= -1113.00 and diff1e < - 0.00 and diff2m < - 0.00 and diff3k < - 0.00 and rsi < 23.00):
-    #        logger.info(f"Buy triggered by Supertrend: supertrend_trend=Down, close={close_price:.2f}")
-    #        action = "buy"
 
     if action == "buy" and position is not None:
         logger.debug("Prevented consecutive buy order.")
@@ -672,22 +571,29 @@ def ai_decision(df, stop_loss_percent=STOP_LOSS_PERCENT, take_profit_percent=TAK
         logger.debug("Prevented sell order without open position.")
         action = "hold"
 
-    if action in ["buy", "sell"] and bot_active:
+    if action in ["buy", "sell"] and bot_active and place_orders:
         try:
             if action == "buy":
-                order = exchange.create_market_buy_order(SYMBOL, quantity)
+                # Sized only when an order is placed; hold bars do no market lookups
+                usdt_amount = AMOUNTS
+                quantity = market_cache.order_amount(symbol, usdt_amount, close_price)
+                if quantity is None:
+                    return "hold", None, None, None
+                logger.debug(f"Calculated quantity: {quantity} for {usdt_amount} USDT at price {close_price:.2f}")
+                order = exchange.create_market_buy_order(symbol, quantity)
                 order_id = str(order['id'])
+                account_ledger.apply_fill(symbol, 'buy', order)
                 logger.info(f"Placed market buy order: {order_id}, quantity={quantity}, price={close_price:.2f}")
             elif action == "sell":
-                balance = exchange.fetch_balance()
-                asset_symbol = SYMBOL.split("/")[0]
-                available_amount = balance[asset_symbol]['free']
-                quantity = exchange.amount_to_precision(SYMBOL, available_amount)
+                asset_symbol = symbol.split("/")[0]
+                available_amount = account_ledger.free(asset_symbol)
+                quantity = market_cache.amount_to_precision(symbol, available_amount)
                 if float(quantity) <= 0:
                     logger.warning("No asset balance available to sell.")
                     return "hold", None, None, None
-                order = exchange.create_market_sell_order(SYMBOL, quantity)
+                order = exchange.create_market_sell_order(symbol, quantity)
                 order_id = str(order['id'])
+                account_ledger.apply_fill(symbol, 'sell', order)
                 logger.info(f"Placed market sell order: {order_id}, quantity={quantity}, price={close_price:.2f}")
         except Exception as e:
             logger.error(f"Error placing market order: {e}")
@@ -729,12 +635,11 @@ def handle_second_strategy(action, current_price, primary_profit):
     return return_profit, msg
 
 # Telegram message sending
-def send_telegram_message(signal, bot_token, chat_id, retries=3, delay=5):
-    for attempt in range(retries):
-        try:
-            bot = Bot(token=bot_token)
-            diff_color = "🟢" if signal['diff'] > 0 else "🔴"
-            message = f"""
+def send_telegram_message(signal, bot_token, chat_id, retries=3):
+    try:
+        bot = Bot(token=bot_token)
+        diff_color = "🟢" if signal['diff'] > 0 else "🔴"
+        message = f"""
 Time: {signal['time']}
 Timeframe: {signal['timeframe']}
 Strategy: {signal['strategy']}
@@ -771,20 +676,15 @@ OBV: {signal['obv']:.2f}
 {f"Profit: {signal['profit']:.2f}" if signal['action'] == "sell" else ""}
 {f"Order ID: {signal['order_id']}" if signal['order_id'] else ""}
 """
-            bot.send_message(chat_id=chat_id, text=message)
-            logger.info(f"Telegram message sent successfully: {signal['action']}, order_id={signal['order_id']}")
-            return
-        except telegram.error.InvalidToken:
-            logger.error(f"Invalid Telegram bot token: {bot_token}")
-            return
-        except telegram.error.ChatNotFound:
-            logger.error(f"Chat not found for chat_id: {chat_id}")
-            return
-        except Exception as e:
-            logger.error(f"Error sending Telegram message (attempt {attempt + 1}/{retries}): {e}")
-            if attempt < retries - 1:
-                time.sleep(delay)
-    logger.error(f"Failed to send Telegram message after {retries} attempts")
+        retry_call(bot.send_message, chat_id=chat_id, text=message, attempts=retries, breaker=get_breaker("telegram"),
+                   retry_on=(telegram.error.NetworkError, telegram.error.RetryAfter), no_retry=(telegram.error.BadRequest,))
+        logger.info(f"Telegram message sent successfully: {signal['action']}, order_id={signal['order_id']}")
+    except telegram.error.InvalidToken:
+        logger.error(f"Invalid Telegram bot token: {bot_token}")
+    except telegram.error.ChatNotFound:
+        logger.error(f"Chat not found for chat_id: {chat_id}")
+    except Exception as e:
+        logger.error(f"Failed to send Telegram message: {e}")
 # 5 *
 # Calculate next timeframe boundary
 def get_next_timeframe_boundary(current_time, timeframe_seconds):
@@ -796,7 +696,7 @@ def get_next_timeframe_boundary(current_time, timeframe_seconds):
 
 # Trading bot
 def trading_bot():
-    global bot_active, position, buy_price, total_profit, pause_duration, pause_start, conn, stop_time
+    global bot_active, position, buy_price, total_profit, pause_duration, pause_start, conn, stop_time, market_feed, live_candles
     bot = None
     try:
         bot = Bot(token=BOT_TOKEN)
@@ -855,7 +755,9 @@ def trading_bot():
         bot = None
 
     last_update_id = 0
-    df = None
+    candles = None
+    engine = None
+    candle_cache = CandleCache()
 
     initial_signal = {
         'time': datetime.now(EU_TZ).strftime("%Y-%m-%d %H:%M:%S"),
@@ -899,38 +801,57 @@ def trading_bot():
         'strategy': 'initial'
     }
     store_signal(initial_signal)
+    signal_writer.flush()
     upload_to_github(db_path, 'rnn_bot.db')
     logger.info("Initial hold signal generated")
 
-    for attempt in range(3):
+    feed = None
+    if MARKET_FEED == "websocket":
         try:
-            ohlcv = exchange.fetch_ohlcv(SYMBOL, timeframe=TIMEFRAME, limit=100)
-            if not ohlcv:
-                logger.warning(f"No historical data for {SYMBOL}. Retrying...")
-                time.sleep(5)
-                continue
+            feed = WebSocketFeed(SYMBOL, TIMEFRAME, url=FEED_URL or None, history_url=FEED_HISTORY_URL or None).start()
+            logger.info(f"Market feed started: {feed.url}")
+        except Exception as e:
+            logger.error(f"Error starting market feed, falling back to REST polling: {e}")
+            feed = None
+    market_feed = feed
+
+    def fetch_history():
+        history = feed.history(limit=100) if feed is not None else None
+        if history is None:
+            history = candle_store.fetch(exchange, SYMBOL, TIMEFRAME, limit=100)
+        ohlcv = closed_candles(history, timeframe_ms(TIMEFRAME, TIMEFRAMES))
+        if not ohlcv:
+            raise ValueError(f"No historical data for {SYMBOL}")
+        return ohlcv
+
+    # The last candle closed during the downtime is decided on first, before waiting for the next one
+    candles, pending_candle = restore_candles(AI_DECISION_COLUMNS)
+    if candles is not None:
+        engine = candles.engine
+    else:
+        try:
+            ohlcv = retry_call(fetch_history, attempts=3, base_delay=1.0)
             df = pd.DataFrame(ohlcv, columns=['timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
             df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms').dt.tz_localize('UTC').dt.tz_convert(EU_TZ)
             df.set_index('timestamp', inplace=True)
             df['High'] = df['High'].fillna(df['Close'])
             df['Low'] = df['Low'].fillna(df['Close'])
-            df = add_technical_indicators(df)
-            logger.info(f"Initial df shape: {df.shape}")
-            break
+            engine = IndicatorEngine(columns=AI_DECISION_COLUMNS)
+            candles = CandleBuffer(WINDOW_BARS, engine=engine, dtype=CANDLE_DTYPE)
+            candles.extend(engine.warmup(df).tail(WINDOW_BARS))
+            logger.info(f"Initial candle window: {len(candles)} bars, capacity {candles.capacity}")
         except Exception as e:
-            logger.error(f"Error fetching historical data (attempt {attempt + 1}/3): {e}")
-            if attempt < 2:
-                time.sleep(5)
-            else:
-                logger.error(f"Failed to fetch historical data for {SYMBOL}")
-                return
+            logger.error(f"Failed to fetch historical data for {SYMBOL}: {e}")
+            return
+    live_candles = candles
 
-    timeframe_seconds = {'1m': 60, '5m': 300, '15m': 900, '30m': 1800, '1h': 3600, '1d': 86400}.get(TIMEFRAME, TIMEFRAMES)
+    timeframe_seconds = TIMEFRAME_SECONDS.get(TIMEFRAME, TIMEFRAMES)
 
-    current_time = datetime.now(EU_TZ)
-    seconds_to_wait = get_next_timeframe_boundary(current_time, timeframe_seconds)
-    logger.info(f"Waiting {seconds_to_wait:.2f} seconds to align with next {TIMEFRAME} boundary")
-    time.sleep(seconds_to_wait)
+    if feed is None and pending_candle is None:
+        current_time = datetime.now(EU_TZ)
+        seconds_to_wait = get_next_timeframe_boundary(current_time, timeframe_seconds)
+        logger.info(f"Waiting {seconds_to_wait:.2f} seconds to align with next {TIMEFRAME} boundary")
+        time.sleep(seconds_to_wait)
 
     while True:
         loop_start_time = datetime.now(EU_TZ)
@@ -943,21 +864,22 @@ def trading_bot():
                         profit = latest_data['Close'] - buy_price
                         total_profit += profit
                         return_profit, msg = handle_second_strategy("sell", latest_data['Close'], profit)
-                        usdt_amount = AMOUNTS
-                        quantity = exchange.amount_to_precision(SYMBOL, usdt_amount / latest_data['Close'])
                         order_id = None
                         try:
+                            quantity = market_cache.amount_to_precision(SYMBOL, account_ledger.free(SYMBOL.split("/")[0]))
                             order = exchange.create_market_sell_order(SYMBOL, quantity)
                             order_id = str(order['id'])
+                            account_ledger.apply_fill(SYMBOL, 'sell', order)
                             logger.info(f"Placed market sell order on stop: {order_id}, quantity={quantity}, price={latest_data['Close']:.2f}")
                         except Exception as e:
                             logger.error(f"Error placing market sell order on stop: {e}")
-                        signal = create_signal("sell", latest_data['Close'], latest_data, df, profit, total_profit, return_profit, total_return_profit, f"Bot stopped due to time limit{msg}", order_id, "primary")
+                        signal = create_signal("sell", latest_data['Close'], latest_data, candles, profit, total_profit, return_profit, total_return_profit, f"Bot stopped due to time limit{msg}", order_id, "primary")
                         store_signal(signal)
                         if bot:
                             send_telegram_message(signal, BOT_TOKEN, CHAT_ID)
                     position = None
                 logger.info("Bot stopped due to time limit")
+                signal_writer.flush()
                 upload_to_github(db_path, 'rnn_bot.db')
                 break
 
@@ -988,7 +910,14 @@ def trading_bot():
                     if bot:
                         bot.send_message(chat_id=CHAT_ID, text="Bot resumed after pause.")
 
-            latest_data = get_simulated_price()
+            if pending_candle is not None:
+                latest_data = candle_data(pending_candle)
+                pending_candle = None
+                logger.info(f"Deciding on candle {latest_data['candle_ts']}, closed while the bot was down")
+            elif feed is not None:
+                latest_data = get_feed_price(feed, timeframe_seconds + CANDLE_GRACE_SECONDS)
+            else:
+                latest_data = get_simulated_price()
             if pd.isna(latest_data['Close']):
                 logger.warning("Skipping cycle due to missing price data.")
                 current_time = datetime.now(EU_TZ)
@@ -1000,7 +929,8 @@ def trading_bot():
 
             if bot:
                 try:
-                    updates = bot.get_updates(offset=last_update_id, timeout=10)
+                    # Long polling would delay the decision on a pushed candle
+                    updates = bot.get_updates(offset=last_update_id, timeout=0 if feed is not None else 10)
                     for update in updates:
                         if update.message and update.message.text:
                             text = update.message.text.strip()
@@ -1013,16 +943,16 @@ def trading_bot():
                                         profit = current_price - buy_price
                                         total_profit += profit
                                         return_profit, msg = handle_second_strategy("sell", current_price, profit)
-                                        usdt_amount = AMOUNTS
-                                        quantity = exchange.amount_to_precision(SYMBOL, usdt_amount / current_price)
                                         order_id = None
                                         try:
+                                            quantity = market_cache.amount_to_precision(SYMBOL, account_ledger.free(SYMBOL.split("/")[0]))
                                             order = exchange.create_market_sell_order(SYMBOL, quantity)
                                             order_id = str(order['id'])
+                                            account_ledger.apply_fill(SYMBOL, 'sell', order)
                                             logger.info(f"Placed market sell order on /stop: {order_id}, quantity={quantity}, price={current_price:.2f}")
                                         except Exception as e:
                                             logger.error(f"Error placing market sell order on /stop: {e}")
-                                        signal = create_signal("sell", current_price, latest_data, df, profit, total_profit, return_profit, total_return_profit, f"Bot stopped via Telegram{msg}", order_id, "primary")
+                                        signal = create_signal("sell", current_price, latest_data, candles, profit, total_profit, return_profit, total_return_profit, f"Bot stopped via Telegram{msg}", order_id, "primary")
                                         store_signal(signal)
                                         if bot:
                                             send_telegram_message(signal, BOT_TOKEN, CHAT_ID)
@@ -1039,16 +969,16 @@ def trading_bot():
                                         profit = current_price - buy_price
                                         total_profit += profit
                                         return_profit, msg = handle_second_strategy("sell", current_price, profit)
-                                        usdt_amount = AMOUNTS
-                                        quantity = exchange.amount_to_precision(SYMBOL, usdt_amount / current_price)
                                         order_id = None
                                         try:
+                                            quantity = market_cache.amount_to_precision(SYMBOL, account_ledger.free(SYMBOL.split("/")[0]))
                                             order = exchange.create_market_sell_order(SYMBOL, quantity)
                                             order_id = str(order['id'])
+                                            account_ledger.apply_fill(SYMBOL, 'sell', order)
                                             logger.info(f"Placed market sell order on /stopN: {order_id}, quantity={quantity}, price={current_price:.2f}")
                                         except Exception as e:
                                             logger.error(f"Error placing market sell order on /stopN: {e}")
-                                        signal = create_signal("sell", current_price, latest_data, df, profit, total_profit, return_profit, total_return_profit, f"Bot paused via Telegram{msg}", order_id, "primary")
+                                        signal = create_signal("sell", current_price, latest_data, candles, profit, total_profit, return_profit, total_return_profit, f"Bot paused via Telegram{msg}", order_id, "primary")
                                         store_signal(signal)
                                         if bot:
                                             send_telegram_message(signal, BOT_TOKEN, CHAT_ID)
@@ -1083,22 +1013,47 @@ def trading_bot():
                 except Exception as e:
                     logger.error(f"Error processing Telegram updates: {e}")
 
-            new_row = pd.DataFrame({
-                'Open': [latest_data['Open']],
-                'Close': [latest_data['Close']],
-                'High': [latest_data['High']],
-                'Low': [latest_data['Low']],
-                'Volume': [latest_data['Volume']],
-                'diff': [latest_data['diff']]
-            }, index=[pd.Timestamp.now(tz=EU_TZ)])
-            df = pd.concat([df, new_row]).tail(100)
-            df = add_technical_indicators(df)
-
-            prev_close = df['Close'].iloc[-2] if len(df) >= 2 else df['Close'].iloc[-1]
-            percent_change = ((current_price - prev_close) / prev_close * 100) if prev_close != 0 else 0.0
-            action, stop_loss, take_profit, order_id = ai_decision(df, position=position, buy_price=buy_price)
+            candle_ts = int(latest_data['candle_ts'])
+            cache_key = (SYMBOL, TIMEFRAME, candle_ts)
+            if cache_key in candle_cache or candle_ts <= (candles.last_timestamp() or 0):
+                cached = candle_cache.get(cache_key)
+                logger.info(f"Candle {candle_ts} for {SYMBOL} {TIMEFRAME} already processed (action={cached['action'] if cached else 'n/a'}), skipping")
+                if feed is not None:
+                    continue
+                seconds_to_wait = get_next_timeframe_boundary(datetime.now(EU_TZ), timeframe_seconds)
+                if timeframe_seconds - seconds_to_wait < CANDLE_GRACE_SECONDS:
+                    # Just past the boundary: the new candle may not be published yet
+                    seconds_to_wait = min(2, seconds_to_wait)
+                time.sleep(seconds_to_wait)
+                continue
+
+            # A missed bar (failed fetch, slow loop, feed reconnect) is replayed, so the engine never skips one
+            try:
+                gap = missed_candles(candles, candle_ts)
+            except Exception as e:
+                logger.error(f"Error fetching missed candles before {candle_ts}: {e}")
+                gap = []
 
+            # Held from the indicator update to the position update: the intrabar monitor
+            # neither exits in between nor reads the window while the engine advances
             with bot_lock:
+                if gap:
+                    replay_candles(candles, gap)
+                    logger.info(f"Replayed {len(gap)} missed {SYMBOL} {TIMEFRAME} candles before {candle_ts}")
+                indicator_start = time.time()
+                indicators = engine.update(latest_data['Open'], latest_data['High'], latest_data['Low'], latest_data['Close'], latest_data['Volume'])
+                candles.append(candle_ts, {
+                    'Open': latest_data['Open'],
+                    'Close': latest_data['Close'],
+                    'High': latest_data['High'],
+                    'Low': latest_data['Low'],
+                    'Volume': latest_data['Volume'],
+                    **indicators
+                })
+                logger.debug(f"Indicators updated incrementally in {time.time() - indicator_start:.3f}s: {indicators}")
+
+                action, stop_loss, take_profit, order_id = ai_decision(candles, position=position, buy_price=buy_price)
+                candle_cache.put(cache_key, {'indicators': indicators, 'action': action, 'stop_loss': stop_loss, 'take_profit': take_profit, 'order_id': order_id})
                 profit = 0
                 return_profit = 0
                 msg = f"HOLD {SYMBOL} at {current_price:.2f}"
@@ -1118,18 +1073,29 @@ def trading_bot():
                         msg += " (Take-Profit)"
                     position = None
 
-                signal = create_signal(action, current_price, latest_data, df, profit, total_profit, return_profit, total_return_profit, msg, order_id, "primary")
+                signal = create_signal(action, current_price, latest_data, candles, profit, total_profit, return_profit, total_return_profit, msg, order_id, "primary")
                 store_signal(signal)
-                logger.debug(f"Generated signal: action={signal['action']}, time={signal['time']}, price={signal['price']:.2f}, order_id={signal['order_id']}")
+                if signal is not None:
+                    logger.debug(f"Generated signal: action={signal['action']}, time={signal['time']}, price={signal['price']:.2f}, order_id={signal['order_id']}")
 
                 if bot_active and action != "hold" and bot:
                     threading.Thread(target=send_telegram_message, args=(signal, BOT_TOKEN, CHAT_ID), daemon=True).start()
 
+            try:
+                # The monitor's sell row may evaluate lazy indicators while the engine is pickled
+                with bot_lock:
+                    save_state(STATE_PATH, candles, symbol=SYMBOL, timeframe=TIMEFRAME, columns=list(AI_DECISION_COLUMNS), window=WINDOW_BARS, compact=COMPACT_FLOAT32)
+            except Exception as e:
+                logger.error(f"Error saving indicator state: {e}")
+
             if bot_active and action != "hold":
                 upload_to_github(db_path, 'rnn_bot.db')
 
             loop_end_time = datetime.now(EU_TZ)
             processing_time = (loop_end_time - loop_start_time).total_seconds()
+            if feed is not None:
+                logger.debug(f"Candle {candle_ts} processed in {processing_time:.3f}s, waiting for the next pushed candle")
+                continue
             seconds_to_wait = get_next_timeframe_boundary(loop_end_time, timeframe_seconds)
             adjusted_sleep = seconds_to_wait - processing_time
             if adjusted_sleep < 0:
@@ -1142,9 +1108,249 @@ def trading_bot():
             current_time = datetime.now(EU_TZ)
             seconds_to_wait = get_next_timeframe_boundary(current_time, timeframe_seconds)
             time.sleep(seconds_to_wait)
+
+# Latest traded price: the market feed's candle while it is current and of this symbol, else the ticker
+def get_monitor_price(symbol=SYMBOL):
+    feed = market_feed
+    if feed is not None and feed.latest is not None and feed.symbol == symbol:
+        candle = feed.latest[0]
+        # The forming candle or the one that just closed; anything older means the feed stalled
+        if time.time() * 1000 - candle[0] < 2 * timeframe_ms(feed.timeframe):
+            return candle[4]
+        logger.debug(f"Market feed candle of {symbol} from {candle[0]} is stale, using the ticker")
+    return exchange.fetch_ticker(symbol)['last']
+
+# Exit an open position as soon as the price crosses its stop-loss or take-profit, between candle closes
+def position_monitor(interval=INTRABAR_MONITOR_SECONDS, stop_loss_percent=STOP_LOSS_PERCENT, take_profit_percent=TAKE_PROFIT_PERCENT):
+    global position, total_profit
+    while True:
+        try:
+            time.sleep(interval)
+            if position != "long" or buy_price is None or not bot_active or live_candles is None:
+                continue
+            price = get_monitor_price()
+            stop_loss = buy_price * (1 - stop_loss_percent / 100)
+            take_profit = buy_price * (1 + take_profit_percent / 100)
+            if stop_loss < price < take_profit:
+                continue
+            with bot_lock:
+                if position != "long" or not bot_active:
+                    continue
+                reason = "Stop-Loss" if price <= stop_loss else "Take-Profit"
+                logger.info(f"Intrabar {reason.lower()} triggered at {price:.2f}, bought at {buy_price:.2f}")
+                try:
+                    quantity = market_cache.amount_to_precision(SYMBOL, account_ledger.free(SYMBOL.split("/")[0]))
+                    order = exchange.create_market_sell_order(SYMBOL, quantity)
+                    order_id = str(order['id'])
+                    account_ledger.apply_fill(SYMBOL, 'sell', order)
+                    logger.info(f"Placed intrabar market sell order: {order_id}, quantity={quantity}, price={price:.2f}")
+                except Exception as e:
+                    # Position stays open; retried on the next check
+                    logger.error(f"Error placing intrabar market sell order: {e}")
+                    continue
+                profit = price - buy_price
+                total_profit += profit
+                return_profit, msg_suffix = handle_second_strategy("sell", price, profit)
+                msg = f"SELL {SYMBOL} at {price:.2f}, Profit: {profit:.2f}, Order ID: {order_id}{msg_suffix} ({reason}, intrabar)"
+                signal = create_signal("sell", price, {'Close': price}, live_candles, profit, total_profit, return_profit, total_return_profit, msg, order_id, "primary")
+                store_signal(signal)
+                position = None
+            threading.Thread(target=send_telegram_message, args=(signal, BOT_TOKEN, CHAT_ID), daemon=True).start()
+            upload_to_github(db_path, 'rnn_bot.db')
+        except Exception as e:
+            logger.error(f"Error in position monitor: {e}")
+            time.sleep(interval)
+
+# Run the strategy on EXTRA_TIMEFRAMES, built from one 1m candle feed
+def timeframe_feed(timeframes=EXTRA_TIMEFRAMES, symbol=SYMBOL, base_timeframe='1m'):
+    base_ms = timeframe_ms(base_timeframe)
+    states = {}
+    for timeframe in timeframes:
+        if timeframe == TIMEFRAME:
+            logger.warning(f"Timeframe {timeframe} is already traded by the main loop, skipping")
+            continue
+        try:
+            ohlcv = candle_store.fetch(exchange, symbol, timeframe, limit=WINDOW_BARS)
+            df = pd.DataFrame(ohlcv, columns=['timestamp', 'Open', 'High', 'Low', 'Close', 'Volume'])
+            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms').dt.tz_localize('UTC').dt.tz_convert(EU_TZ)
+            df.set_index('timestamp', inplace=True)
+            engine = IndicatorEngine(columns=AI_DECISION_COLUMNS)
+            candles = CandleBuffer(WINDOW_BARS, engine=engine, dtype=CANDLE_DTYPE)
+            candles.extend(engine.warmup(df))
+            since = candles.last_timestamp() + timeframe_ms(timeframe) if not candles.empty else None
+            states[timeframe] = {
+                'aggregator': BarAggregator(timeframe, base_timeframe, since=since),
+                'candles': candles,
+                'engine': engine,
+                'position': None,
+                'buy_price': None,
+                'total_profit': 0.0,
+            }
+            logger.info(f"Timeframe {timeframe} for {symbol} warmed up on {len(candles)} bars")
+        except Exception as e:
+            logger.error(f"Error initializing timeframe {timeframe}: {e}")
+    if not states:
+        return
+
+    starts = [state['aggregator'].since for state in states.values() if state['aggregator'].since is not None]
+    last_ts = min(starts) - base_ms if starts else None
+    if starts:
+        # A 1d bar needs 1440 base candles, more than one fetch returns
+        try:
+            candle_store.backfill(exchange, symbol, base_timeframe, min(starts))
+        except Exception as e:
+            logger.error(f"Error backfilling {base_timeframe} candles for {symbol}: {e}")
+    while True:
+        try:
+            candle_store.fetch(exchange, symbol, base_timeframe, limit=1000)
+            if last_ts is None:
+                ohlcv = candle_store.load(symbol, base_timeframe, limit=1000)
+            else:
+                ohlcv = candle_store.load(symbol, base_timeframe, since=last_ts + base_ms)
+            for candle in ohlcv:
+                last_ts = candle[0]
+                for timeframe, state in states.items():
+                    for bar in state['aggregator'].update(candle):
+                        process_timeframe_bar(timeframe, state, bar, symbol)
+        except Exception as e:
+            logger.error(f"Error in {base_timeframe} timeframe feed: {e}")
+        seconds_to_wait = get_next_timeframe_boundary(datetime.now(EU_TZ), base_ms // 1000)
+        time.sleep(seconds_to_wait + 2)
+
+# Strategy of the paper-traded rows (extra timeframes, trade bars); the reports leave them out
+PAPER_STRATEGY = "paper"
+REPORTED_TRADES = f"strategy IS NOT '{PAPER_STRATEGY}'"
+
+# One aggregated bar through the indicators and strategy of its timeframe; paper trades only
+def process_timeframe_bar(timeframe, state, bar, symbol=SYMBOL):
+    candle_ts, open_, high, low, close, volume = bar
+    candles = state['candles']
+    indicators = state['engine'].update(open_, high, low, close, volume)
+    candles.append(candle_ts, {'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume, **indicators})
+    action, stop_loss, take_profit, order_id = ai_decision(
+        candles, position=state['position'], buy_price=state['buy_price'], symbol=symbol, place_orders=False
+    )
+    profit = 0
+    msg = f"HOLD {symbol} {timeframe} at {close:.2f}"
+    if bot_active and action == "buy" and state['position'] is None:
+        state['position'] = "long"
+        state['buy_price'] = close
+        msg = f"BUY {symbol} {timeframe} at {close:.2f} (paper)"
+    elif bot_active and action == "sell" and state['position'] == "long":
+        profit = close - state['buy_price']
+        state['total_profit'] += profit
+        state['position'] = None
+        msg = f"SELL {symbol} {timeframe} at {close:.2f}, Profit: {profit:.2f} (paper)"
+    latest_data = {'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}
+    signal = create_signal(action, close, latest_data, candles, profit, state['total_profit'], 0, 0, msg, None, PAPER_STRATEGY, timeframe=timeframe)
+    store_signal(signal)
+    logger.debug(f"Timeframe {timeframe} signal: action={action}, price={close:.2f}")
+
+# Paper-trade the strategy on bars of one TRADE_BARS spec, built from the aggTrade stream
+def trade_bar_feed(spec, symbol=SYMBOL):
+    try:
+        builder = TradeBarBuilder(*parse_bar_spec(spec))
+        feed = TradeBarFeed(symbol, builder, url=TRADE_FEED_URL or None).start()
+    except Exception as e:
+        logger.error(f"Error starting {spec} trade bars: {e}")
+        return
+    engine = IndicatorEngine(columns=AI_DECISION_COLUMNS)
+    state = {
+        'candles': CandleBuffer(WINDOW_BARS, engine=engine, dtype=CANDLE_DTYPE),
+        'engine': engine,
+        'position': None,
+        'buy_price': None,
+        'total_profit': 0.0,
+    }
+    logger.info(f"{builder.label} bars for {symbol} started from {feed.url}")
+    while True:
+        try:
+            bar = feed.next_closed(timeout=60)
+            # No trade has closed the open time bar yet; close it once its period is over
+            bars = [bar] if bar is not None else feed.flush()
+            for bar in bars:
+                process_timeframe_bar(builder.label, state, bar, symbol)
+        except Exception as e:
+            logger.error(f"Error processing {builder.label} bar: {e}")
+
+# Latest scan decision per symbol, served by /scan
+scan_results = {}
+
+# Fetch SCAN_SYMBOLS concurrently after every bar close and decide on each as its candles arrive
+def market_scanner(symbols=SCAN_SYMBOLS, timeframe=TIMEFRAME):
+    try:
+        fetcher = AsyncOhlcvFetcher(scheduler=request_scheduler)
+    except Exception as e:
+        logger.error(f"Error starting market scanner: {e}")
+        return
+    timeframe_seconds = TIMEFRAME_SECONDS.get(timeframe, TIMEFRAMES)
+    windows = {}
+    while True:
+        time.sleep(get_next_timeframe_boundary(datetime.now(EU_TZ), timeframe_seconds) + 1)
+        start_time = time.time()
+        # Full window on the first scan of a symbol, then only the latest candles
+        fetch_plan = [(symbol, timeframe, 5 if symbol in windows else WINDOW_BARS + 1) for symbol in symbols]
+        decided = 0
+        full_windows = {}
+        try:
+            for symbol, _, ohlcv in fetcher.fetch_iter(fetch_plan):
+                if ohlcv:
+                    candle_store.add(symbol, timeframe, ohlcv)
+                    if symbol in windows:
+                        decided += scan_symbol(symbol, ohlcv, windows, timeframe)
+                    else:
+                        full_windows[symbol] = ohlcv
+            if full_windows:
+                decided += scan_batch(full_windows, windows, timeframe)
+        except Exception as e:
+            logger.error(f"Error in market scan: {e}")
+        logger.info(f"Scanned {decided}/{len(symbols)} symbols in {time.time() - start_time:.2f}s")
+
+# Publish one symbol's scan decision on its latest candle
+def record_scan(symbol, action, candle, timeframe=TIMEFRAME):
+    scan_results[symbol] = {
+        'action': action,
+        'close': float(candle[4]),
+        'candle_ts': int(candle[0]),
+        'time': datetime.now(EU_TZ).strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    if action != "hold":
+        logger.info(f"Scan signal: {action.upper()} {symbol} {timeframe} at {candle[4]:.4f}")
+
+# Decide on every symbol fetched with a full window in one batched indicator pass, then seed their incremental windows
+def scan_batch(ohlcv_by_symbol, windows, timeframe=TIMEFRAME):
+    views = add_technical_indicators_batch(ohlcv_by_symbol)
+    for symbol, view in views.items():
+        action, _, _, _ = ai_decision(view, symbol=symbol, place_orders=False)
+        record_scan(symbol, action, ohlcv_by_symbol[symbol][-1], timeframe)
+    # Off the decision path: later scans only fetch the newest candles and update these
+    for symbol, ohlcv in ohlcv_by_symbol.items():
+        candles = CandleBuffer(WINDOW_BARS, engine=IndicatorEngine(columns=AI_DECISION_COLUMNS), dtype=CANDLE_DTYPE)
+        replay_candles(candles, ohlcv)
+        windows[symbol] = candles
+    return len(views)
+
+# Advance one symbol's candle window with new candles and run the strategy on it
+def scan_symbol(symbol, ohlcv, windows, timeframe=TIMEFRAME):
+    tf_millis = timeframe_ms(timeframe, TIMEFRAMES)
+    candles = windows[symbol]
+    last_ts = candles.last_timestamp()
+    new = [candle for candle in ohlcv if candle[0] > last_ts]
+    if not new:
+        return 0
+    if new[0][0] != last_ts + tf_millis:
+        logger.info(f"Missed candles for {symbol}, refetching its full window next scan")
+        del windows[symbol]
+        return 0
+    replay_candles(candles, new)
+    action, _, _, _ = ai_decision(candles, symbol=symbol, place_orders=False)
+    record_scan(symbol, action, new[-1], timeframe)
+    return 1
+
 # 6 *
 # Helper functions
-def create_signal(action, current_price, latest_data, df, profit, total_profit, return_profit, total_return_profit, msg, order_id, strategy):
+# Signal dict of a decision; None for a hold bar that telemetry sampling skips, before the indicators are read
+def create_signal(action, current_price, latest_data, candles, profit, total_profit, return_profit, total_return_profit, msg, order_id, strategy, timeframe=TIMEFRAME):
     def safe_float(val, default=0.0):
         return float(val) if val is not None and not pd.isna(val) else default
 
@@ -1155,18 +1361,25 @@ def create_signal(action, current_price, latest_data, df, profit, total_profit,
             return str(val)
         return str(val)
 
-    latest = df.iloc[-1] if not df.empty else pd.Series()
+    candle_ts = candles.last_timestamp() if not candles.empty else None
+    if action == 'hold' and candle_ts is not None and not sample_telemetry(SYMBOL, timeframe):
+        return None
 
+    latest = candles.row(-1, SIGNAL_COLUMNS) if not candles.empty else {}
+    prev_close = candles.row(-2)['Close'] if len(candles) >= 2 else 0
+
+    now = datetime.now(EU_TZ)
     return {
-        'time': datetime.now(EU_TZ).strftime("%Y-%m-%d %H:%M:%S") if 'EU_TZ' in globals() else datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+        'time': now.strftime("%Y-%m-%d %H:%M:%S"),
+        'ts': int(now.timestamp() * 1000),
         'action': action,
         'symbol': SYMBOL,
         'price': float(current_price),
         'open_price': safe_float(latest_data.get('Open')),
         'close_price': safe_float(latest_data.get('Close')),
         'volume': safe_float(latest_data.get('Volume')),
-        'percent_change': float(((current_price - df['Close'].iloc[-2]) / df['Close'].iloc[-2] * 100)
-                                if len(df) >= 2 and df['Close'].iloc[-2] != 0 else 0.0),
+        'percent_change': float(((current_price - prev_close) / prev_close * 100)
+                                if prev_close != 0 else 0.0),
         'stop_loss': None,
         'take_profit': None,
         'profit': safe_float(profit),
@@ -1195,14 +1408,75 @@ def create_signal(action, current_price, latest_data, df, profit, total_profit,
         'stoch_d': safe_float(latest.get('stoch_d')),
         'obv': safe_float(latest.get('obv')),
         'message': msg,
-        'timeframe': TIMEFRAME,
+        'timeframe': timeframe,
         'order_id': order_id if order_id else None,
-        'strategy': strategy
+        'strategy': strategy,
+        'candle_ts': candle_ts
     }
 
-def store_signal(signal):
+INSERT_SIGNAL_SQL = '''
+    INSERT INTO trades (
+        time, action, symbol, price, open_price, close_price, volume,
+        percent_change, stop_loss, take_profit, profit, total_profit,
+        return_profit, total_return_profit, ema1, ema2, rsi, k, d, j, diff,
+        diff1e, diff2m, diff3k, macd, macd_signal, macd_hist, macd_hollow,
+        lst_diff, supertrend, supertrend_trend, stoch_rsi, stoch_k, stoch_d,
+        obv, message, timeframe, order_id, strategy, ts
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+              ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Epoch ms of a signal; signals built without create_signal only carry the text time
+def signal_ts(signal):
+    if signal.get('ts') is not None:
+        return signal['ts']
+    return int(EU_TZ.localize(datetime.strptime(signal['time'], "%Y-%m-%d %H:%M:%S")).timestamp() * 1000)
+
+def signal_row(signal):
+    return (
+        signal['time'], signal['action'], signal['symbol'], signal['price'],
+        signal['open_price'], signal['close_price'], signal['volume'],
+        signal['percent_change'], signal['stop_loss'], signal['take_profit'],
+        signal['profit'], signal['total_profit'],
+        signal['return_profit'], signal['total_return_profit'],
+        signal['ema1'], signal['ema2'], signal['rsi'],
+        signal['k'], signal['d'], signal['j'], signal['diff'],
+        signal['diff1e'], signal['diff2m'], signal['diff3k'],
+        signal['macd'], signal['macd_signal'], signal['macd_hist'], signal['macd_hollow'],
+        signal['lst_diff'], signal['supertrend'], signal['supertrend_trend'],
+        signal['stoch_rsi'], signal['stoch_k'], signal['stoch_d'], signal['obv'],
+        signal['message'], signal['timeframe'], signal['order_id'], signal['strategy'],
+        signal_ts(signal)
+    )
+
+# Hold decisions on a bar are indicator telemetry; trades keeps buys, sells and bot events
+def is_telemetry(signal):
+    return signal['action'] == 'hold' and signal.get('candle_ts') is not None
+
+# Keep every TELEMETRY_SAMPLE_EVERY-th hold bar per symbol and timeframe
+telemetry_counts = {}
+
+def sample_telemetry(symbol, timeframe):
+    if TELEMETRY_SAMPLE_EVERY <= 0:
+        return False
+    key = (symbol, timeframe)
+    count = telemetry_counts.get(key, 0)
+    telemetry_counts[key] = count + 1
+    return count % TELEMETRY_SAMPLE_EVERY == 0
+
+def insert_signals(c, trade_rows, telemetry_rows):
+    if trade_rows:
+        c.executemany(INSERT_SIGNAL_SQL, trade_rows)
+    if telemetry_rows:
+        c.executemany(INSERT_TELEMETRY_SQL, telemetry_rows)
+
+# Insert a batch of signals in one transaction (called by the signal writer thread)
+def write_signals(signals):
     global conn
     start_time = time.time()
+    trade_rows = [signal_row(signal) for signal in signals if not is_telemetry(signal)]
+    telemetry_rows = [telemetry_row(signal) for signal in signals if is_telemetry(signal)]
+    actions = ', '.join(sorted({signal['action'] for signal in signals}))
     with db_lock:
         for attempt in range(3):
             try:
@@ -1212,37 +1486,19 @@ def store_signal(signal):
                         logger.error("Failed to reinitialize database for signal storage")
                         return
                 c = conn.cursor()
-                c.execute('''
-                    INSERT INTO trades (
-                        time, action, symbol, price, open_price, close_price, volume,
-                        percent_change, stop_loss, take_profit, profit, total_profit,
-                        return_profit, total_return_profit, ema1, ema2, rsi, k, d, j, diff,
-                        diff1e, diff2m, diff3k, macd, macd_signal, macd_hist, macd_hollow,
-                        lst_diff, supertrend, supertrend_trend, stoch_rsi, stoch_k, stoch_d,
-                        obv, message, timeframe, order_id, strategy
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
-                              ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    signal['time'], signal['action'], signal['symbol'], signal['price'],
-                    signal['open_price'], signal['close_price'], signal['volume'],
-                    signal['percent_change'], signal['stop_loss'], signal['take_profit'],
-                    signal['profit'], signal['total_profit'],
-                    signal['return_profit'], signal['total_return_profit'],
-                    signal['ema1'], signal['ema2'], signal['rsi'],
-                    signal['k'], signal['d'], signal['j'], signal['diff'],
-                    signal['diff1e'], signal['diff2m'], signal['diff3k'],
-                    signal['macd'], signal['macd_signal'], signal['macd_hist'], signal['macd_hollow'],
-                    signal['lst_diff'], signal['supertrend'], signal['supertrend_trend'],
-                    signal['stoch_rsi'], signal['stoch_k'], signal['stoch_d'], signal['obv'],
-                    signal['message'], signal['timeframe'], signal['order_id'], signal['strategy']
-                ))
+                insert_signals(c, trade_rows, telemetry_rows)
                 conn.commit()
                 elapsed = time.time() - start_time
-                logger.debug(f"Signal stored successfully: action={signal['action']}, strategy={signal['strategy']}, time={signal['time']}, order_id={signal['order_id']}, db_write_time={elapsed:.3f}s")
+                logger.debug(f"Signals stored successfully: trades={len(trade_rows)}, telemetry={len(telemetry_rows)}, actions={actions}, last_time={signals[-1]['time']}, db_write_time={elapsed:.3f}s")
                 return
             except sqlite3.Error as e:
                 elapsed = time.time() - start_time
-                logger.error(f"Error storing signal after {elapsed:.3f}s (attempt {attempt + 1}/3): {e}")
+                logger.error(f"Error storing {len(signals)} signals after {elapsed:.3f}s (attempt {attempt + 1}/3): {e}")
+                if conn:
+                    try:
+                        conn.rollback()
+                    except sqlite3.Error:
+                        pass
                 if "no column named" in str(e).lower():
                     logger.info("Missing column detected. Attempting to reinitialize database.")
                     if not setup_database(first_attempt=True):
@@ -1252,75 +1508,72 @@ def store_signal(signal):
                     if conn:
                         conn.close()
                         conn = None
-                    time.sleep(2)
+                    db_retry_pause(attempt)
             except Exception as e:
                 elapsed = time.time() - start_time
-                logger.error(f"Unexpected error storing signal after {elapsed:.3f}s (attempt {attempt + 1}/3): {e}")
+                logger.error(f"Unexpected error storing {len(signals)} signals after {elapsed:.3f}s (attempt {attempt + 1}/3): {e}")
                 if conn:
                     conn.close()
                     conn = None
-                time.sleep(2)
+                db_retry_pause(attempt)
 
-        logger.error("Failed to store signal after 3 attempts. Forcing creation of new database.")
+        logger.error(f"Failed to store {len(signals)} signals after 3 attempts. Forcing creation of new database.")
         if setup_database(first_attempt=True):
             try:
                 c = conn.cursor()
-                c.execute('''
-                    INSERT INTO trades (
-                        time, action, symbol, price, open_price, close_price, volume,
-                        percent_change, stop_loss, take_profit, profit, total_profit,
-                        return_profit, total_return_profit, ema1, ema2, rsi, k, d, j, diff,
-                        diff1e, diff2m, diff3k, macd, macd_signal, macd_hist, macd_hollow,
-                        lst_diff, supertrend, supertrend_trend, stoch_rsi, stoch_k, stoch_d,
-                        obv, message, timeframe, order_id, strategy
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
-                              ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    signal['time'], signal['action'], signal['symbol'], signal['price'],
-                    signal['open_price'], signal['close_price'], signal['volume'],
-                    signal['percent_change'], signal['stop_loss'], signal['take_profit'],
-                    signal['profit'], signal['total_profit'],
-                    signal['return_profit'], signal['total_return_profit'],
-                    signal['ema1'], signal['ema2'], signal['rsi'],
-                    signal['k'], signal['d'], signal['j'], signal['diff'],
-                    signal['diff1e'], signal['diff2m'], signal['diff3k'],
-                    signal['macd'], signal['macd_signal'], signal['macd_hist'], signal['macd_hollow'],
-                    signal['lst_diff'], signal['supertrend'], signal['supertrend_trend'],
-                    signal['stoch_rsi'], signal['stoch_k'], signal['stoch_d'], signal['obv'],
-                    signal['message'], signal['timeframe'], signal['order_id'], signal['strategy']
-                ))
+                insert_signals(c, trade_rows, telemetry_rows)
                 conn.commit()
                 elapsed = time.time() - start_time
-                logger.info(f"Signal stored successfully in new database: action={signal['action']}, time={signal['time']}, db_write_time={elapsed:.3f}s")
+                logger.info(f"Signals stored successfully in new database: rows={len(signals)}, actions={actions}, db_write_time={elapsed:.3f}s")
             except Exception as e:
                 elapsed = time.time() - start_time
-                logger.error(f"Failed to store signal in forced new database after {elapsed:.3f}s: {e}")
+                logger.error(f"Failed to store {len(signals)} signals in forced new database after {elapsed:.3f}s: {e}")
                 if conn:
                     conn.close()
                     conn = None
 
+# Signals are committed in batches by a background writer; buy/sell rows wait for their commit
+signal_writer = SignalWriter(
+    write_signals,
+    batch_size=int(os.getenv("SIGNAL_BATCH_SIZE", 100)),
+    flush_seconds=float(os.getenv("SIGNAL_FLUSH_SECONDS", 1.0)),
+    max_queue=int(os.getenv("SIGNAL_QUEUE_SIZE", 10000)),
+    durable_actions=[a.strip() for a in os.getenv("SIGNAL_DURABLE_ACTIONS", "buy,sell").split(",") if a.strip()],
+)
+
+def store_signal(signal):
+    if signal is None:
+        return
+    signal_writer.submit(signal)
+
+# Drop telemetry older than TELEMETRY_RETENTION_DAYS
+def prune_telemetry():
+    if TELEMETRY_RETENTION_DAYS <= 0:
+        return
+    cutoff = int((time.time() - TELEMETRY_RETENTION_DAYS * 86400) * 1000)
+    with db_lock:
+        if conn is None:
+            return
+        deleted = conn.execute("DELETE FROM telemetry WHERE ts < ?", (cutoff,)).rowcount
+        conn.commit()
+    if deleted:
+        logger.info(f"Pruned {deleted} telemetry rows older than {TELEMETRY_RETENTION_DAYS} days")
+
 def get_performance():
-    global conn
     start_time = time.time()
-    with db_lock:
-        try:
-            if conn is None:
-                logger.warning("Database connection is None. Attempting to reinitialize.")
-                if not setup_database(first_attempt=True):
-                    logger.error("Failed to reinitialize database for performance")
-                    return "Database not initialized. Please try again later."
-            c = conn.cursor()
-            c.execute("SELECT COUNT(*) FROM trades")
-            trade_count = c.fetchone()[0]
-            if trade_count == 0:
+    try:
+        with read_pool.connection() as db:
+            c = db.cursor()
+            c.execute("SELECT EXISTS (SELECT 1 FROM trades)")
+            if not c.fetchone()[0]:
                 return "No trades available for performance analysis.\nLast Buy: 0.00\nLast Sell: 0.00"
 
             # Fetch last buy trade
-            c.execute("""
+            c.execute(f"""
                 SELECT symbol, price, time 
                 FROM trades 
-                WHERE action = 'buy' 
-                ORDER BY time DESC 
+                WHERE action = 'buy' AND {REPORTED_TRADES}
+                ORDER BY ts DESC 
                 LIMIT 1
             """)
             last_buy = c.fetchone()
@@ -1328,11 +1581,11 @@ def get_performance():
                            if last_buy else "BUY: 0.00")
 
             # Fetch last sell trade
-            c.execute("""
+            c.execute(f"""
                 SELECT symbol, price, time 
                 FROM trades 
-                WHERE action = 'sell' 
-                ORDER BY time DESC 
+                WHERE action = 'sell' AND {REPORTED_TRADES}
+                ORDER BY ts DESC 
                 LIMIT 1
             """)
             last_sell = c.fetchone()
@@ -1340,28 +1593,22 @@ def get_performance():
                             if last_sell else "SELL: 0.00")
 
             # Fetch performance by timeframe
-            c.execute("SELECT DISTINCT timeframe FROM trades")
+            c.execute(f"SELECT DISTINCT timeframe FROM trades WHERE {REPORTED_TRADES}")
             timeframes = [row[0] for row in c.fetchall()]
             message = "Perfm Stcs by Timeframe:\n"
             for tf in timeframes:
-                c.execute("""
-                    SELECT MIN(time), MAX(time), SUM(profit), SUM(return_profit), COUNT(*) 
+                # One range scan of idx_trades_timeframe_action_ts per timeframe
+                c.execute(f"""
+                    SELECT MIN(ts), MAX(ts), SUM(profit), SUM(return_profit), COUNT(*),
+                           COALESCE(SUM(profit < 0), 0)
                     FROM trades 
-                    WHERE action = 'sell' AND profit IS NOT NULL AND timeframe = ?
+                    WHERE timeframe = ? AND action = 'sell' AND profit IS NOT NULL AND {REPORTED_TRADES}
                 """, (tf,))
                 result = c.fetchone()
-                min_time, max_time, total_profit_db, total_return_profit_db, win_trades = (
-                    result if result else (None, None, None, None, 0)
+                min_ts, max_ts, total_profit_db, total_return_profit_db, win_trades, loss_trades = (
+                    result if result else (None, None, None, None, 0, 0)
                 )
-                c.execute("""
-                    SELECT COUNT(*) 
-                    FROM trades 
-                    WHERE action = 'sell' AND profit < 0 AND timeframe = ?
-                """, (tf,))
-                loss_trades = c.fetchone()[0]
-                duration = (datetime.strptime(max_time, "%Y-%m-%d %H:%M:%S") - 
-                           datetime.strptime(min_time, "%Y-%m-%d %H:%M:%S")).total_seconds() / 3600 \
-                           if min_time and max_time else "N/A"
+                duration = (max_ts - min_ts) / 3600000 if min_ts is not None and max_ts is not None else "N/A"
                 total_profit_db = round(float(total_profit_db), 2) if total_profit_db is not None else 0.00
                 total_return_profit_db = round(float(total_return_profit_db), 2) if total_return_profit_db is not None else 0.00
                 message += f"""
@@ -1378,36 +1625,29 @@ def get_performance():
             elapsed = time.time() - start_time
             logger.debug(f"Performance data fetched in {elapsed:.3f}s")
             return message
-        except Exception as e:
-            elapsed = time.time() - start_time
-            logger.error(f"Error fetching performance after {elapsed:.3f}s: {e}")
-            conn = None
-            return f"Error fetching performance data: {str(e)}"
+    except Exception as e:
+        elapsed = time.time() - start_time
+        logger.error(f"Error fetching performance after {elapsed:.3f}s: {e}")
+        return f"Error fetching performance data: {str(e)}"
 
 def get_trade_counts():
-    global conn
     start_time = time.time()
-    with db_lock:
-        try:
-            if conn is None:
-                logger.warning("Database connection is None. Attempting to reinitialize.")
-                if not setup_database(first_attempt=True):
-                    logger.error("Failed to reinitialize database for trade counts")
-                    return "Database not initialized. Please try again later."
-            c = conn.cursor()
-            c.execute("SELECT DISTINCT timeframe FROM trades")
+    try:
+        with read_pool.connection() as db:
+            c = db.cursor()
+            c.execute(f"SELECT DISTINCT timeframe FROM trades WHERE {REPORTED_TRADES}")
             timeframes = [row[0] for row in c.fetchall()]
             message = "Trade Counts by Timeframe:\n"
             for tf in timeframes:
-                c.execute("SELECT COUNT(*), SUM(profit), SUM(return_profit) FROM trades WHERE timeframe=?", (tf,))
+                c.execute(f"SELECT COUNT(*), SUM(profit), SUM(return_profit) FROM trades WHERE timeframe=? AND {REPORTED_TRADES}", (tf,))
                 total_trades, total_profit_db, total_return_profit_db = c.fetchone()
-                c.execute("SELECT COUNT(*) FROM trades WHERE action='buy' AND timeframe=?", (tf,))
+                c.execute(f"SELECT COUNT(*) FROM trades WHERE action='buy' AND timeframe=? AND {REPORTED_TRADES}", (tf,))
                 buy_trades = c.fetchone()[0]
-                c.execute("SELECT COUNT(*) FROM trades WHERE action='sell' AND timeframe=?", (tf,))
+                c.execute(f"SELECT COUNT(*) FROM trades WHERE action='sell' AND timeframe=? AND {REPORTED_TRADES}", (tf,))
                 sell_trades = c.fetchone()[0]
-                c.execute("SELECT COUNT(*) FROM trades WHERE action='sell' AND profit > 0 AND timeframe=?", (tf,))
+                c.execute(f"SELECT COUNT(*) FROM trades WHERE action='sell' AND profit > 0 AND timeframe=? AND {REPORTED_TRADES}", (tf,))
                 win_trades = c.fetchone()[0]
-                c.execute("SELECT COUNT(*) FROM trades WHERE action='sell' AND profit < 0 AND timeframe=?", (tf,))
+                c.execute(f"SELECT COUNT(*) FROM trades WHERE action='sell' AND profit < 0 AND timeframe=? AND {REPORTED_TRADES}", (tf,))
                 loss_trades = c.fetchone()[0]
                 total_profit_db = total_profit_db if total_profit_db is not None else 0
                 total_return_profit_db = total_return_profit_db if total_return_profit_db is not None else 0
@@ -1424,12 +1664,11 @@ Total Return Profit: {total_return_profit_db:.2f}
             elapsed = time.time() - start_time
             logger.debug(f"Trade counts fetched in {elapsed:.3f}s")
             return message
-        except Exception as e:
-            elapsed = time.time() - start_time
-            logger.error(f"Error fetching trade counts after {elapsed:.3f}s: {e}")
-            conn = None
-            return f"Error fetching trade counts: {str(e)}"
-            
+    except Exception as e:
+        elapsed = time.time() - start_time
+        logger.error(f"Error fetching trade counts after {elapsed:.3f}s: {e}")
+        return f"Error fetching trade counts: {str(e)}"
+        
 def safe_float(val, default=0.00):
     try:
         return float(val)
@@ -1439,74 +1678,73 @@ def safe_float(val, default=0.00):
 # Flask routes
 @app.route('/')
 def index():
-    global conn, stop_time
+    global stop_time
     status = "active" if bot_active else "stopped"
     start_time = time.time()
-    with db_lock:
+    try:
         try:
-            if conn is None:
-                logger.warning("Database connection is None in index route. Attempting to reinitialize.")
-                if not setup_database(first_attempt=True):
-                    logger.error("Failed to reinitialize database for index route")
-                    stop_time_str = stop_time.strftime("%Y-%m-%d %H:%M:%S") if stop_time else "N/A"
-                    current_time = datetime.now(EU_TZ).strftime("%Y-%m-%d %H:%M:%S")
-                    return render_template(
-                        'index.html',
-                        signal=None,
-                        status=status,
-                        timeframe=TIMEFRAME,
-                        trades=[],
-                        stop_time=stop_time_str,
-                        current_time=current_time,
-                        background='white'
-                    ), 503
-
-            c = conn.cursor()
-            c.execute("SELECT * FROM trades ORDER BY time DESC LIMIT 10")  # Changed to LIMIT 10
-            rows = c.fetchall()
-            columns = [col[0] for col in c.description]
-            trades = [dict(zip(columns, row)) for row in rows]
-
-            numeric_fields = [
-                'price', 'open_price', 'close_price', 'volume', 'percent_change', 'stop_loss',
-                'take_profit', 'profit', 'total_profit', 'return_profit', 'total_return_profit',
-                'ema1', 'ema2', 'rsi', 'k', 'd', 'j', 'diff', 'diff1e', 'diff2m', 'diff3k',
-                'macd', 'macd_signal', 'macd_hist', 'macd_hollow', 'lst_diff', 'supertrend',
-                'stoch_rsi', 'stoch_k', 'stoch_d', 'obv'
-            ]
-
-            for trade in trades:
-                logger.debug(f"Index Trade ID {trade['id']}: action={trade['action']}, message={trade['message']}, supertrend_trend={trade['supertrend_trend']}")
-                for field in numeric_fields:
-                    trade[field] = safe_float(trade.get(field))
-
-            signal = trades[0] if trades else None
+            with read_pool.connection() as db:
+                c = db.cursor()
+                c.execute(f"SELECT * FROM trades WHERE {REPORTED_TRADES} ORDER BY ts DESC LIMIT 10")  # Changed to LIMIT 10
+                rows = c.fetchall()
+                columns = [col[0] for col in c.description]
+        except sqlite3.OperationalError as e:
+            logger.error(f"Database unavailable for index route: {e}")
             stop_time_str = stop_time.strftime("%Y-%m-%d %H:%M:%S") if stop_time else "N/A"
             current_time = datetime.now(EU_TZ).strftime("%Y-%m-%d %H:%M:%S")
-
-            elapsed = time.time() - start_time
-            logger.info(
-                f"Rendering index.html: status={status}, timeframe={TIMEFRAME}, trades={len(trades)}, "
-                f"signal_exists={signal is not None}, signal_time={signal['time'] if signal else 'None'}, "
-                f"query_time={elapsed:.3f}s"
-            )
-
             return render_template(
                 'index.html',
-                signal=signal,
+                signal=None,
                 status=status,
                 timeframe=TIMEFRAME,
-                trades=trades,
+                trades=[],
                 stop_time=stop_time_str,
                 current_time=current_time,
                 background='white'
-            )
+            ), 503
 
-        except Exception as e:
-            elapsed = time.time() - start_time
-            logger.error(f"Error rendering index.html after {elapsed:.3f}s: {e}")
-            return jsonify({"error": f"Internal server error: {str(e)}"}), 500
-            
+        trades = [dict(zip(columns, row)) for row in rows]
+
+        numeric_fields = [
+            'price', 'open_price', 'close_price', 'volume', 'percent_change', 'stop_loss',
+            'take_profit', 'profit', 'total_profit', 'return_profit', 'total_return_profit',
+            'ema1', 'ema2', 'rsi', 'k', 'd', 'j', 'diff', 'diff1e', 'diff2m', 'diff3k',
+            'macd', 'macd_signal', 'macd_hist', 'macd_hollow', 'lst_diff', 'supertrend',
+            'stoch_rsi', 'stoch_k', 'stoch_d', 'obv'
+        ]
+
+        for trade in trades:
+            logger.debug(f"Index Trade ID {trade['id']}: action={trade['action']}, message={trade['message']}, supertrend_trend={trade['supertrend_trend']}")
+            for field in numeric_fields:
+                trade[field] = safe_float(trade.get(field))
+
+        signal = trades[0] if trades else None
+        stop_time_str = stop_time.strftime("%Y-%m-%d %H:%M:%S") if stop_time else "N/A"
+        current_time = datetime.now(EU_TZ).strftime("%Y-%m-%d %H:%M:%S")
+
+        elapsed = time.time() - start_time
+        logger.info(
+            f"Rendering index.html: status={status}, timeframe={TIMEFRAME}, trades={len(trades)}, "
+            f"signal_exists={signal is not None}, signal_time={signal['time'] if signal else 'None'}, "
+            f"query_time={elapsed:.3f}s"
+        )
+
+        return render_template(
+            'index.html',
+            signal=signal,
+            status=status,
+            timeframe=TIMEFRAME,
+            trades=trades,
+            stop_time=stop_time_str,
+            current_time=current_time,
+            background='white'
+        )
+
+    except Exception as e:
+        elapsed = time.time() - start_time
+        logger.error(f"Error rendering index.html after {elapsed:.3f}s: {e}")
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+        
 @app.route('/status')
 def status():
     global bot_active, pause_start, pause_duration, stop_time
@@ -1522,13 +1760,19 @@ def status():
         return jsonify({
             "status": status,
             "stop_time": stop_time_str,
-            "current_time": datetime.now(EU_TZ).strftime("%Y-%m-%d %H:%M:%S")
+            "current_time": datetime.now(EU_TZ).strftime("%Y-%m-%d %H:%M:%S"),
+            "circuit_breakers": breaker_status(),
+            "signal_writer": signal_writer.status()
         })
     except Exception as e:
         elapsed = time.time() - start_time
         logger.error(f"Error in /status route after {elapsed:.3f}s: {e}")
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
+@app.route('/scan')
+def scan():
+    return jsonify({"timeframe": TIMEFRAME, "symbols": scan_results})
+
 @app.route('/performance')
 def performance():
     start_time = time.time()
@@ -1544,52 +1788,44 @@ def performance():
 
 @app.route('/trades')
 def trades():
-    global conn
     start_time = time.time()
-    with db_lock:
-        try:
-            if conn is None:
-                logger.warning("Database connection is None in trades route. Attempting to reinitialize.")
-                if not setup_database(first_attempt=True):
-                    logger.error("Failed to reinitialize database for trades route")
-                    return jsonify({"error": "Database unavailable. Please try again later."}), 503
-
-            c = conn.cursor()
-            c.execute("SELECT * FROM trades ORDER BY time DESC LIMIT 10")  # Changed to LIMIT 10
+    try:
+        with read_pool.connection() as db:
+            c = db.cursor()
+            c.execute(f"SELECT * FROM trades WHERE {REPORTED_TRADES} ORDER BY ts DESC LIMIT 10")  # Changed to LIMIT 10
             rows = c.fetchall()
             columns = [col[0] for col in c.description]
-            trades = [dict(zip(columns, row)) for row in rows]
+        trades = [dict(zip(columns, row)) for row in rows]
 
-            numeric_fields = [
-                'price', 'open_price', 'close_price', 'volume', 'percent_change', 'stop_loss',
-                'take_profit', 'profit', 'total_profit', 'return_profit', 'total_return_profit',
-                'ema1', 'ema2', 'rsi', 'k', 'd', 'j', 'diff', 'diff1e', 'diff2m', 'diff3k',
-                'macd', 'macd_signal', 'macd_hist', 'macd_hollow', 'lst_diff', 'supertrend',
-                'stoch_rsi', 'stoch_k', 'stoch_d', 'obv'
-            ]
+        numeric_fields = [
+            'price', 'open_price', 'close_price', 'volume', 'percent_change', 'stop_loss',
+            'take_profit', 'profit', 'total_profit', 'return_profit', 'total_return_profit',
+            'ema1', 'ema2', 'rsi', 'k', 'd', 'j', 'diff', 'diff1e', 'diff2m', 'diff3k',
+            'macd', 'macd_signal', 'macd_hist', 'macd_hollow', 'lst_diff', 'supertrend',
+            'stoch_rsi', 'stoch_k', 'stoch_d', 'obv'
+        ]
 
-            for trade in trades:
-                logger.debug(f"Trades Route ID {trade['id']}: action={trade['action']}, message={trade['message']}, supertrend_trend={trade['supertrend_trend']}")
-                for field in numeric_fields:
-                    trade[field] = safe_float(trade.get(field))
+        for trade in trades:
+            logger.debug(f"Trades Route ID {trade['id']}: action={trade['action']}, message={trade['message']}, supertrend_trend={trade['supertrend_trend']}")
+            for field in numeric_fields:
+                trade[field] = safe_float(trade.get(field))
 
-            elapsed = time.time() - start_time
-            logger.info(f"Fetched trades for /trades: count={len(trades)}, query_time={elapsed:.3f}s")
-            return jsonify(trades)
+        elapsed = time.time() - start_time
+        logger.info(f"Fetched trades for /trades: count={len(trades)}, query_time={elapsed:.3f}s")
+        return jsonify(trades)
 
-        except sqlite3.OperationalError as e:
-            elapsed = time.time() - start_time
-            logger.error(f"Database error in /trades route after {elapsed:.3f}s: {e}")
-            return jsonify({"error": f"Database error: {str(e)}"}), 500
-        except Exception as e:
-            elapsed = time.time() - start_time
-            logger.error(f"Error in /trades route after {elapsed:.3f}s: {e}")
-            return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+    except sqlite3.OperationalError as e:
+        elapsed = time.time() - start_time
+        logger.error(f"Database error in /trades route after {elapsed:.3f}s: {e}")
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+    except Exception as e:
+        elapsed = time.time() - start_time
+        logger.error(f"Error in /trades route after {elapsed:.3f}s: {e}")
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
 @app.route('/trade_record', methods=['GET', 'POST'])
 ###@login_required
 def trade_record():
-    global conn
     start_time = time.time()
     page = int(request.args.get('page', 1))
     per_page = 50
@@ -1610,14 +1846,8 @@ def trade_record():
             return None
 
     try:
-        with db_lock:
-            if conn is None:
-                logger.warning("DB connection is None in trade_record route, attempting to reinit.")
-                if not setup_database(first_attempt=True):
-                    logger.error("Failed to reinitialize DB for trade_record")
-                    return jsonify({"error": "Database unavailable."}), 503
-
-            c = conn.cursor()
+        with read_pool.connection() as db:
+            c = db.cursor()
 
             # Build & execute query (search)
             if request.method == 'POST' and search_column and search_value:
@@ -1634,18 +1864,18 @@ def trade_record():
                         query = f"""
                             SELECT * FROM trades
                             WHERE {search_column} BETWEEN ? AND ?
-                            ORDER BY time DESC LIMIT ? OFFSET ?
+                            ORDER BY ts DESC LIMIT ? OFFSET ?
                         """
                         params = (val - 0.0001, val + 0.0001, per_page, offset)
                     except ValueError:
-                        query = f"SELECT * FROM trades WHERE CAST({search_column} AS TEXT) LIKE ? ORDER BY time DESC LIMIT ? OFFSET ?"
+                        query = f"SELECT * FROM trades WHERE CAST({search_column} AS TEXT) LIKE ? ORDER BY ts DESC LIMIT ? OFFSET ?"
                         params = (f'%{search_value}%', per_page, offset)
                 else:
-                    query = f"SELECT * FROM trades WHERE {search_column} LIKE ? ORDER BY time DESC LIMIT ? OFFSET ?"
+                    query = f"SELECT * FROM trades WHERE {search_column} LIKE ? ORDER BY ts DESC LIMIT ? OFFSET ?"
                     params = (f'%{search_value}%', per_page, offset)
                 c.execute(query, params)
             else:
-                c.execute("SELECT * FROM trades ORDER BY time DESC LIMIT ? OFFSET ?", (per_page, offset))
+                c.execute("SELECT * FROM trades ORDER BY ts DESC LIMIT ? OFFSET ?", (per_page, offset))
 
             rows = c.fetchall()
             db_columns = [desc[0] for desc in c.description]
@@ -1753,6 +1983,9 @@ def trade_record():
 # Start background threads
 def start_background_threads():
     global bot_thread
+    signal_writer.start()
+    logger.info("Signal writer thread started")
+
     keep_alive_thread = threading.Thread(target=keep_alive, daemon=True)
     keep_alive_thread.start()
     logger.info("Keep-alive thread started")
@@ -1761,10 +1994,34 @@ def start_background_threads():
     db_backup_thread.start()
     logger.info("Database backup thread started")
 
+    ledger_thread = threading.Thread(target=ledger_reconciler, daemon=True)
+    ledger_thread.start()
+    logger.info("Account ledger reconciliation thread started")
+
     bot_thread = threading.Thread(target=trading_bot, daemon=True)
     bot_thread.start()
     logger.info("Trading bot thread started")
 
+    if INTRABAR_MONITOR_SECONDS > 0:
+        monitor_thread = threading.Thread(target=position_monitor, daemon=True)
+        monitor_thread.start()
+        logger.info(f"Intrabar position monitor started, checking every {INTRABAR_MONITOR_SECONDS}s")
+
+    if EXTRA_TIMEFRAMES:
+        timeframe_thread = threading.Thread(target=timeframe_feed, daemon=True)
+        timeframe_thread.start()
+        logger.info(f"Timeframe feed thread started for {', '.join(EXTRA_TIMEFRAMES)}")
+
+    for spec in TRADE_BARS:
+        trade_bar_thread = threading.Thread(target=trade_bar_feed, args=(spec,), daemon=True)
+        trade_bar_thread.start()
+        logger.info(f"Trade bar thread started for {spec}")
+
+    if SCAN_SYMBOLS:
+        scanner_thread = threading.Thread(target=market_scanner, daemon=True)
+        scanner_thread.start()
+        logger.info(f"Market scanner thread started for {len(SCAN_SYMBOLS)} symbols")
+
 # Async main function to initialize bot
 async def main():
     start_background_threads()
@@ -1776,6 +2033,9 @@ async def main():
 # Cleanup on exit
 def cleanup():
     global conn
+    # Commit the queued signals before the connection goes away
+    signal_writer.stop()
+    read_pool.invalidate()
     with db_lock:
         if conn is not None:
             try:
@@ -1788,6 +2048,7 @@ def cleanup():
                 logger.error(f"Error during cleanup: {e}")
             finally:
                 conn = None
+    candle_store.close()
 
 atexit.register(cleanup)
 
@@ -19,6 +19,7 @@ from flask import Flask, render_template, jsonify, request
 import atexit
 import asyncio
 from dotenv import load_dotenv
+from indicators import supertrend_final_bands
 
 pd.set_option('future.no_silent_downcasting', True)
 
@@ -513,18 +514,9 @@ def add_technical_indicators(df):
         hl2 = (df['High'] + df['Low']) / 2
         basic_upperband = hl2 + (st_multiplier * atr)
         basic_lowerband = hl2 - (st_multiplier * atr)
-        final_upperband = basic_upperband.copy()
-        final_lowerband = basic_lowerband.copy()
-
-        for i in range(1, len(df)):
-            if (basic_upperband.iloc[i] < final_upperband.iloc[i-1]) or (df['Close'].iloc[i-1] > final_upperband.iloc[i-1]):
-                final_upperband.iloc[i] = basic_upperband.iloc[i]
-            else:
-                final_upperband.iloc[i] = final_upperband.iloc[i-1]
-            if (basic_lowerband.iloc[i] > final_lowerband.iloc[i-1]) or (df['Close'].iloc[i-1] < final_lowerband.iloc[i-1]):
-                final_lowerband.iloc[i] = basic_lowerband.iloc[i]
-            else:
-                final_lowerband.iloc[i] = final_lowerband.iloc[i-1]
+        final_upperband, final_lowerband = supertrend_final_bands(basic_upperband, basic_lowerband, df['Close'])
+        final_upperband = pd.Series(final_upperband, index=df.index)
+        final_lowerband = pd.Series(final_lowerband, index=df.index)
 
         supertrend = final_upperband.where(df['Close'] <= final_upperband, final_lowerband)
         supertrend_trend = df['Close'] > final_upperband.shift()
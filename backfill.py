@@ -0,0 +1,189 @@
+# backfill.py
+# Bulk download of historical candles for backtesting.
+#
+# History is stored column by column, one file per symbol, timeframe and
+# calendar month: <root>/<BTC-USDT>/<1m>/<2024-01>.npz holds int64 timestamps
+# and float64 Open/High/Low/Close/Volume arrays, at most 48 bytes a candle
+# before compression. Each file also records `until`, the end of the time it
+# covers, and is written atomically once all of its pages are in, so an
+# interrupted backfill resumes from the months it had not finished.
+#
+# Every page (`since`, limit=1000) of a batch of months is known up front, so
+# pages for all symbols are fetched concurrently through AsyncOhlcvFetcher,
+# within the exchange's request weight budget.
+#
+# Usage: python backfill.py BTC/USDT ETH/USDT --timeframe 1m --since 2023-01-01 [--until 2024-01-01]
+import argparse
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from candle_store import MAX_FETCH
+from candles import timeframe_ms
+from fetcher import AsyncOhlcvFetcher
+from indicators import OHLCV_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+HISTORY_ROOT = 'history'
+
+
+def symbol_dir(root, symbol, timeframe):
+    return os.path.join(root, symbol.replace('/', '-').replace(':', '_'), timeframe)
+
+
+def month_start(ms):
+    moment = datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+    return int(datetime(moment.year, moment.month, 1, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def next_month(ms):
+    moment = datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+    year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+    return int(datetime(year, month, 1, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def month_path(root, symbol, timeframe, start):
+    name = datetime.fromtimestamp(start / 1000, tz=timezone.utc).strftime('%Y-%m')
+    return os.path.join(symbol_dir(root, symbol, timeframe), f"{name}.npz")
+
+
+def read_month(path):
+    """(columns, until) of a month file, or (None, None) if it does not exist."""
+    if not os.path.exists(path):
+        return None, None
+    with np.load(path) as data:
+        return {col: data[col] for col in ['timestamp'] + OHLCV_COLUMNS}, int(data['until'])
+
+
+def write_month(path, candles, until, existing=None):
+    """Store candles (plus those already in the file) as columns, sorted and unique by timestamp."""
+    array = np.array(candles, dtype=np.float64).reshape(-1, 6)
+    timestamps = array[:, 0].astype(np.int64)
+    columns = {'timestamp': timestamps, **{col: array[:, i + 1] for i, col in enumerate(OHLCV_COLUMNS)}}
+    if existing is not None:
+        columns = {col: np.concatenate([existing[col], values]) for col, values in columns.items()}
+    _, keep = np.unique(columns['timestamp'], return_index=True)
+    columns = {col: values[keep] for col, values in columns.items()}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path[:-4]}.tmp.npz"
+    np.savez_compressed(tmp_path, until=np.int64(until), **columns)
+    os.replace(tmp_path, path)
+    return len(keep)
+
+
+def load_history(symbol, timeframe, root=HISTORY_ROOT, since=None, until=None):
+    """Backfilled candles as a dict of 'timestamp'/'Open'/.../'Volume' arrays, oldest first."""
+    directory = symbol_dir(root, symbol, timeframe)
+    names = sorted(name for name in os.listdir(directory) if name.endswith('.npz') and '.tmp' not in name) if os.path.isdir(directory) else []
+    parts = [read_month(os.path.join(directory, name))[0] for name in names]
+    columns = {
+        col: np.concatenate([part[col] for part in parts]) if parts else np.empty(0, dtype=np.int64 if col == 'timestamp' else np.float64)
+        for col in ['timestamp'] + OHLCV_COLUMNS
+    }
+    mask = np.ones(len(columns['timestamp']), dtype=bool)
+    if since is not None:
+        mask &= columns['timestamp'] >= since
+    if until is not None:
+        mask &= columns['timestamp'] <= until
+    return {col: values[mask] for col, values in columns.items()}
+
+
+def backfill(fetcher, symbols, timeframe, since, until=None, root=HISTORY_ROOT, batch_pages=200):
+    """Download [since, until) for every symbol, skipping months already stored. Returns candles written."""
+    tf_millis = timeframe_ms(timeframe)
+    now_ms = int(time.time() * 1000)
+    # Exclusive end of the newest closed candle
+    end = min(until or now_ms, now_ms) // tf_millis * tf_millis
+    since = since // tf_millis * tf_millis
+
+    # Skip the years before a symbol was listed: the exchange answers with its first candles
+    starts = {}
+    for symbol, _, ohlcv in fetcher.fetch_iter([(symbol, timeframe, 1, since) for symbol in symbols]):
+        if ohlcv is None:
+            logger.warning(f"Skipping {symbol}: could not find where its {timeframe} history starts")
+            continue
+        starts[symbol] = max(since, ohlcv[0][0]) if ohlcv else end
+        if ohlcv and ohlcv[0][0] > since:
+            logger.info(f"{symbol} {timeframe} history starts at {datetime.fromtimestamp(ohlcv[0][0] / 1000, tz=timezone.utc):%Y-%m-%d}")
+
+    # (symbol, month start, fetch from, month end, columns already stored)
+    months = []
+    for symbol, first in starts.items():
+        start = month_start(first)
+        while first < end and start < end:
+            stop = min(next_month(start), end)
+            existing, covered = read_month(month_path(root, symbol, timeframe, start))
+            begin = max(start, first, covered or start)
+            if begin < stop:
+                months.append((symbol, start, begin, stop, existing))
+            start = next_month(start)
+    pages_per_month = [max(1, -(-(stop - begin) // (MAX_FETCH * tf_millis))) for _, _, begin, stop, _ in months]
+    logger.info(f"Backfilling {len(months)} months ({sum(pages_per_month)} pages) of {timeframe} candles for {len(symbols)} symbols")
+
+    written = 0
+    batch, pages = [], 0
+    for month, month_pages in zip(months + [None], pages_per_month + [0]):
+        if month is not None and (pages + month_pages <= batch_pages or not batch):
+            batch.append(month)
+            pages += month_pages
+            continue
+        if batch:
+            written += _fetch_batch(fetcher, batch, timeframe, root)
+        batch, pages = ([month], month_pages) if month is not None else ([], 0)
+    return written
+
+
+def _fetch_batch(fetcher, batch, timeframe, root):
+    tf_millis = timeframe_ms(timeframe)
+    requests = []
+    for symbol, _, begin, stop, _ in batch:
+        for page in range(begin, stop, MAX_FETCH * tf_millis):
+            requests.append((symbol, timeframe, min(MAX_FETCH, (stop - page) // tf_millis), page))
+    received = {}
+    failed = set()
+    start_time = time.time()
+    for symbol, _, ohlcv in fetcher.fetch_iter(requests):
+        if ohlcv is None:
+            failed.add(symbol)
+        else:
+            received.setdefault(symbol, []).extend(ohlcv)
+    written = 0
+    for symbol, start, begin, stop, existing in batch:
+        if symbol in failed:
+            continue
+        candles = [c for c in received.get(symbol, []) if begin <= c[0] < stop]
+        rows = write_month(month_path(root, symbol, timeframe, start), candles, stop, existing)
+        written += len(candles)
+        logger.debug(f"{symbol} {timeframe} {datetime.fromtimestamp(start / 1000, tz=timezone.utc):%Y-%m}: {rows} candles")
+    if failed:
+        logger.warning(f"Fetch failed for {sorted(failed)}; their months in this batch are left for the next run")
+    logger.info(f"Fetched {len(requests)} pages, {written} candles in {time.time() - start_time:.2f}s")
+    return written
+
+
+def parse_date(value):
+    return int(datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download historical candles into monthly columnar files")
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--timeframe', default='1m')
+    parser.add_argument('--since', required=True, type=parse_date, help="YYYY-MM-DD (UTC)")
+    parser.add_argument('--until', type=parse_date, help="YYYY-MM-DD (UTC), default now")
+    parser.add_argument('--root', default=HISTORY_ROOT)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--weight-per-minute', type=int, default=2400, help="share of the exchange's request weight budget to use")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    fetcher = AsyncOhlcvFetcher(max_concurrency=args.concurrency, weight_per_minute=args.weight_per_minute)
+    try:
+        total = backfill(fetcher, args.symbols, args.timeframe, args.since, args.until, args.root)
+        logger.info(f"Backfill done: {total} candles written under {args.root}")
+    finally:
+        fetcher.close()
@@ -0,0 +1,270 @@
+# bench_indicators.py
+# Times every indicator column and checks the streaming
+# IndicatorEngine and the batch_indicators panel path against the
+# pandas_ta-based output they replace. Run it before swapping in any other
+# indicator implementation: a non-exact column fails the run.
+#
+# The reference stages below are the pandas_ta add_technical_indicators that
+# app.py ran before the engine, split per indicator so each one can be timed on
+# its own. tests/test_indicators.py checks the engine against them in pytest.
+#
+# With --float32, the float32 compact CandleBuffer is also checked against
+# float64 within the FLOAT32_* bounds documented in candles.py.
+#
+# Usage: python bench_indicators.py [--bars N ...] [--symbols N ...] [--max-cells N] [--float32]
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pandas_ta as ta
+
+from bench_supertrend import basic_bands, synthetic_ohlcv
+from candles import FLOAT32_BRANCH_FLIPS, FLOAT32_LAZY_RTOL, FLOAT32_RTOL, TEXT_COLUMNS, CandleBuffer
+from indicators import (
+    EMA1_LENGTH, EMA2_LENGTH, INDICATORS, INDICATOR_COLUMNS, KDJ_LENGTH, KDJ_SIGNAL, MACD_FAST, MACD_SIGNAL,
+    MACD_SLOW, OHLCV_COLUMNS, RSI_LENGTH, STOCH_D_LENGTH, STOCH_K_LENGTH, STOCH_RSI_LENGTH, IndicatorEngine,
+    batch_indicators, supertrend_final_bands,
+)
+
+
+def _ref_supertrend(df):
+    basic_upperband, basic_lowerband = basic_bands(df)
+    final_upperband, final_lowerband = supertrend_final_bands(basic_upperband, basic_lowerband, df['Close'])
+    final_upperband = pd.Series(final_upperband, index=df.index)
+    final_lowerband = pd.Series(final_lowerband, index=df.index)
+    trend = (df['Close'] > final_upperband.shift()).fillna(True)
+    return {
+        'supertrend': final_upperband.where(df['Close'] <= final_upperband, final_lowerband),
+        'supertrend_trend': np.where(trend, 'Up', 'Down'),
+        'supertrend_signal': np.where(
+            trend & ~trend.shift(fill_value=True), 'buy',
+            np.where(~trend & trend.shift(fill_value=True), 'sell', None)
+        ),
+    }
+
+
+def _ref_stoch_rsi(df):
+    rsi = df['rsi'].ffill()
+    rsi_min = rsi.rolling(STOCH_RSI_LENGTH, min_periods=1).min()
+    rsi_max = rsi.rolling(STOCH_RSI_LENGTH, min_periods=1).max()
+    stochrsi = (rsi - rsi_min) / (rsi_max - rsi_min + 1e-12)
+    stoch_k = stochrsi.rolling(STOCH_K_LENGTH, min_periods=1).mean() * 100
+    return {'stoch_rsi': stochrsi, 'stoch_k': stoch_k, 'stoch_d': stoch_k.rolling(STOCH_D_LENGTH, min_periods=1).mean()}
+
+
+def _ref_macd_hollow(df):
+    hist, prev = df['macd_hist'], df['macd_hist'].shift(1)
+    hollow = pd.Series(0.0, index=df.index)
+    hollow[(hist > 0) & (hist > prev)] = hist
+    hollow[(hist < 0) & (hist < prev)] = hist
+    return {'macd_hollow': hollow}
+
+
+def _ref_kdj(df):
+    kdj = ta.kdj(df['High'], df['Low'], df['Close'], length=KDJ_LENGTH, signal=KDJ_SIGNAL)
+    suffix = f"{KDJ_LENGTH}_{KDJ_SIGNAL}"
+    return {'k': kdj[f'K_{suffix}'], 'd': kdj[f'D_{suffix}'], 'j': kdj[f'J_{suffix}']}
+
+
+def _ref_macd(df):
+    macd = ta.macd(df['Close'], fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL)
+    suffix = f"{MACD_FAST}_{MACD_SLOW}_{MACD_SIGNAL}"
+    return {'macd': macd[f'MACD_{suffix}'], 'macd_signal': macd[f'MACDs_{suffix}'], 'macd_hist': macd[f'MACDh_{suffix}']}
+
+
+# pandas_ta reference for each INDICATORS entry; each stage may read the columns of earlier stages
+REFERENCE = {
+    'ema1': lambda df: {'ema1': ta.ema(df['Close'], length=EMA1_LENGTH)},
+    'ema2': lambda df: {'ema2': ta.ema(df['Close'], length=EMA2_LENGTH)},
+    'rsi': lambda df: {'rsi': ta.rsi(df['Close'], length=RSI_LENGTH)},
+    'kdj': _ref_kdj,
+    'macd': _ref_macd,
+    'diff': lambda df: {'diff': df['Close'] - df['Open']},
+    'diff1e': lambda df: {'diff1e': df['ema1'] - df['ema2']},
+    'diff2m': lambda df: {'diff2m': df['macd'] - df['macd_signal']},
+    'diff3k': lambda df: {'diff3k': df['j'] - df['d']},
+    'lst_diff': lambda df: {'lst_diff': df['ema1'].shift(1) - df['ema1']},
+    'macd_hollow': _ref_macd_hollow,
+    'supertrend': _ref_supertrend,
+    'stoch_rsi': _ref_stoch_rsi,
+    'obv': lambda df: {'obv': (np.sign(df['Close'].diff().fillna(0)) * df['Volume']).fillna(0).cumsum()},
+}
+
+
+def reference_indicators(df):
+    """pandas_ta output for every indicator column, plus the time spent per indicator."""
+    df = df.copy()
+    for col in ['Close', 'High', 'Low', 'Volume']:
+        df[col] = df[col].ffill()
+    timings = {}
+    for name, stage in REFERENCE.items():
+        start = time.perf_counter()
+        for col, values in stage(df).items():
+            df[col] = values
+        timings[name] = time.perf_counter() - start
+    return df, timings
+
+
+def engine_timings(df):
+    """Time each IndicatorEngine node alone, fed bars that already hold its inputs."""
+    full = IndicatorEngine().warmup(df)
+    bars = full.to_dict('records')
+    timings = {}
+    for name, spec in INDICATORS.items():
+        node = spec.factory()
+        start = time.perf_counter()
+        for bar in bars:
+            node.update(bar)
+        timings[name] = time.perf_counter() - start
+    return full, timings
+
+
+def compare(expected, actual):
+    """None when the column matches exactly, otherwise a short description of the difference."""
+    expected, actual = np.asarray(expected), np.asarray(actual)
+    if expected.dtype == object or actual.dtype == object:
+        mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+        return f"{mismatches} labels differ" if mismatches else None
+    expected, actual = expected.astype(float), actual.astype(float)
+    if np.array_equal(expected, actual, equal_nan=True):
+        return None
+    nan_mismatches = int((np.isnan(expected) != np.isnan(actual)).sum())
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rel = np.nanmax(np.abs(expected - actual) / np.maximum(np.abs(expected), 1e-300))
+    return f"max rel diff {rel:.3g}, {nan_mismatches} NaN mismatches"
+
+
+def parity(expected, actual, label):
+    failures = [(col, diff) for col in INDICATOR_COLUMNS if (diff := compare(expected[col], actual[col]))]
+    for col, diff in failures:
+        print(f"  {label} {col}: {diff}")
+    return not failures
+
+
+def run_indicators(bars):
+    df = synthetic_ohlcv(bars)
+    expected, ref_times = reference_indicators(df)
+    actual, engine_times = engine_timings(df)
+    print(f"bars={bars}")
+    print(f"  {'indicator':<12} {'pandas_ta':>12} {'engine':>12} {'engine/bar':>12}")
+    for name in INDICATORS:
+        print(f"  {name:<12} {ref_times[name] * 1000:10.2f}ms {engine_times[name] * 1000:10.2f}ms "
+              f"{engine_times[name] / bars * 1e6:10.2f}us")
+    print(f"  {'total':<12} {sum(ref_times.values()) * 1000:10.2f}ms {sum(engine_times.values()) * 1000:10.2f}ms")
+    exact = parity(expected, actual, 'engine')
+    print(f"  engine parity exact={exact}")
+    return exact
+
+
+def within_scale(expected, actual, rtol):
+    """Largest float32 error relative to the column's scale, and whether it is within rtol."""
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    if (np.isnan(expected) != np.isnan(actual)).any():
+        return np.inf, False
+    scale = np.nanmax(np.abs(expected)) if not np.isnan(expected).all() else 0.0
+    error = np.nanmax(np.abs(expected - actual)) / scale if scale else 0.0
+    return error, error <= rtol
+
+
+def run_compact(bars):
+    df = synthetic_ohlcv(bars, price=60000.0)
+    expected = IndicatorEngine().warmup(df)
+
+    eager = CandleBuffer(bars, dtype=np.float32)
+    eager.extend(expected)
+    engine = IndicatorEngine(columns=['Close'])
+    lazy = CandleBuffer(bars, engine=engine, dtype=np.float32)
+    for ts, o, h, l, c, v in zip(df.index, df['Open'], df['High'], df['Low'], df['Close'], df['Volume']):
+        # Evaluated every bar, as create_signal does in the live loop
+        lazy.append(ts, {'Open': o, 'High': h, 'Low': l, 'Close': c, 'Volume': v, **engine.update(o, h, l, c, v)})
+        lazy.row(-1, INDICATOR_COLUMNS)
+
+    exact = True
+    worst = {}
+    for col in INDICATOR_COLUMNS:
+        if col in TEXT_COLUMNS:
+            for label, candles in (('eager', eager), ('lazy', lazy)):
+                if diff := compare(expected[col], candles.column(col)):
+                    print(f"  float32 {label} {col}: {diff}")
+                    exact = False
+            continue
+        eager_error, eager_ok = within_scale(expected[col], eager.column(col), FLOAT32_RTOL)
+        lazy_values = np.asarray(lazy.column(col), dtype=float)
+        if col == 'macd_hollow':
+            # Near-tie histogram moves may take the other branch; compare the rest
+            reference = expected[col].to_numpy()
+            flipped = (reference == 0) != (lazy_values == 0)
+            lazy_values = np.where(flipped, reference, lazy_values)
+            if flipped.mean() > FLOAT32_BRANCH_FLIPS:
+                print(f"  float32 {col}: {int(flipped.sum())} of {bars} bars took the other branch")
+                exact = False
+        lazy_error, lazy_ok = within_scale(expected[col], lazy_values, FLOAT32_LAZY_RTOL)
+        worst[col] = (eager_error, lazy_error)
+        if not (eager_ok and lazy_ok):
+            print(f"  float32 {col}: eager {eager_error:.3g}, lazy {lazy_error:.3g}")
+            exact = False
+
+    full = CandleBuffer(bars)
+    full.extend(expected)
+    timings = {}
+    for label, candles in (('float64', full), ('float32', eager)):
+        nbytes = sum(values.nbytes for values in candles.data.values() if values.dtype != object)
+        start = time.perf_counter()
+        for _ in range(10):
+            for col in INDICATOR_COLUMNS:
+                if col not in TEXT_COLUMNS:
+                    np.nanmax(candles.column(col))
+        timings[label] = (nbytes, (time.perf_counter() - start) / 10)
+    eager_worst = max(error for error, _ in worst.values())
+    lazy_worst = max(error for _, error in worst.values())
+    print(f"bars={bars:>7}  float64={timings['float64'][0] / 1e6:7.2f}MB {timings['float64'][1] * 1000:7.2f}ms  "
+          f"float32={timings['float32'][0] / 1e6:7.2f}MB {timings['float32'][1] * 1000:7.2f}ms  "
+          f"max error eager={eager_worst:.2g} lazy={lazy_worst:.2g}  within={exact}")
+    return exact
+
+
+def run_batch(bars, symbols):
+    frames = {
+        f"SYM{i}/USDT": synthetic_ohlcv(bars, seed=i, price=10.0 ** (i % 5 - 1)).iloc[i % 7:]
+        for i in range(symbols)
+    }
+    panel = {col: pd.DataFrame({symbol: frame[col] for symbol, frame in frames.items()}) for col in OHLCV_COLUMNS}
+
+    start = time.perf_counter()
+    expected = {symbol: reference_indicators(frame)[0] for symbol, frame in frames.items()}
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = batch_indicators(panel)
+    batch_time = time.perf_counter() - start
+
+    exact = True
+    for symbol, frame in frames.items():
+        rows = len(frame)
+        actual = {col: values[symbol].to_numpy()[-rows:] for col, values in result.items()}
+        exact &= parity(expected[symbol], actual, f"batch {symbol}")
+    print(f"bars={bars:>7}  symbols={symbols:>4}  per-symbol={loop_time * 1000:10.2f}ms  "
+          f"batch={batch_time * 1000:10.2f}ms  speedup={loop_time / batch_time:6.1f}x  exact={exact}")
+    return exact
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Indicator timings and parity against pandas_ta")
+    parser.add_argument('--bars', type=int, nargs='+', default=[100, 1000, 100000])
+    parser.add_argument('--symbols', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--max-cells', type=int, default=1_000_000, help="skip batch runs above bars x symbols")
+    parser.add_argument('--float32', action='store_true', help="also check the float32 compact mode")
+    args = parser.parse_args()
+    results = [run_indicators(bars) for bars in args.bars]
+    if args.float32:
+        results += [run_compact(bars) for bars in args.bars]
+    for bars in args.bars:
+        for symbols in args.symbols:
+            if bars * symbols > args.max_cells:
+                print(f"bars={bars:>7}  symbols={symbols:>4}  skipped (over --max-cells {args.max_cells})")
+                continue
+            results.append(run_batch(bars, symbols))
+    sys.exit(0 if all(results) else 1)
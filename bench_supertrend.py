@@ -0,0 +1,73 @@
+# bench_supertrend.py
+# Compares the NumPy Supertrend band kernel (indicators.supertrend_final_bands)
+# with the per-row .iloc loop it replaced in the old pandas_ta indicator path.
+#
+# Usage: python bench_supertrend.py [bars ...]
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from indicators import ST_LENGTH, ST_MULTIPLIER, supertrend_final_bands
+
+
+def synthetic_ohlcv(bars, seed=0, price=100.0):
+    rng = np.random.default_rng(seed)
+    close = price * np.exp(np.cumsum(rng.normal(0, 0.002, bars)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.001, bars))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.001, bars))
+    volume = rng.uniform(1, 100, bars)
+    index = pd.date_range('2024-01-01', periods=bars, freq='min', tz='UTC')
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}, index=index)
+
+
+def basic_bands(df):
+    high_low = df['High'] - df['Low']
+    high_close_prev = (df['High'] - df['Close'].shift()).abs()
+    low_close_prev = (df['Low'] - df['Close'].shift()).abs()
+    tr = pd.concat([high_low, high_close_prev, low_close_prev], axis=1).max(axis=1)
+    atr = tr.rolling(ST_LENGTH, min_periods=1).mean()
+    hl2 = (df['High'] + df['Low']) / 2
+    return hl2 + (ST_MULTIPLIER * atr), hl2 - (ST_MULTIPLIER * atr)
+
+
+def reference_final_bands(df, basic_upperband, basic_lowerband):
+    # The loop previously inlined in the pandas_ta indicator path
+    final_upperband = basic_upperband.copy()
+    final_lowerband = basic_lowerband.copy()
+    for i in range(1, len(df)):
+        if (basic_upperband.iloc[i] < final_upperband.iloc[i-1]) or (df['Close'].iloc[i-1] > final_upperband.iloc[i-1]):
+            final_upperband.iloc[i] = basic_upperband.iloc[i]
+        else:
+            final_upperband.iloc[i] = final_upperband.iloc[i-1]
+        if (basic_lowerband.iloc[i] > final_lowerband.iloc[i-1]) or (df['Close'].iloc[i-1] < final_lowerband.iloc[i-1]):
+            final_lowerband.iloc[i] = basic_lowerband.iloc[i]
+        else:
+            final_lowerband.iloc[i] = final_lowerband.iloc[i-1]
+    return final_upperband.to_numpy(), final_lowerband.to_numpy()
+
+
+def run(bars):
+    df = synthetic_ohlcv(bars)
+    basic_upperband, basic_lowerband = basic_bands(df)
+
+    start = time.perf_counter()
+    expected = reference_final_bands(df, basic_upperband, basic_lowerband)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = supertrend_final_bands(basic_upperband, basic_lowerband, df['Close'])
+    kernel_time = time.perf_counter() - start
+
+    exact = all(np.array_equal(a, b, equal_nan=True) for a, b in zip(expected, result))
+    print(f"bars={bars:>7}  loop={loop_time * 1000:10.2f}ms  kernel={kernel_time * 1000:8.3f}ms  "
+          f"speedup={loop_time / kernel_time:8.1f}x  exact={exact}")
+    return exact
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000]
+    results = [run(bars) for bars in sizes]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,115 @@
+# candle_store.py
+# Local store of every closed candle the bot fetches, keyed by
+# (symbol, timeframe, ts) with ts the candle's open time in epoch ms.
+#
+# Closed candles never change, so the table is append-only (INSERT OR IGNORE)
+# and fetch() asks the exchange only for candles newer than the last stored
+# one. It lives in its own SQLite file so the trades database uploaded to
+# GitHub stays small.
+import logging
+import sqlite3
+import threading
+import time
+
+from candles import closed_candles, timeframe_ms
+
+logger = logging.getLogger(__name__)
+
+# Most candles the exchange returns per fetch_ohlcv call
+MAX_FETCH = 1000
+
+
+class CandleStore:
+    def __init__(self, path='candles.db'):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS ohlcv (
+                symbol TEXT NOT NULL,
+                timeframe TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                volume REAL,
+                PRIMARY KEY (symbol, timeframe, ts)
+            ) WITHOUT ROWID
+        ''')
+        self.conn.commit()
+
+    def add(self, symbol, timeframe, candles):
+        """Store closed ccxt candles; ones already stored are left as they are. Returns rows added."""
+        rows = [(symbol, timeframe, int(c[0]), c[1], c[2], c[3], c[4], c[5]) for c in candles]
+        if not rows:
+            return 0
+        with self.lock:
+            before = self.conn.total_changes
+            self.conn.executemany('INSERT OR IGNORE INTO ohlcv VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self.conn.commit()
+            return self.conn.total_changes - before
+
+    def last_timestamp(self, symbol, timeframe):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT MAX(ts) FROM ohlcv WHERE symbol = ? AND timeframe = ?', (symbol, timeframe)
+            ).fetchone()
+        return row[0]
+
+    def load(self, symbol, timeframe, since=None, until=None, limit=None):
+        """Stored candles in time order; with `limit`, the latest `limit` of them."""
+        query = 'SELECT ts, open, high, low, close, volume FROM ohlcv WHERE symbol = ? AND timeframe = ?'
+        params = [symbol, timeframe]
+        if since is not None:
+            query += ' AND ts >= ?'
+            params.append(int(since))
+        if until is not None:
+            query += ' AND ts <= ?'
+            params.append(int(until))
+        query += ' ORDER BY ts DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(int(limit))
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [list(row) for row in reversed(rows)]
+
+    def fetch(self, exchange, symbol, timeframe, limit=100, now_ms=None):
+        """Latest `limit` closed candles, requesting from the exchange only those not stored yet."""
+        tf_millis = timeframe_ms(timeframe)
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        newest_closed = now_ms // tf_millis * tf_millis - tf_millis
+        last = self.last_timestamp(symbol, timeframe)
+        if last is not None and last >= newest_closed:
+            logger.debug(f"{symbol} {timeframe} candles up to date in {self.path}")
+        else:
+            if last is None or newest_closed - last >= limit * tf_millis:
+                # Stored candles are too old to help; take the latest window
+                ohlcv = exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=min(limit + 1, MAX_FETCH))
+            else:
+                missing = (newest_closed - last) // tf_millis
+                ohlcv = exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=last + tf_millis, limit=min(missing + 1, MAX_FETCH))
+            added = self.add(symbol, timeframe, closed_candles(ohlcv, tf_millis, now_ms))
+            logger.debug(f"Fetched {len(ohlcv)} {symbol} {timeframe} candles since {last}, {added} new")
+        return self.load(symbol, timeframe, limit=limit)
+
+    def backfill(self, exchange, symbol, timeframe, since, now_ms=None):
+        """Store every closed candle from `since` on, paging past the MAX_FETCH of a single request. Returns rows added."""
+        tf_millis = timeframe_ms(timeframe)
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        newest_closed = now_ms // tf_millis * tf_millis - tf_millis
+        start = since - since % tf_millis
+        added = 0
+        while start <= newest_closed:
+            ohlcv = exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=start, limit=MAX_FETCH)
+            if not ohlcv or ohlcv[-1][0] < start:
+                break
+            added += self.add(symbol, timeframe, closed_candles(ohlcv, tf_millis, now_ms))
+            start = ohlcv[-1][0] + tf_millis
+        logger.debug(f"Backfilled {added} {symbol} {timeframe} candles since {since}")
+        return added
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
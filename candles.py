@@ -0,0 +1,328 @@
+# candles.py
+# Candle identity and the fixed-capacity candle window for the live loop.
+#
+# Candles are identified by the exchange's open timestamp (epoch ms). Only
+# closed candles are fed to the indicators, and results are cached per
+# (symbol, timeframe, candle_ts) so a candle seen twice is processed once.
+#
+# CandleBuffer replaces the pd.concat([df, new_row]).tail(100) pattern: all
+# columns are preallocated NumPy arrays and a new bar is written in place.
+# Each column is stored twice (slot i and slot i + capacity), so the current
+# window is always one contiguous slice and column() never has to copy.
+#
+# Compact mode (dtype=np.float32) stores the indicator columns as float32.
+# OHLCV stays float64: Supertrend and the other lazily replayed indicators
+# read prices back from the window, and rounded prices can flip their
+# branches. Indicators are still computed in float64 and rounded once when
+# stored, so eagerly updated columns stay within FLOAT32_RTOL of float64
+# relative to each column's scale (its largest absolute value in the window).
+# Lazy indicators computed from other stored indicators (macd from the EMAs,
+# stoch RSI from RSI) see rounded inputs and are held to FLOAT32_LAZY_RTOL;
+# macd_hollow may also pick 0 instead of the histogram (or the reverse) where
+# the histogram moved by less than float32 resolution, on at most
+# FLOAT32_BRANCH_FLIPS of the bars. bench_indicators.py --float32 checks this.
+import logging
+import os
+import pickle
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from indicators import INDICATOR_COLUMNS, OHLCV_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of CandleBuffer / IndicatorEngine state changes
+STATE_VERSION = 1
+
+# Compact mode tolerances against float64, relative to each column's scale
+FLOAT32_RTOL = 1e-6
+FLOAT32_LAZY_RTOL = 1e-3
+FLOAT32_BRANCH_FLIPS = 1e-3
+
+# Indicator columns holding labels rather than numbers
+TEXT_COLUMNS = ('supertrend_trend', 'supertrend_signal')
+
+TIMEFRAME_SECONDS = {'1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800, '1h': 3600, '1d': 86400}
+
+
+def timeframe_ms(timeframe, default_seconds=None):
+    seconds = TIMEFRAME_SECONDS.get(timeframe, default_seconds)
+    if seconds is None:
+        raise ValueError(f"Unknown timeframe {timeframe}")
+    return int(seconds) * 1000
+
+
+def is_closed(candle_ts, timeframe_millis, now_ms=None):
+    """A candle is closed once its open time plus one timeframe has passed."""
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    return candle_ts + timeframe_millis <= now_ms
+
+
+def closed_candles(ohlcv, timeframe_millis, now_ms=None):
+    """Drop the still-forming candle(s) from a ccxt fetch_ohlcv result."""
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    return [candle for candle in ohlcv if is_closed(candle[0], timeframe_millis, now_ms)]
+
+
+class BarAggregator:
+    """Builds `timeframe` bars from consecutive closed `base_timeframe` candles.
+
+    Bars are aligned on epoch multiples of the timeframe (UTC midnight for 1d),
+    like the exchange's own candles. A bar is emitted as soon as its last base
+    candle arrives; if base candles are missing it is emitted when the next
+    bar starts. Base candles before `since` and a first bar whose base data
+    starts after the bar's open are dropped.
+    """
+
+    def __init__(self, timeframe, base_timeframe='1m', since=None):
+        self.timeframe = timeframe
+        self.bar_ms = timeframe_ms(timeframe)
+        self.base_ms = timeframe_ms(base_timeframe)
+        if self.bar_ms % self.base_ms:
+            raise ValueError(f"{timeframe} is not a multiple of {base_timeframe}")
+        self.since = since
+        self.last_ts = None
+        self.bar = None
+        self.partial = False
+
+    def _close_bar(self, done):
+        if not self.partial:
+            done.append(self.bar)
+        self.bar = None
+        self.partial = False
+
+    def update(self, candle):
+        """Add one ccxt [ts, open, high, low, close, volume] candle; returns the bars it completes."""
+        ts, open_, high, low, close, volume = candle[:6]
+        if (self.since is not None and ts < self.since) or (self.last_ts is not None and ts <= self.last_ts):
+            return []
+        bucket = ts - ts % self.bar_ms
+        done = []
+        if self.bar is not None and self.bar[0] != bucket:
+            self._close_bar(done)
+        if self.bar is None:
+            self.partial = self.last_ts is None and ts != bucket
+            self.bar = [bucket, open_, high, low, close, volume]
+        else:
+            bar = self.bar
+            bar[2] = max(bar[2], high)
+            bar[3] = min(bar[3], low)
+            bar[4] = close
+            bar[5] += volume
+        self.last_ts = ts
+        if ts + self.base_ms >= bucket + self.bar_ms:
+            self._close_bar(done)
+        return done
+
+
+class CandleCache:
+    """Results keyed by (symbol, timeframe, candle open ts), oldest entries evicted first."""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        if key not in self.entries:
+            return default
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class CandleBuffer:
+    """Ring buffer of the last `capacity` bars, one NumPy array per column."""
+
+    def __init__(self, capacity=100, columns=None, engine=None, dtype=np.float64):
+        self.capacity = capacity
+        # IndicatorEngine used to fill lazily evaluated columns on access
+        self.engine = engine
+        self.columns = list(columns) if columns is not None else OHLCV_COLUMNS + INDICATOR_COLUMNS
+        self.dtype = np.dtype(dtype)
+        self.timestamps = np.zeros(2 * capacity, dtype=np.int64)
+        self.data = {
+            col: np.full(2 * capacity, None, dtype=object) if col in TEXT_COLUMNS
+            else np.full(2 * capacity, np.nan, dtype=np.float64 if col in OHLCV_COLUMNS else self.dtype)
+            for col in self.columns
+        }
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    @property
+    def empty(self):
+        return self.count == 0
+
+    def _window(self):
+        # Slice of the mirrored arrays holding the current bars, oldest first
+        head = (self.count - 1) % self.capacity
+        end = head + self.capacity + 1
+        return slice(end - len(self), end)
+
+    def append(self, ts, row):
+        """Write one bar; ts is epoch milliseconds or a timestamp, row maps column -> value."""
+        if isinstance(ts, (pd.Timestamp, np.datetime64)):
+            ts = pd.Timestamp(ts).value // 1_000_000
+        slot = self.count % self.capacity
+        mirror = slot + self.capacity
+        self.timestamps[slot] = self.timestamps[mirror] = ts
+        for col in self.columns:
+            value = row.get(col)
+            if value is None and col not in TEXT_COLUMNS:
+                value = np.nan
+            self.data[col][slot] = self.data[col][mirror] = value
+        self.count += 1
+
+    def extend(self, df):
+        """Append every row of a frame indexed by timestamp."""
+        for ts, row in zip(df.index, df.to_dict('records')):
+            self.append(ts, row)
+
+    def column(self, name):
+        """Read-only view of one column over the current window, oldest first."""
+        view = self.data[name][self._window()]
+        view.flags.writeable = False
+        return view
+
+    def _index(self, offset):
+        if not -len(self) <= offset < 0:
+            raise IndexError(f"Bar offset {offset} outside window of {len(self)} bars")
+        return self._window().stop + offset
+
+    def row(self, offset=-1, columns=None):
+        """Values of one bar as a dict; offset -1 is the latest bar.
+
+        With `columns`, only those are returned, and any indicator among them
+        that the engine does not keep up to date is computed first.
+        """
+        if columns is not None and self.engine is not None:
+            self.engine.ensure(columns, self)
+        index = self._index(offset)
+        values = {col: self.data[col][index] for col in (self.columns if columns is None else columns)}
+        if self.dtype != np.float64:
+            # Hand out Python floats so float32 never leaks into indicator state
+            values = {col: float(value) if isinstance(value, np.floating) else value for col, value in values.items()}
+        values['timestamp'] = int(self.timestamps[index])
+        return values
+
+    def update_row(self, offset, values):
+        """Overwrite some columns of an existing bar."""
+        index = self._index(offset)
+        slot = index % self.capacity
+        for col, value in values.items():
+            self.data[col][slot] = self.data[col][slot + self.capacity] = value
+
+    def last_timestamp(self):
+        return int(self.timestamps[self._window().stop - 1]) if self.count else None
+
+    def frame(self, tz='UTC'):
+        """Build a DataFrame copy of the window; only for callers that need pandas."""
+        window = self._window()
+        index = pd.to_datetime(self.timestamps[window], unit='ms').tz_localize('UTC').tz_convert(tz)
+        return pd.DataFrame({col: self.data[col][window].copy() for col in self.columns}, index=index)
+
+
+class CandleView:
+    """Read-only window over existing column arrays, with the CandleBuffer read API."""
+
+    def __init__(self, timestamps, data):
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.data = data
+        self.columns = list(data)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def empty(self):
+        return len(self.timestamps) == 0
+
+    def column(self, name):
+        return self.data[name]
+
+    def row(self, offset=-1, columns=None):
+        if not -len(self) <= offset < 0:
+            raise IndexError(f"Bar offset {offset} outside window of {len(self)} bars")
+        values = {col: self.data[col][offset] for col in (self.columns if columns is None else columns)}
+        values['timestamp'] = int(self.timestamps[offset])
+        return values
+
+    def last_timestamp(self):
+        return int(self.timestamps[-1]) if len(self) else None
+
+    def frame(self, tz='UTC'):
+        index = pd.to_datetime(self.timestamps, unit='ms').tz_localize('UTC').tz_convert(tz)
+        return pd.DataFrame({col: np.array(self.data[col], copy=True) for col in self.columns}, index=index)
+
+
+def ohlcv_panel(ohlcv_by_symbol):
+    """Align ccxt fetch_ohlcv results for several symbols on their candle timestamps.
+
+    Returns a dict of 'Open'/'High'/'Low'/'Close'/'Volume' -> DataFrame indexed
+    by candle open time (epoch ms) with one column per symbol.
+    """
+    symbols = list(ohlcv_by_symbol)
+    rows = [np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6) for ohlcv in ohlcv_by_symbol.values()]
+    index = np.unique(np.concatenate([r[:, 0] for r in rows]).astype(np.int64)) if rows else np.empty(0, dtype=np.int64)
+    # One 2D block per column: per-symbol frames joined by pd.concat leave one block per
+    # symbol, and every later operation on the panel then runs block by block
+    values = np.full((len(OHLCV_COLUMNS), len(index), len(symbols)), np.nan)
+    for i, r in enumerate(rows):
+        values[:, np.searchsorted(index, r[:, 0].astype(np.int64)), i] = r[:, 1:].T
+    return {col: pd.DataFrame(values[k], index=index, columns=symbols) for k, col in enumerate(OHLCV_COLUMNS)}
+
+
+def batch_views(panel, indicators, dtype=None):
+    """One CandleView per symbol over a batch_indicators() result, starting at its first candle.
+
+    With dtype=np.float32 the numeric columns are stored in compact mode.
+    """
+    index = panel['Close'].index
+    timestamps = index.to_numpy() if index.dtype.kind in 'iu' else pd.DatetimeIndex(index).asi8 // 1_000_000
+    columns = {**{col: panel[col] for col in OHLCV_COLUMNS}, **indicators}
+    arrays = {
+        col: frame.to_numpy(dtype=dtype) if dtype is not None and col in INDICATOR_COLUMNS and col not in TEXT_COLUMNS else frame.to_numpy()
+        for col, frame in columns.items()
+    }
+    views = {}
+    for i, symbol in enumerate(panel['Close'].columns):
+        valid = np.flatnonzero(~np.isnan(arrays['Close'][:, i].astype(float)))
+        start = valid[0] if valid.size else len(index)
+        views[symbol] = CandleView(timestamps[start:], {col: values[start:, i] for col, values in arrays.items()})
+    return views
+
+
+def save_state(path, candles, **meta):
+    """Checkpoint a CandleBuffer and its IndicatorEngine; written atomically."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump({'version': STATE_VERSION, 'meta': meta, 'candles': candles}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_state(path, **meta):
+    """Return the CandleBuffer saved by save_state(), or None if missing, stale or for other `meta`."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Could not read indicator state {path}: {e}")
+        return None
+    if state.get('version') != STATE_VERSION or state.get('meta') != meta:
+        logger.info(f"Ignoring indicator state {path}: saved for {state.get('meta')}, version {state.get('version')}")
+        return None
+    return state['candles']
@@ -0,0 +1,131 @@
+# db_pool.py
+# SQLite connections of the trades database, in WAL mode.
+#
+# With a write-ahead log, readers work on the last committed snapshot and
+# neither block nor wait for the writer. The bot keeps a single writer
+# connection (connect_writer, used by the signal writer, setup and cleanup
+# behind db_lock) and a ReadPool of read-only connections for the Flask
+# routes and Telegram reports, so dashboard traffic never holds up a trade
+# write and one slow report only occupies its own connection.
+#
+# Committed rows can sit in the -wal file until a checkpoint copies them into
+# the database file, and the writer may commit while the file is being read,
+# so the file itself is never uploaded: snapshot() copies the database with
+# SQLite's online backup, which reads one consistent state including the WAL.
+# A database file that is removed or replaced takes its -wal/-shm files along.
+import contextlib
+import logging
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+WAL_SUFFIXES = ('-wal', '-shm')
+
+
+def connect_writer(path, timeout=30, synchronous='NORMAL'):
+    """Read-write connection with the database switched to WAL mode."""
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=timeout)
+    mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+    if mode.lower() != 'wal':
+        logger.warning(f"Database {path} stays in {mode} journal mode")
+    # In WAL mode NORMAL only loses the last commits on power loss, never on a crash of the bot
+    conn.execute(f"PRAGMA synchronous={synchronous}")
+    return conn
+
+
+def snapshot(path, timeout=30):
+    """Bytes of a consistent copy of the database, committed WAL frames included."""
+    fd, copy_path = tempfile.mkstemp(suffix='.db', dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    source = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=timeout)
+    try:
+        copy = sqlite3.connect(copy_path)
+        try:
+            # One step: the whole copy is read inside a single read transaction
+            source.backup(copy)
+        finally:
+            copy.close()
+        with open(copy_path, 'rb') as f:
+            return f.read()
+    finally:
+        source.close()
+        os.remove(copy_path)
+
+
+def discard_wal(path):
+    """Drop the -wal/-shm files, so they are not replayed into a database file that replaced `path`."""
+    for suffix in WAL_SUFFIXES:
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def remove_database(path):
+    if os.path.exists(path):
+        os.remove(path)
+    discard_wal(path)
+
+
+class ReadPool:
+    def __init__(self, path, size=4, timeout=30):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+        # Bumped when the database file is replaced; older connections are closed on return
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False, timeout=self.timeout)
+        conn.execute("PRAGMA query_only=1")
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self):
+        """A read-only connection for the duration of the with block."""
+        if not self.slots.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError(f"No read connection free after {self.timeout}s")
+        conn = None
+        try:
+            try:
+                conn, generation = self.idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self.lock:
+                current = self.generation
+            if conn is not None and generation != current:
+                conn.close()
+                conn = None
+            if conn is None:
+                conn, generation = self._connect(), current
+            try:
+                yield conn
+            except sqlite3.DatabaseError:
+                conn.close()
+                conn = None
+                raise
+        finally:
+            if conn is not None:
+                with self.lock:
+                    keep = generation == self.generation
+                if keep:
+                    self.idle.put((conn, generation))
+                else:
+                    conn.close()
+            self.slots.release()
+
+    def invalidate(self):
+        """Close idle connections; the ones in use are closed when returned."""
+        with self.lock:
+            self.generation += 1
+        while True:
+            try:
+                conn, _ = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
@@ -0,0 +1,309 @@
+# feeds.py
+# Market-data feeds that push candles to the bot instead of REST polling.
+#
+# A feed runs in a background thread and queues every kline update it
+# receives, in progress or closed, as ccxt-style [ts, open, high, low, close,
+# volume] candles. The trading loop blocks on next_closed(), so a decision is
+# made as soon as the exchange closes the bar; `latest` always holds the most
+# recent candle, closed or not.
+#
+# WebSocketFeed speaks the Binance kline stream format. TradeBarFeed listens to
+# the aggTrade stream instead and pushes the bars a TradeBarBuilder closes
+# (tick, volume, dollar or time bars) as closed candles. ReplayServer serves
+# recorded candles in that same format, plus a /klines history endpoint shaped
+# like Binance's REST one, so the feed and the bot can run offline.
+#
+# Usage: python feeds.py record candles.csv --symbol BTC/USDT --timeframe 1m --limit 1000
+#        python feeds.py replay candles.csv --symbol BTC/USDT --timeframe 1m [--speed 60]
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import queue
+import threading
+import time
+
+import requests
+
+from candles import closed_candles, timeframe_ms
+
+try:
+    import aiohttp
+    from aiohttp import web
+except ImportError:
+    aiohttp = None
+    web = None
+
+logger = logging.getLogger(__name__)
+
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443/ws"
+
+
+def stream_name(symbol, timeframe):
+    """Binance stream name for a ccxt symbol, e.g. BTC/USDT 1m -> btcusdt@kline_1m."""
+    return f"{symbol.replace('/', '').lower()}@kline_{timeframe}"
+
+
+def parse_kline(message):
+    """ccxt candle and closed flag from a Binance kline event (raw or combined stream)."""
+    kline = message.get('data', message)['k']
+    candle = [int(kline['t']), float(kline['o']), float(kline['h']), float(kline['l']), float(kline['c']), float(kline['v'])]
+    return candle, bool(kline['x'])
+
+
+def parse_agg_trade(message):
+    """(ts, price, amount) from a Binance aggTrade or trade event (raw or combined stream)."""
+    trade = message.get('data', message)
+    return int(trade['T']), float(trade['p']), float(trade['q'])
+
+
+def format_kline(symbol, timeframe, candle, closed):
+    ts, open_, high, low, close, volume = candle
+    return {
+        'e': 'kline',
+        'E': int(time.time() * 1000),
+        's': symbol.replace('/', ''),
+        'k': {
+            't': ts, 'T': ts + timeframe_ms(timeframe) - 1, 's': symbol.replace('/', ''), 'i': timeframe,
+            'o': str(open_), 'h': str(high), 'l': str(low), 'c': str(close), 'v': str(volume), 'x': closed,
+        },
+    }
+
+
+class CandleFeed:
+    """Base class for pushed candle feeds; subclasses implement _run() and call _push()."""
+
+    def __init__(self, symbol, timeframe, history_url=None):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.history_url = history_url
+        self.events = queue.Queue()
+        self.latest = None
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+
+    def _run(self):
+        raise NotImplementedError
+
+    def _push(self, candle, closed):
+        self.latest = (candle, closed)
+        self.events.put((candle, closed))
+
+    def next_closed(self, timeout=None):
+        """Block until the next closed candle arrives; None after `timeout` seconds."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.time()
+            if remaining is not None and remaining <= 0:
+                return None
+            try:
+                candle, closed = self.events.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if closed:
+                return candle
+
+    def history(self, limit=100):
+        """Closed candles from `history_url` (Binance /klines format), or None without one."""
+        if not self.history_url:
+            return None
+        params = {'symbol': self.symbol.replace('/', ''), 'interval': self.timeframe, 'limit': limit}
+        response = requests.get(self.history_url, params=params, timeout=10)
+        response.raise_for_status()
+        return [[int(row[0])] + [float(value) for value in row[1:6]] for row in response.json()]
+
+
+class WebSocketFeed(CandleFeed):
+    """Binance-style kline WebSocket stream, reconnecting with backoff."""
+
+    def __init__(self, symbol, timeframe, url=None, history_url=None, max_backoff=60, stream=None):
+        super().__init__(symbol, timeframe, history_url)
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is required for WebSocketFeed")
+        self.url = f"{(url or BINANCE_STREAM_URL).rstrip('/')}/{stream or stream_name(symbol, timeframe)}"
+        self.max_backoff = max_backoff
+
+    def _run(self):
+        asyncio.run(self._listen())
+
+    def _on_message(self, message):
+        self._push(*parse_kline(message))
+
+    async def _listen(self):
+        backoff = 1
+        while self.running:
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.ws_connect(self.url, heartbeat=30) as ws:
+                        logger.info(f"Connected to stream {self.url}")
+                        backoff = 1
+                        while self.running:
+                            try:
+                                msg = await ws.receive(timeout=1)
+                            except asyncio.TimeoutError:
+                                continue
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                self._on_message(json.loads(msg.data))
+                            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.ERROR):
+                                break
+            except Exception as e:
+                logger.warning(f"Stream {self.url} failed: {e}")
+            if self.running:
+                logger.info(f"Reconnecting to {self.url} in {backoff}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+
+class TradeBarFeed(WebSocketFeed):
+    """Bars built from the Binance aggTrade stream, pushed as closed candles when complete."""
+
+    def __init__(self, symbol, builder, url=None, max_backoff=60):
+        stream = f"{symbol.replace('/', '').lower()}@aggTrade"
+        super().__init__(symbol, builder.label, url=url, max_backoff=max_backoff, stream=stream)
+        self.builder = builder
+        # The stream thread adds trades while the consumer may flush the open bar
+        self.lock = threading.Lock()
+
+    def _on_message(self, message):
+        with self.lock:
+            for bar in self.builder.add_trade(*parse_agg_trade(message)):
+                self._push(bar, True)
+
+    def flush(self, now_ms=None):
+        """Close the open time bar once its period is over; returns it as a list of rows."""
+        with self.lock:
+            return self.builder.flush(now_ms)
+
+
+class ReplayServer:
+    """Local stand-in for the exchange that replays recorded candles.
+
+    The first `history` candles are served by GET /klines; the rest are
+    streamed on /ws/<stream> one every `interval` seconds, each preceded by
+    `updates` in-progress messages.
+    """
+
+    def __init__(self, candles, symbol, timeframe, host='127.0.0.1', port=8765, interval=1.0, updates=2, history=100):
+        if web is None:
+            raise RuntimeError("aiohttp is required for ReplayServer")
+        self.candles = [list(candle) for candle in candles]
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.updates = updates
+        self.cursor = min(history, len(self.candles))
+        self.loop = None
+        self.runner = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/ws"
+
+    @property
+    def history_url(self):
+        return f"http://{self.host}:{self.port}/klines"
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/klines', self._klines)
+        app.router.add_get('/ws/{stream}', self._stream)
+        return app
+
+    async def _klines(self, request):
+        limit = int(request.query.get('limit', 500))
+        step = timeframe_ms(self.timeframe)
+        rows = [
+            [c[0], str(c[1]), str(c[2]), str(c[3]), str(c[4]), str(c[5]), c[0] + step - 1]
+            for c in self.candles[max(0, self.cursor - limit):self.cursor]
+        ]
+        return web.json_response(rows)
+
+    async def _stream(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        logger.info(f"Replay client connected to {request.match_info['stream']}")
+        while self.cursor < len(self.candles) and not ws.closed:
+            candle = self.candles[self.cursor]
+            for _ in range(self.updates):
+                await asyncio.sleep(self.interval / (self.updates + 1))
+                await ws.send_json(format_kline(self.symbol, self.timeframe, candle, False))
+            await asyncio.sleep(self.interval / (self.updates + 1))
+            await ws.send_json(format_kline(self.symbol, self.timeframe, candle, True))
+            self.cursor += 1
+        await ws.close()
+        return ws
+
+    def run(self):
+        web.run_app(self.app(), host=self.host, port=self.port)
+
+    def start(self):
+        """Serve from a background thread; returns once the port is listening."""
+        started = threading.Event()
+
+        def serve():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            self.runner = web.AppRunner(self.app())
+            self.loop.run_until_complete(self.runner.setup())
+            self.loop.run_until_complete(web.TCPSite(self.runner, self.host, self.port).start())
+            started.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=serve, daemon=True).start()
+        started.wait()
+        return self
+
+    def stop(self):
+        if self.loop is not None:
+            asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def load_candles_csv(path):
+    with open(path, newline='') as f:
+        return [[int(row[0])] + [float(value) for value in row[1:6]] for row in csv.reader(f) if row and row[0].isdigit()]
+
+
+def save_candles_csv(path, candles):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        writer.writerows(candles)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record candles or replay them as a local kline stream")
+    parser.add_argument('command', choices=['record', 'replay'])
+    parser.add_argument('path', help="CSV of timestamp,open,high,low,close,volume")
+    parser.add_argument('--symbol', default='BTC/USDT')
+    parser.add_argument('--timeframe', default='1m')
+    parser.add_argument('--limit', type=int, default=1000, help="candles to record")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--speed', type=float, default=60.0, help="replay speed-up over real time")
+    parser.add_argument('--history', type=int, default=100, help="candles served by /klines before streaming")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.command == 'record':
+        import ccxt
+        ohlcv = ccxt.binance({'enableRateLimit': True}).fetch_ohlcv(args.symbol, timeframe=args.timeframe, limit=args.limit)
+        ohlcv = closed_candles(ohlcv, timeframe_ms(args.timeframe))
+        save_candles_csv(args.path, ohlcv)
+        logger.info(f"Recorded {len(ohlcv)} {args.symbol} {args.timeframe} candles to {args.path}")
+    else:
+        interval = timeframe_ms(args.timeframe) / 1000 / args.speed
+        server = ReplayServer(load_candles_csv(args.path), args.symbol, args.timeframe, port=args.port, interval=interval, history=args.history)
+        logger.info(f"Replaying {args.path} on {server.url}, history on {server.history_url}")
+        server.run()
@@ -0,0 +1,637 @@
+# indicators.py
+# Streaming indicator engine for the trading bots.
+#
+# The pandas_ta add_technical_indicators() that app.py used to run recomputed
+# every indicator over the whole window on each bar. IndicatorEngine keeps the running state of each
+# indicator instead and advances it from a single new candle, so the cost per
+# bar no longer depends on the window length.
+#
+# The recursions below follow pandas / pandas_ta step by step (EWM weights,
+# the compensated rolling-mean sum, the SMA-seeded EMA) so that feeding a
+# series bar by bar gives the same numbers as running the batch function over
+# that same series. Note that the old loop recomputed over df.tail(100) and
+# re-seeded EMA/RSI/KDJ on every bar; the engine instead carries the seed from
+# the first bar it saw, which is what the batch result over the full history
+# gives.
+#
+# Indicators are registered with their dependencies in INDICATORS, so a caller
+# only pays for the columns it actually reads.
+import logging
+import time
+from collections import deque, namedtuple
+from math import copysign
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Indicator parameters (same as the pandas_ta reference in bench_indicators.py)
+EMA1_LENGTH = 12
+EMA2_LENGTH = 26
+RSI_LENGTH = 14
+KDJ_LENGTH = 9
+KDJ_SIGNAL = 3
+MACD_FAST = 12
+MACD_SLOW = 26
+MACD_SIGNAL = 9
+ST_LENGTH = 10
+ST_MULTIPLIER = 3.0
+STOCH_RSI_LENGTH = 14
+STOCH_K_LENGTH = 3
+STOCH_D_LENGTH = 3
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+INDICATOR_COLUMNS = [
+    'ema1', 'ema2', 'rsi', 'k', 'd', 'j', 'macd', 'macd_signal', 'macd_hist',
+    'diff', 'diff1e', 'diff2m', 'diff3k', 'lst_diff', 'macd_hollow',
+    'supertrend', 'supertrend_trend', 'supertrend_signal',
+    'stoch_rsi', 'stoch_k', 'stoch_d', 'obv'
+]
+
+# Same epsilon pandas_ta adds to a zero high-low range in kdj()
+_RANGE_EPSILON = np.finfo(float).eps
+
+
+class _Ewm:
+    """One step of pandas' ewm().mean() recursion (ignore_na=False)."""
+
+    def __init__(self, com, adjust, min_periods=0):
+        alpha = 1. / (1. + com)
+        self.old_wt_factor = 1. - alpha
+        self.new_wt = 1. if adjust else alpha
+        self.adjust = adjust
+        self.min_periods = max(min_periods, 1)
+        self.weighted = np.nan
+        self.old_wt = 1.
+        self.nobs = 0
+
+    def update(self, cur):
+        is_observation = cur == cur
+        self.nobs += is_observation
+        if self.weighted == self.weighted:
+            self.old_wt *= self.old_wt_factor
+            if is_observation and self.weighted != cur:
+                self.weighted = (self.old_wt * self.weighted + self.new_wt * cur) / (self.old_wt + self.new_wt)
+            if self.adjust:
+                self.old_wt += self.new_wt
+            else:
+                self.old_wt = 1.
+        elif is_observation:
+            self.weighted = cur
+        return self.weighted if self.nobs >= self.min_periods else np.nan
+
+
+class _Ema:
+    """pandas_ta ema() with presma=True: SMA of the first `length` values, then EWM."""
+
+    def __init__(self, length):
+        self.length = length
+        self.seed = []
+        self.ewm = _Ewm(com=(length - 1) / 2.0, adjust=False)
+
+    def update(self, value):
+        if self.seed is not None:
+            self.seed.append(value)
+            if len(self.seed) < self.length:
+                return np.nan
+            seed = np.array(self.seed, dtype=float)
+            value = seed.sum() / np.count_nonzero(~np.isnan(seed))
+            self.seed = None
+        return self.ewm.update(value)
+
+
+class _RollingMean:
+    """pandas rolling(window, min_periods).mean() with its compensated running sum."""
+
+    def __init__(self, window, min_periods):
+        self.window = window
+        self.min_periods = min_periods
+        self.values = deque()
+        self.nobs = 0
+        self.sum_x = 0.
+        self.neg_ct = 0
+        self.compensation_add = 0.
+        self.compensation_remove = 0.
+        self.num_consecutive_same_value = 0
+        self.prev_value = None
+
+    def update(self, val):
+        if self.prev_value is None:
+            self.prev_value = val
+        self.values.append(val)
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if old == old:
+                self.nobs -= 1
+                y = -old - self.compensation_remove
+                t = self.sum_x + y
+                self.compensation_remove = t - self.sum_x - y
+                self.sum_x = t
+                if copysign(1., old) < 0:
+                    self.neg_ct -= 1
+        if val == val:
+            self.nobs += 1
+            y = val - self.compensation_add
+            t = self.sum_x + y
+            self.compensation_add = t - self.sum_x - y
+            self.sum_x = t
+            if copysign(1., val) < 0:
+                self.neg_ct += 1
+            if val == self.prev_value:
+                self.num_consecutive_same_value += 1
+            else:
+                self.num_consecutive_same_value = 1
+            self.prev_value = val
+        if self.nobs >= self.min_periods and self.nobs > 0:
+            result = self.sum_x / self.nobs
+            if self.num_consecutive_same_value >= self.nobs:
+                result = self.prev_value
+            elif self.neg_ct == 0 and result < 0:
+                result = 0.
+            elif self.neg_ct == self.nobs and result > 0:
+                result = 0.
+            return result
+        return np.nan
+
+
+class _RollingExtreme:
+    """pandas rolling(window, min_periods).max() / .min() over a short window."""
+
+    def __init__(self, window, min_periods, func):
+        self.values = deque(maxlen=window)
+        self.min_periods = min_periods
+        self.func = func
+
+    def update(self, val):
+        self.values.append(val)
+        valid = [v for v in self.values if v == v]
+        if valid and len(valid) >= self.min_periods:
+            return self.func(valid)
+        return np.nan
+
+
+def _final_band(basic, close, upper, chunk=32):
+    # Within a run, the upper band is the running minimum of the basic band
+    # (running maximum for the lower band). A run restarts when the previous
+    # close crossed the previous final band, so each run is one accumulate call.
+    n = len(basic)
+    final = np.empty(n)
+    accumulate = np.fmin.accumulate if upper else np.fmax.accumulate
+    start, carry, size = 0, None, chunk
+    while start < n:
+        end = min(n, start + size)
+        if carry is None:
+            if basic[start] != basic[start]:
+                # A NaN band never compares true again, so it is carried to the end
+                final[start:] = np.nan
+                break
+            seg = accumulate(basic[start:end])
+            prev = seg[:-1]
+            first = start + 1
+        else:
+            seg = accumulate(np.concatenate(([carry], basic[start:end])))[1:]
+            prev = np.concatenate(([carry], seg[:-1]))
+            first = start
+        prev_close = close[first - 1:end - 1]
+        crossed = prev_close > prev if upper else prev_close < prev
+        hits = np.flatnonzero(crossed)
+        if hits.size:
+            reset = first + hits[0]
+            final[start:reset] = seg[:reset - start]
+            start, carry, size = reset, None, chunk
+        else:
+            final[start:end] = seg
+            start, carry, size = end, seg[-1], size * 2
+    return final
+
+
+def supertrend_final_bands(basic_upperband, basic_lowerband, close):
+    """Final Supertrend bands from the basic bands, on NumPy arrays.
+
+    Gives exactly the values of the per-row loop it replaced:
+    the upper band follows basic_upperband while it falls and resets when the
+    previous close broke above it; the lower band mirrors that.
+    """
+    basic_upperband = np.asarray(basic_upperband, dtype=float)
+    basic_lowerband = np.asarray(basic_lowerband, dtype=float)
+    close = np.asarray(close, dtype=float)
+    return (_final_band(basic_upperband, close, upper=True),
+            _final_band(basic_lowerband, close, upper=False))
+
+
+# Indicator nodes. Each one keeps its own running state and turns one bar
+# (OHLCV plus the outputs of its dependencies for that bar) into its outputs.
+
+class _EmaIndicator:
+    def __init__(self, column, length):
+        self.column = column
+        self.ema = _Ema(length)
+
+    def update(self, bar):
+        return {self.column: self.ema.update(bar['Close'])}
+
+
+class _RsiIndicator:
+    def __init__(self):
+        self.prev_close = np.nan
+        self.positive = _Ewm(com=1.0 / (1.0 / RSI_LENGTH) - 1, adjust=False)
+        self.negative = _Ewm(com=1.0 / (1.0 / RSI_LENGTH) - 1, adjust=False)
+
+    def update(self, bar):
+        # rma of gains and losses
+        change = bar['Close'] - self.prev_close
+        self.prev_close = bar['Close']
+        positive_avg = self.positive.update(0.0 if change < 0 else change)
+        negative_avg = self.negative.update(0.0 if change > 0 else change)
+        denominator = positive_avg + abs(negative_avg)
+        return {'rsi': 100 * positive_avg / denominator if denominator != 0 else np.nan}
+
+
+class _KdjIndicator:
+    def __init__(self):
+        self.highest = _RollingExtreme(KDJ_LENGTH, KDJ_LENGTH, max)
+        self.lowest = _RollingExtreme(KDJ_LENGTH, KDJ_LENGTH, min)
+        self.k = _Ewm(com=1.0 / (1.0 / KDJ_SIGNAL) - 1, adjust=True, min_periods=KDJ_SIGNAL)
+        self.d = _Ewm(com=1.0 / (1.0 / KDJ_SIGNAL) - 1, adjust=True, min_periods=KDJ_SIGNAL)
+        self.zero_range = False
+
+    def update(self, bar):
+        highest_high = self.highest.update(bar['High'])
+        lowest_low = self.lowest.update(bar['Low'])
+        kdj_range = highest_high - lowest_low
+        if kdj_range == 0:
+            self.zero_range = True
+        if self.zero_range:
+            kdj_range += _RANGE_EPSILON
+        fastk = 100 * (bar['Close'] - lowest_low) / kdj_range if kdj_range == kdj_range else np.nan
+        k = self.k.update(fastk)
+        d = self.d.update(k)
+        return {'k': k, 'd': d, 'j': 3 * k - 2 * d}
+
+
+class _MacdIndicator:
+    # MACD_FAST / MACD_SLOW equal the ema1 / ema2 lengths, so those are reused
+    def __init__(self):
+        self.signal = _Ema(MACD_SIGNAL)
+        self.started = False
+
+    def update(self, bar):
+        macd = bar['ema1'] - bar['ema2']
+        if macd == macd:
+            self.started = True
+        macd_signal = self.signal.update(macd) if self.started else np.nan
+        return {'macd': macd, 'macd_signal': macd_signal, 'macd_hist': macd - macd_signal}
+
+
+class _DiffIndicator:
+    # Differences of columns of the same bar; `columns` is (minuend, subtrahend)
+    def __init__(self, column, columns):
+        self.column = column
+        self.columns = columns
+
+    def update(self, bar):
+        return {self.column: bar[self.columns[0]] - bar[self.columns[1]]}
+
+
+class _LstDiffIndicator:
+    def __init__(self):
+        self.prev_ema1 = np.nan
+
+    def update(self, bar):
+        lst_diff = self.prev_ema1 - bar['ema1']
+        self.prev_ema1 = bar['ema1']
+        return {'lst_diff': lst_diff}
+
+
+class _MacdHollowIndicator:
+    def __init__(self):
+        self.prev_hist = np.nan
+
+    def update(self, bar):
+        macd_hist = bar['macd_hist']
+        macd_hollow = 0.0
+        if macd_hist > 0 and macd_hist > self.prev_hist:
+            macd_hollow = macd_hist
+        elif macd_hist < 0 and macd_hist < self.prev_hist:
+            macd_hollow = macd_hist
+        self.prev_hist = macd_hist
+        return {'macd_hollow': macd_hollow}
+
+
+class _SupertrendIndicator:
+    def __init__(self):
+        self.bars = 0
+        self.prev_close = np.nan
+        self.atr = _RollingMean(ST_LENGTH, 1)
+        self.final_upperband = np.nan
+        self.final_lowerband = np.nan
+        self.prev_trend = True
+
+    def update(self, bar):
+        high, low, close, prev_close = bar['High'], bar['Low'], bar['Close'], self.prev_close
+        ranges = [v for v in (high - low, abs(high - prev_close), abs(low - prev_close)) if v == v]
+        atr = self.atr.update(max(ranges) if ranges else np.nan)
+        hl2 = (high + low) / 2
+        basic_upperband = hl2 + (ST_MULTIPLIER * atr)
+        basic_lowerband = hl2 - (ST_MULTIPLIER * atr)
+        prev_upperband = self.final_upperband
+        prev_lowerband = self.final_lowerband
+        if self.bars == 0:
+            final_upperband = basic_upperband
+            final_lowerband = basic_lowerband
+        else:
+            if (basic_upperband < prev_upperband) or (prev_close > prev_upperband):
+                final_upperband = basic_upperband
+            else:
+                final_upperband = prev_upperband
+            if (basic_lowerband > prev_lowerband) or (prev_close < prev_lowerband):
+                final_lowerband = basic_lowerband
+            else:
+                final_lowerband = prev_lowerband
+        trend = bool(close > prev_upperband)
+        if trend and not self.prev_trend:
+            signal = 'buy'
+        elif not trend and self.prev_trend:
+            signal = 'sell'
+        else:
+            signal = None
+        self.bars += 1
+        self.prev_close = close
+        self.final_upperband = final_upperband
+        self.final_lowerband = final_lowerband
+        self.prev_trend = trend
+        return {
+            'supertrend': final_upperband if close <= final_upperband else final_lowerband,
+            'supertrend_trend': 'Up' if trend else 'Down',
+            'supertrend_signal': signal,
+        }
+
+
+class _StochRsiIndicator:
+    def __init__(self):
+        self.last_rsi = np.nan
+        self.rsi_min = _RollingExtreme(STOCH_RSI_LENGTH, 1, min)
+        self.rsi_max = _RollingExtreme(STOCH_RSI_LENGTH, 1, max)
+        self.stoch_k = _RollingMean(STOCH_K_LENGTH, 1)
+        self.stoch_d = _RollingMean(STOCH_D_LENGTH, 1)
+
+    def update(self, bar):
+        if bar['rsi'] == bar['rsi']:
+            self.last_rsi = bar['rsi']
+        rsi = self.last_rsi
+        rsi_min = self.rsi_min.update(rsi)
+        rsi_max = self.rsi_max.update(rsi)
+        stochrsi = (rsi - rsi_min) / (rsi_max - rsi_min + 1e-12)
+        stoch_k = self.stoch_k.update(stochrsi) * 100
+        return {'stoch_rsi': stochrsi, 'stoch_k': stoch_k, 'stoch_d': self.stoch_d.update(stoch_k)}
+
+
+class _ObvIndicator:
+    def __init__(self):
+        self.prev_close = np.nan
+        self.obv = 0.0
+
+    def update(self, bar):
+        change = bar['Close'] - self.prev_close
+        direction = np.sign(change) if self.prev_close == self.prev_close else 0.0
+        flow = direction * bar['Volume']
+        self.obv += flow if flow == flow else 0.0
+        self.prev_close = bar['Close']
+        return {'obv': self.obv}
+
+
+IndicatorSpec = namedtuple('IndicatorSpec', ['outputs', 'deps', 'factory'])
+
+# Registry of indicators, in dependency order. deps name other indicators
+# whose outputs must be available for the same bar.
+INDICATORS = {
+    'ema1': IndicatorSpec(('ema1',), (), lambda: _EmaIndicator('ema1', EMA1_LENGTH)),
+    'ema2': IndicatorSpec(('ema2',), (), lambda: _EmaIndicator('ema2', EMA2_LENGTH)),
+    'rsi': IndicatorSpec(('rsi',), (), _RsiIndicator),
+    'kdj': IndicatorSpec(('k', 'd', 'j'), (), _KdjIndicator),
+    'macd': IndicatorSpec(('macd', 'macd_signal', 'macd_hist'), ('ema1', 'ema2'), _MacdIndicator),
+    'diff': IndicatorSpec(('diff',), (), lambda: _DiffIndicator('diff', ('Close', 'Open'))),
+    'diff1e': IndicatorSpec(('diff1e',), ('ema1', 'ema2'), lambda: _DiffIndicator('diff1e', ('ema1', 'ema2'))),
+    'diff2m': IndicatorSpec(('diff2m',), ('macd',), lambda: _DiffIndicator('diff2m', ('macd', 'macd_signal'))),
+    'diff3k': IndicatorSpec(('diff3k',), ('kdj',), lambda: _DiffIndicator('diff3k', ('j', 'd'))),
+    'lst_diff': IndicatorSpec(('lst_diff',), ('ema1',), _LstDiffIndicator),
+    'macd_hollow': IndicatorSpec(('macd_hollow',), ('macd',), _MacdHollowIndicator),
+    'supertrend': IndicatorSpec(('supertrend', 'supertrend_trend', 'supertrend_signal'), (), _SupertrendIndicator),
+    'stoch_rsi': IndicatorSpec(('stoch_rsi', 'stoch_k', 'stoch_d'), ('rsi',), _StochRsiIndicator),
+    'obv': IndicatorSpec(('obv',), (), _ObvIndicator),
+}
+
+COLUMN_SOURCES = {col: name for name, spec in INDICATORS.items() for col in spec.outputs}
+
+
+def resolve_indicators(columns):
+    """Indicators needed to produce `columns`, dependencies included, in registry order."""
+    needed = set()
+    pending = [COLUMN_SOURCES[col] for col in columns if col in COLUMN_SOURCES]
+    while pending:
+        name = pending.pop()
+        if name not in needed:
+            needed.add(name)
+            pending.extend(INDICATORS[name].deps)
+    return [name for name in INDICATORS if name in needed]
+
+
+class IndicatorEngine:
+    """Running state for the INDICATOR_COLUMNS of a single symbol.
+
+    Indicators needed for `columns` (all of them by default) are advanced
+    eagerly by update(), one candle at a time in O(1). Any other indicator is
+    created on first use by ensure(), which replays the bars it has missed from
+    a CandleBuffer; if those bars are no longer in the window it starts over
+    from the oldest bar still held.
+    """
+
+    def __init__(self, columns=None):
+        self.eager = resolve_indicators(INDICATOR_COLUMNS if columns is None else columns)
+        self.nodes = {name: INDICATORS[name].factory() for name in self.eager}
+        self.node_bars = {name: 0 for name in self.eager}
+        self.bars = 0
+        self.last = {col: np.nan for col in ['High', 'Low', 'Close', 'Volume']}
+
+    @property
+    def columns(self):
+        """Indicator columns returned by update(), in INDICATOR_COLUMNS order."""
+        eager_columns = {col for name in self.eager for col in INDICATORS[name].outputs}
+        return [col for col in INDICATOR_COLUMNS if col in eager_columns]
+
+    def _ffill(self, name, value):
+        value = np.nan if value is None else float(value)
+        if value != value:
+            return self.last[name]
+        self.last[name] = value
+        return value
+
+    def update(self, open_, high, low, close, volume):
+        bar = {
+            'Open': np.nan if open_ is None else float(open_),
+            'High': self._ffill('High', high),
+            'Low': self._ffill('Low', low),
+            'Close': self._ffill('Close', close),
+            'Volume': self._ffill('Volume', volume),
+        }
+        for name in self.eager:
+            bar.update(self.nodes[name].update(bar))
+            self.node_bars[name] += 1
+        self.bars += 1
+        return {col: bar[col] for col in self.columns}
+
+    def ensure(self, columns, candles):
+        """Bring the indicators behind `columns` up to the latest bar in `candles`."""
+        for name in resolve_indicators(columns):
+            lag = self.bars - self.node_bars.get(name, 0)
+            if lag == 0:
+                continue
+            start_time = time.time()
+            if name not in self.nodes or lag > len(candles):
+                self.nodes[name] = INDICATORS[name].factory()
+                lag = len(candles)
+            node = self.nodes[name]
+            for offset in range(-lag, 0):
+                candles.update_row(offset, node.update(candles.row(offset)))
+            self.node_bars[name] = self.bars
+            if lag > 1:
+                logger.debug(f"Indicator {name} evaluated on demand over {lag} bars in {time.time() - start_time:.3f}s")
+
+    def warmup(self, df):
+        """Feed an OHLCV frame bar by bar; returns it with the indicator columns added."""
+        start_time = time.time()
+        df = df.copy()
+        for col in ['Close', 'High', 'Low', 'Volume']:
+            df[col] = df[col].ffill()
+        rows = [
+            self.update(o, h, l, c, v)
+            for o, h, l, c, v in zip(df['Open'], df['High'], df['Low'], df['Close'], df['Volume'])
+        ]
+        indicators = pd.DataFrame(rows, index=df.index, columns=self.columns)
+        for col in self.columns:
+            df[col] = indicators[col]
+        logger.debug(f"Indicator engine warmed up on {len(df)} bars in {time.time() - start_time:.3f}s")
+        return df
+
+
+def _batch_ema(values, length, first_valid):
+    # pandas_ta ema() (presma=True) applied to every column from its own first
+    # valid row: SMA of the first `length` values, then ewm(span, adjust=False)
+    bars, symbols = values.shape
+    seeded = np.full_like(values, np.nan)
+    ok = first_valid + length <= bars
+    if ok.any():
+        cols = np.flatnonzero(ok)
+        rows = first_valid[cols, None] + np.arange(length)
+        seed_values = np.ascontiguousarray(values[rows, cols[:, None]])
+        seed = seed_values.sum(axis=1) / np.count_nonzero(~np.isnan(seed_values), axis=1)
+        seed_rows = first_valid[cols] + length - 1
+        after = np.arange(bars)[:, None] > seed_rows
+        seeded[:, cols] = np.where(after, values[:, cols], np.nan)
+        seeded[seed_rows, cols] = seed
+    return pd.DataFrame(seeded).ewm(span=length, adjust=False).mean().to_numpy()
+
+
+def _first_valid(frame):
+    valid = frame.notna().to_numpy()
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), len(frame))
+
+
+def batch_indicators(panel):
+    """Every INDICATOR_COLUMNS column for many symbols at once.
+
+    `panel` maps 'Open', 'High', 'Low', 'Close' and 'Volume' to DataFrames
+    indexed by candle time with one column per symbol. Returns a dict of
+    column -> DataFrame of the same shape. Each symbol is treated from its own
+    first candle, so its values equal a single-symbol run on its rows; gaps
+    inside the common index are forward-filled like missing values are.
+    """
+    open_ = panel['Open']
+    high = panel['High'].ffill()
+    low = panel['Low'].ffill()
+    close = panel['Close'].ffill()
+    volume = panel['Volume'].ffill()
+    index, symbols = close.index, close.columns
+    bars = len(index)
+    first_valid = _first_valid(close)
+    frame = lambda values: pd.DataFrame(values, index=index, columns=symbols)
+    out = {}
+
+    close_values = close.to_numpy(dtype=float)
+    ema1 = frame(_batch_ema(close_values, EMA1_LENGTH, first_valid))
+    ema2 = frame(_batch_ema(close_values, EMA2_LENGTH, first_valid))
+    out['ema1'] = ema1
+    out['ema2'] = ema2
+
+    negative = close.diff()
+    positive = negative.copy()
+    positive[positive < 0] = 0
+    negative[negative > 0] = 0
+    positive_avg = positive.ewm(alpha=1.0 / RSI_LENGTH, adjust=False).mean()
+    negative_avg = negative.ewm(alpha=1.0 / RSI_LENGTH, adjust=False).mean()
+    out['rsi'] = 100 * positive_avg / (positive_avg + negative_avg.abs())
+
+    highest_high = high.rolling(KDJ_LENGTH).max()
+    lowest_low = low.rolling(KDJ_LENGTH).min()
+    kdj_range = highest_high - lowest_low
+    kdj_range = kdj_range + _RANGE_EPSILON * kdj_range.eq(0).any(axis=0)
+    fastk = 100 * (close - lowest_low) / kdj_range
+    k = fastk.ewm(alpha=1.0 / KDJ_SIGNAL, min_periods=KDJ_SIGNAL).mean()
+    d = k.ewm(alpha=1.0 / KDJ_SIGNAL, min_periods=KDJ_SIGNAL).mean()
+    out['k'] = k
+    out['d'] = d
+    out['j'] = 3 * k - 2 * d
+
+    macd = ema1 - ema2
+    macd_signal = frame(_batch_ema(macd.to_numpy(), MACD_SIGNAL, _first_valid(macd)))
+    macd_hist = macd - macd_signal
+    out['macd'] = macd
+    out['macd_signal'] = macd_signal
+    out['macd_hist'] = macd_hist
+
+    out['diff'] = close - open_
+    out['diff1e'] = ema1 - ema2
+    out['diff2m'] = macd - macd_signal
+    out['diff3k'] = out['j'] - d
+    out['lst_diff'] = ema1.shift(1) - ema1
+    prev_hist = macd_hist.shift(1)
+    hollow = ((macd_hist > 0) & (macd_hist > prev_hist)) | ((macd_hist < 0) & (macd_hist < prev_hist))
+    out['macd_hollow'] = macd_hist.where(hollow, 0.0)
+
+    # Supertrend: the band recursion steps through time for all symbols at once
+    prev_close = close.shift()
+    tr = np.fmax(np.fmax((high - low).to_numpy(), (high - prev_close).abs().to_numpy()), (low - prev_close).abs().to_numpy())
+    atr = frame(tr).rolling(ST_LENGTH, min_periods=1).mean()
+    hl2 = (high + low) / 2
+    basic_upperband = (hl2 + (ST_MULTIPLIER * atr)).to_numpy()
+    basic_lowerband = (hl2 - (ST_MULTIPLIER * atr)).to_numpy()
+    final_upperband = basic_upperband.copy()
+    final_lowerband = basic_lowerband.copy()
+    closes = close_values
+    for t in range(1, bars):
+        started = t > first_valid
+        prev_upper, prev_lower, prev_c = final_upperband[t - 1], final_lowerband[t - 1], closes[t - 1]
+        reset_upper = (basic_upperband[t] < prev_upper) | (prev_c > prev_upper)
+        reset_lower = (basic_lowerband[t] > prev_lower) | (prev_c < prev_lower)
+        final_upperband[t] = np.where(started & ~reset_upper, prev_upper, basic_upperband[t])
+        final_lowerband[t] = np.where(started & ~reset_lower, prev_lower, basic_lowerband[t])
+    out['supertrend'] = frame(np.where(closes <= final_upperband, final_upperband, final_lowerband))
+    prev_final_upperband = np.vstack([np.full((1, len(symbols)), np.nan), final_upperband[:-1]])
+    trend = closes > prev_final_upperband
+    own_first_row = np.arange(bars)[:, None] <= first_valid
+    prev_trend = np.where(own_first_row, True, np.vstack([np.ones((1, len(symbols)), dtype=bool), trend[:-1]]))
+    out['supertrend_trend'] = frame(np.where(trend, 'Up', 'Down'))
+    out['supertrend_signal'] = frame(np.where(trend & ~prev_trend, 'buy', np.where(~trend & prev_trend, 'sell', None)))
+
+    rsi = out['rsi'].ffill()
+    rsi_min = rsi.rolling(STOCH_RSI_LENGTH, min_periods=1).min()
+    rsi_max = rsi.rolling(STOCH_RSI_LENGTH, min_periods=1).max()
+    stochrsi = (rsi - rsi_min) / (rsi_max - rsi_min + 1e-12)
+    out['stoch_rsi'] = stochrsi
+    out['stoch_k'] = stochrsi.rolling(STOCH_K_LENGTH, min_periods=1).mean() * 100
+    out['stoch_d'] = out['stoch_k'].rolling(STOCH_D_LENGTH, min_periods=1).mean()
+
+    direction = np.sign(close.diff().fillna(0))
+    out['obv'] = (direction * volume).fillna(0).cumsum()
+    return {col: out[col] for col in INDICATOR_COLUMNS}
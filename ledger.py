@@ -0,0 +1,89 @@
+# ledger.py
+# Local copy of the account's free balances.
+#
+# Seeded once from fetch_balance() and then updated from the fill details of
+# every order the bot places (filled amount, cost and fees), so a sell can be
+# sized without a balance round-trip. reconcile() refetches the balances,
+# logs any drift (deposits, manual trades, fees in other assets) and adopts
+# the exchange's numbers. A fill applied while the balances were being fetched
+# may or may not be in them, so that fetch is discarded and tried again.
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AccountLedger:
+    def __init__(self, exchange, reconcile_seconds=300):
+        self.exchange = exchange
+        self.reconcile_seconds = reconcile_seconds
+        self.balances = {}
+        self.synced_at = None
+        # Number of fills applied; reconcile() only adopts a fetch no fill raced with
+        self.fills = 0
+        self.lock = threading.Lock()
+
+    def _fetch(self):
+        balance = self.exchange.fetch_balance()
+        return {asset: float(values['free'] or 0) for asset, values in balance.items()
+                if isinstance(values, dict) and 'free' in values}
+
+    def seed(self):
+        balances = self._fetch()
+        with self.lock:
+            self.balances = balances
+            self.synced_at = time.time()
+        logger.info(f"Account ledger seeded with {len(balances)} assets")
+
+    def free(self, asset):
+        if self.synced_at is None:
+            self.seed()
+        with self.lock:
+            return self.balances.get(asset, 0.0)
+
+    def apply_fill(self, symbol, side, order):
+        """Update balances from a ccxt order response."""
+        if self.synced_at is None:
+            # Not seeded yet; the first seed will already include this fill
+            return
+        base, quote = symbol.split('/')
+        filled = order.get('filled')
+        filled = float(order.get('amount') or 0) if filled is None else float(filled)
+        cost = order.get('cost')
+        if cost is None:
+            cost = filled * float(order.get('average') or order.get('price') or 0)
+        fees = order.get('fees') or ([order['fee']] if order.get('fee') else [])
+        with self.lock:
+            sign = 1 if side == 'buy' else -1
+            self.balances[base] = self.balances.get(base, 0.0) + sign * filled
+            self.balances[quote] = self.balances.get(quote, 0.0) - sign * float(cost)
+            for fee in fees:
+                if fee and fee.get('cost') and fee.get('currency'):
+                    self.balances[fee['currency']] = self.balances.get(fee['currency'], 0.0) - float(fee['cost'])
+            self.fills += 1
+        logger.debug(f"Ledger {side} fill {symbol}: {filled} for {cost}, {base}={self.balances[base]}, {quote}={self.balances[quote]}")
+
+    def reconcile(self, attempts=3):
+        """Replace local balances with the exchange's, logging assets that drifted. Returns False if fills kept racing the fetch."""
+        for _ in range(attempts):
+            with self.lock:
+                fills = self.fills
+            balances = self._fetch()
+            with self.lock:
+                if self.fills != fills:
+                    logger.debug("Ledger fill applied during balance fetch, refetching")
+                    continue
+                for asset in set(balances) | set(self.balances):
+                    local, remote = self.balances.get(asset, 0.0), balances.get(asset, 0.0)
+                    if abs(local - remote) > 1e-9 * max(1.0, abs(remote)):
+                        logger.warning(f"Ledger drift for {asset}: local {local}, exchange {remote}")
+                self.balances = balances
+                self.synced_at = time.time()
+                return True
+        # synced_at is left alone, so the reconciler tries again on its next pass
+        logger.warning(f"Ledger reconcile skipped: fills applied during each of {attempts} balance fetches")
+        return False
+
+    def due(self):
+        return self.synced_at is None or time.time() - self.synced_at >= self.reconcile_seconds
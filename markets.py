@@ -0,0 +1,102 @@
+# markets.py
+# Per-symbol trading rules cached from exchange.load_markets().
+#
+# ai_decision used to call load_markets() and amount_to_precision() every bar
+# to size an order it usually does not place. MarketCache keeps the step size
+# and min/max limits of each symbol for `ttl` seconds and rounds quantities
+# locally, the same way ccxt's amount_to_precision truncates them. A symbol
+# the exchange does not list triggers at most one reload per `ttl` before
+# get() gives up on it with a ValueError.
+import logging
+import threading
+import time
+from collections import namedtuple
+from decimal import ROUND_DOWN, Decimal
+
+try:
+    import ccxt
+except ImportError:
+    ccxt = None
+
+logger = logging.getLogger(__name__)
+
+MarketRules = namedtuple('MarketRules', ['symbol', 'amount_step', 'price_step', 'min_amount', 'max_amount', 'min_notional'])
+
+
+def _step(precision, precision_mode):
+    if precision is None:
+        return None
+    if ccxt is not None and precision_mode == ccxt.DECIMAL_PLACES:
+        return Decimal(1).scaleb(-int(precision))
+    if ccxt is not None and precision_mode == ccxt.TICK_SIZE:
+        return Decimal(str(precision))
+    return None
+
+
+def market_rules(symbol, market, precision_mode):
+    precision = market.get('precision') or {}
+    limits = market.get('limits') or {}
+    return MarketRules(
+        symbol=symbol,
+        amount_step=_step(precision.get('amount'), precision_mode),
+        price_step=_step(precision.get('price'), precision_mode),
+        min_amount=(limits.get('amount') or {}).get('min'),
+        max_amount=(limits.get('amount') or {}).get('max'),
+        min_notional=(limits.get('cost') or {}).get('min'),
+    )
+
+
+class MarketCache:
+    def __init__(self, exchange, ttl=3600):
+        self.exchange = exchange
+        self.ttl = ttl
+        self.rules = {}
+        self.loaded_at = 0.0
+        # symbol -> time of the last reload done because it was missing
+        self.missing = {}
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        """Reload every market from the exchange."""
+        start_time = time.time()
+        markets = self.exchange.load_markets(reload=True)
+        precision_mode = getattr(self.exchange, 'precisionMode', None)
+        rules = {symbol: market_rules(symbol, market, precision_mode) for symbol, market in markets.items()}
+        with self.lock:
+            self.rules = rules
+            self.loaded_at = time.time()
+        logger.info(f"Market rules for {len(rules)} symbols loaded in {time.time() - start_time:.3f}s")
+
+    def get(self, symbol):
+        now = time.time()
+        if now - self.loaded_at > self.ttl:
+            self.refresh()
+        elif symbol not in self.rules and now - self.missing.get(symbol, 0.0) > self.ttl:
+            # Maybe listed since the last load; ask again only once per ttl
+            self.missing[symbol] = now
+            self.refresh()
+        rules = self.rules.get(symbol)
+        if rules is None:
+            raise ValueError(f"Unknown market symbol {symbol} on {getattr(self.exchange, 'id', 'the exchange')}")
+        return rules
+
+    def amount_to_precision(self, symbol, amount):
+        """Amount truncated to the symbol's step size, as a string like ccxt returns."""
+        rules = self.get(symbol)
+        if rules.amount_step is None:
+            return self.exchange.amount_to_precision(symbol, amount)
+        steps = (Decimal(repr(float(amount))) / rules.amount_step).to_integral_value(rounding=ROUND_DOWN)
+        value = steps * rules.amount_step
+        return format(value.normalize(), 'f') if value else '0'
+
+    def order_amount(self, symbol, cost, price):
+        """Amount to spend `cost` at `price`, or None when it falls outside the symbol's limits."""
+        rules = self.get(symbol)
+        amount = self.amount_to_precision(symbol, cost / price)
+        if float(amount) <= 0 or (rules.min_amount is not None and float(amount) < rules.min_amount):
+            logger.warning(f"Order amount {amount} for {symbol} is below the minimum {rules.min_amount}")
+            return None
+        if rules.min_notional is not None and float(amount) * price < rules.min_notional:
+            logger.warning(f"Order value {float(amount) * price:.2f} for {symbol} is below the minimum notional {rules.min_notional}")
+            return None
+        return amount
@@ -0,0 +1,97 @@
+# migrations.py
+# Schema of the trades database as an ordered list of migrations.
+#
+# PRAGMA user_version holds the number of migrations a database file has
+# been through. migrate() reads it and applies only the missing ones, each in
+# its own transaction together with the version bump, so a migration either
+# runs completely and once, or not at all and is retried on the next start.
+# An up-to-date database costs a single PRAGMA read.
+#
+# Migrations are only ever appended: a database downloaded from an older
+# backup catches up by running the ones it has not seen.
+import logging
+
+from telemetry import TELEMETRY_COLUMNS, supertrend_sql
+
+logger = logging.getLogger(__name__)
+
+# Columns of the trades table after the id, in table order
+TRADES_COLUMNS = [
+    ('time', 'TEXT'), ('action', 'TEXT'), ('symbol', 'TEXT'), ('price', 'REAL'),
+    ('open_price', 'REAL'), ('close_price', 'REAL'), ('volume', 'REAL'), ('percent_change', 'REAL'),
+    ('stop_loss', 'REAL'), ('take_profit', 'REAL'), ('profit', 'REAL'), ('total_profit', 'REAL'),
+    ('return_profit', 'REAL'), ('total_return_profit', 'REAL'), ('ema1', 'REAL'), ('ema2', 'REAL'),
+    ('rsi', 'REAL'), ('k', 'REAL'), ('d', 'REAL'), ('j', 'REAL'), ('diff', 'REAL'),
+    ('diff1e', 'REAL'), ('diff2m', 'REAL'), ('diff3k', 'REAL'), ('macd', 'REAL'),
+    ('macd_signal', 'REAL'), ('macd_hist', 'REAL'), ('macd_hollow', 'REAL'), ('lst_diff', 'REAL'),
+    ('supertrend', 'REAL'), ('supertrend_trend', 'TEXT'), ('stoch_rsi', 'REAL'), ('stoch_k', 'REAL'),
+    ('stoch_d', 'REAL'), ('obv', 'REAL'), ('message', 'TEXT'), ('timeframe', 'TEXT'),
+    ('order_id', 'TEXT'), ('strategy', 'TEXT'), ('ts', 'INTEGER'),
+]
+
+
+def create_trades(c):
+    """trades with epoch-ms `ts` beside the display `time`, and the indexes of the report queries."""
+    columns = ', '.join(f"{name} {kind}" for name, kind in TRADES_COLUMNS)
+    c.execute(f"CREATE TABLE IF NOT EXISTS trades (id INTEGER PRIMARY KEY AUTOINCREMENT, {columns})")
+    # Files from before versioning may lack the newer columns
+    existing = {col[1] for col in c.execute("PRAGMA table_info(trades)").fetchall()}
+    for name, kind in TRADES_COLUMNS:
+        if name not in existing:
+            c.execute(f"ALTER TABLE trades ADD COLUMN {name} {kind}")
+            logger.info(f"Added column {name} to trades table")
+    # Stored times are UTC "%Y-%m-%d %H:%M:%S"
+    c.execute("UPDATE trades SET ts = CAST(strftime('%s', time) AS INTEGER) * 1000 WHERE ts IS NULL")
+    c.execute("DROP INDEX IF EXISTS idx_trades_time")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_trades_ts ON trades(ts)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_trades_action_ts ON trades(action, ts)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_trades_timeframe_action_ts ON trades(timeframe, action, ts)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_trades_strategy_action ON trades(strategy, action)")
+
+
+def create_telemetry(c):
+    """telemetry table, taking over the hold rows stored in trades."""
+    columns = ', '.join(f"{col} REAL" for col in TELEMETRY_COLUMNS)
+    c.execute(f"CREATE TABLE IF NOT EXISTS telemetry (ts INTEGER NOT NULL, symbol TEXT, timeframe TEXT, {columns})")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_telemetry_ts ON telemetry(ts)")
+    values = ', '.join(
+        supertrend_sql() if col == 'supertrend_trend' else col
+        for col in TELEMETRY_COLUMNS
+    )
+    hold_rows = "action = 'hold' AND COALESCE(strategy, '') NOT IN ('initial', 'test') AND ts IS NOT NULL"
+    c.execute(f"""
+        INSERT INTO telemetry (ts, symbol, timeframe, {', '.join(TELEMETRY_COLUMNS)})
+        SELECT ts, symbol, timeframe, {values} FROM trades WHERE {hold_rows} ORDER BY id
+    """)
+    moved = c.rowcount
+    c.execute(f"DELETE FROM trades WHERE {hold_rows}")
+    logger.info(f"Moved {moved} hold rows from trades to telemetry")
+
+
+# (version reached, description, migration); versions are consecutive from 1
+MIGRATIONS = [
+    (1, "trades table with epoch-ms ts and report indexes", create_trades),
+    (2, "telemetry table for hold bars", create_telemetry),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate(conn):
+    """Bring the database to SCHEMA_VERSION. Returns the version it had."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version > SCHEMA_VERSION:
+        logger.warning(f"Database schema version {version} is newer than this bot's {SCHEMA_VERSION}")
+    if conn.in_transaction:
+        conn.commit()
+    for target, description, apply in MIGRATIONS[version:]:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            apply(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info(f"Database migrated to schema version {target}: {description}")
+    return version
@@ -0,0 +1,147 @@
+# resilience.py
+# Retries and circuit breakers shared by every outbound call of the bot.
+#
+# retry_call() retries with full-jitter exponential backoff (a random delay up
+# to base * 2**attempt, capped) instead of a fixed sleep, and gives up early
+# when the next attempt would start after `deadline`, so a failing request
+# never pushes the trading loop past the next bar boundary. An exception that
+# carries `retry_after` (Telegram's flood control) waits at least that long.
+#
+# A CircuitBreaker per endpoint (exchange method, Telegram, GitHub) opens
+# after `failure_threshold` consecutive failures. While open, calls fail at
+# once with CircuitOpenError instead of waiting on timeouts; after
+# `reset_seconds` one probe call is let through and its result closes or
+# reopens the breaker. breaker_status() reports every breaker for /status.
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_seconds=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.time() - self.opened_at >= self.reset_seconds:
+                self.state = 'half_open'
+                self.probing = False
+            if self.state == 'half_open' and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            if self.state != 'closed':
+                logger.info(f"Circuit {self.name} closed")
+            self.state = 'closed'
+            self.failures = 0
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+                logger.warning(f"Circuit {self.name} opened after {self.failures} failures, retrying in {self.reset_seconds}s")
+                self.state = 'open'
+                self.opened_at = time.time()
+
+    def check(self):
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit {self.name} is open")
+
+    def snapshot(self):
+        with self.lock:
+            retry_in = max(0.0, self.opened_at + self.reset_seconds - time.time()) if self.state == 'open' else 0.0
+            return {'state': self.state, 'failures': self.failures, 'retry_in': round(retry_in, 1)}
+
+
+breakers = {}
+breakers_lock = threading.Lock()
+
+
+def get_breaker(name, failure_threshold=5, reset_seconds=30):
+    """The breaker for `name`, created on first use."""
+    with breakers_lock:
+        if name not in breakers:
+            breakers[name] = CircuitBreaker(name, failure_threshold, reset_seconds)
+        return breakers[name]
+
+
+def breaker_status():
+    with breakers_lock:
+        return {name: breaker.snapshot() for name, breaker in sorted(breakers.items())}
+
+
+def backoff_delay(attempt, base_delay=0.5, max_delay=10.0):
+    """Full-jitter exponential backoff before retry number `attempt` (0-based)."""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def retry_after(exc):
+    """Seconds the endpoint asked to wait before the next call, or None."""
+    value = getattr(exc, 'retry_after', None)
+    if value is None:
+        return None
+    if hasattr(value, 'total_seconds'):
+        value = value.total_seconds()
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_call(func, *args, attempts=3, base_delay=0.5, max_delay=10.0, deadline=None, breaker=None, retry_on=(Exception,), no_retry=(), **kwargs):
+    """func(*args, **kwargs), retried on `retry_on` exceptions (other than `no_retry`) with backoff.
+
+    Gives up with the last exception once `attempts` are used or the next
+    attempt would start after `deadline` (epoch seconds). CircuitOpenError
+    is never retried.
+    """
+    for attempt in range(attempts):
+        if breaker is not None:
+            breaker.check()
+        try:
+            result = func(*args, **kwargs)
+        except CircuitOpenError:
+            raise
+        except retry_on as e:
+            if isinstance(e, no_retry):
+                # The endpoint answered; the request itself was wrong
+                if breaker is not None:
+                    breaker.record_success()
+                raise
+            if breaker is not None:
+                breaker.record_failure()
+            delay = max(backoff_delay(attempt, base_delay, max_delay), retry_after(e) or 0.0)
+            if attempt == attempts - 1 or (deadline is not None and time.time() + delay >= deadline):
+                raise
+            logger.warning(f"{getattr(func, '__name__', 'call')} failed (attempt {attempt + 1}/{attempts}): {e}; retrying in {delay:.2f}s")
+            time.sleep(delay)
+        except Exception:
+            # Not known to be harmless: count it, which also ends a half-open probe
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            return result
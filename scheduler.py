@@ -0,0 +1,205 @@
+# scheduler.py
+# One gate for every request the bot sends to the exchange.
+#
+# Binance bans an IP that exceeds its request weight per minute, and every
+# part of the bot (candle fetches, market rules, balances, orders, the
+# scanner) used to call ccxt on its own. RequestScheduler keeps a single
+# token bucket over that weight budget and admits waiting requests by
+# priority: orders first, then account requests, then market data. Data
+# requests also leave `order_reserve` of the budget untouched so a burst of
+# refreshes can never delay an order.
+#
+# Identical data and account requests already in flight are coalesced: the
+# later callers wait for the first one and share its result. Orders are never
+# coalesced.
+#
+# Each exchange method has its own circuit breaker (see resilience.py): network
+# failures and timeouts open it, exchange errors such as an invalid order do not.
+#
+# ScheduledExchange wraps a ccxt exchange so existing code keeps calling
+# exchange.fetch_ohlcv(...) etc. while every call goes through the scheduler.
+import functools
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from resilience import get_breaker
+
+try:
+    import ccxt
+except ImportError:
+    ccxt = None
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_ORDER = 0
+PRIORITY_ACCOUNT = 1
+PRIORITY_DATA = 2
+
+# Binance spot weights of the endpoints behind each ccxt method; others count as 1
+REQUEST_WEIGHTS = {
+    'load_markets': 20,
+    'fetch_markets': 20,
+    'fetch_balance': 20,
+    'fetch_ticker': 2,
+    'fetch_tickers': 80,
+    'fetch_order': 4,
+    'fetch_open_orders': 6,
+    'fetch_my_trades': 20,
+}
+
+ACCOUNT_METHODS = {'fetch_balance', 'fetch_order', 'fetch_orders', 'fetch_open_orders', 'fetch_closed_orders', 'fetch_my_trades'}
+
+# Seconds to stop sending after a 429/418 without a Retry-After header
+RATE_LIMIT_PAUSE = 60
+
+
+def klines_weight(limit):
+    """Binance request weight of GET /api/v3/klines for a given limit."""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def request_priority(method):
+    if method.startswith(('create_', 'cancel_', 'edit_')):
+        return PRIORITY_ORDER
+    if method in ACCOUNT_METHODS:
+        return PRIORITY_ACCOUNT
+    return PRIORITY_DATA
+
+
+def request_weight(method, args, kwargs):
+    if method == 'fetch_ohlcv':
+        limit = kwargs.get('limit', args[3] if len(args) > 3 else None)
+        return klines_weight(limit or 500)
+    return REQUEST_WEIGHTS.get(method, 1)
+
+
+class WeightBudget:
+    """Token bucket over the exchange's request weight per minute."""
+
+    def __init__(self, per_minute=4800):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def refill(self, now=None):
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RequestScheduler:
+    def __init__(self, weight_per_minute=4800, order_reserve=0.1):
+        self.budget = WeightBudget(weight_per_minute)
+        self.order_reserve = weight_per_minute * order_reserve
+        self.cond = threading.Condition()
+        self.waiting = []
+        self.tickets = itertools.count()
+        self.blocked_until = 0.0
+        self.inflight = {}
+        self.requests = 0
+        self.coalesced = 0
+
+    def acquire(self, weight, priority=PRIORITY_DATA):
+        """Block until `weight` fits the budget and no higher-priority or older request is waiting."""
+        reserve = 0 if priority == PRIORITY_ORDER else self.order_reserve
+        weight = min(weight, self.budget.capacity - reserve)
+        ticket = (priority, next(self.tickets))
+        with self.cond:
+            heapq.heappush(self.waiting, ticket)
+            try:
+                while True:
+                    timeout = None
+                    if self.waiting[0] == ticket:
+                        now = time.monotonic()
+                        if now < self.blocked_until:
+                            timeout = self.blocked_until - now
+                        else:
+                            self.budget.refill(now)
+                            if self.budget.tokens - weight >= reserve:
+                                self.budget.tokens -= weight
+                                self.requests += 1
+                                return
+                            timeout = (weight + reserve - self.budget.tokens) / self.budget.rate
+                    self.cond.wait(timeout)
+            finally:
+                self.waiting.remove(ticket)
+                heapq.heapify(self.waiting)
+                self.cond.notify_all()
+
+    def observe(self, headers=None, error=None):
+        """Sync the budget with the weight the exchange reports, and pause after a rate-limit error."""
+        headers = headers or {}
+        with self.cond:
+            used = headers.get('x-mbx-used-weight-1m') or headers.get('X-MBX-USED-WEIGHT-1M')
+            if used is not None:
+                self.budget.refill()
+                self.budget.tokens = min(self.budget.tokens, self.budget.capacity - float(used))
+            if ccxt is not None and isinstance(error, ccxt.DDoSProtection):
+                pause = float(headers.get('Retry-After') or headers.get('retry-after') or RATE_LIMIT_PAUSE)
+                self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+                logger.warning(f"Exchange rate limit hit, pausing requests for {pause:.0f}s: {error}")
+
+    def call(self, exchange, method, *args, **kwargs):
+        """exchange.<method>(*args, **kwargs) once the scheduler admits it."""
+        priority = request_priority(method)
+        breaker = get_breaker(f"exchange.{method}")
+        key = None
+        if priority != PRIORITY_ORDER:
+            key = (id(exchange), method, repr(args), repr(sorted(kwargs.items())))
+            with self.cond:
+                future = self.inflight.get(key)
+                if future is None:
+                    self.inflight[key] = Future()
+                else:
+                    self.coalesced += 1
+            if future is not None:
+                logger.debug(f"Coalesced {method}{args} with a request in flight")
+                return future.result()
+        try:
+            breaker.check()
+            self.acquire(request_weight(method, args, kwargs), priority)
+            try:
+                result = getattr(exchange, method)(*args, **kwargs)
+            except Exception as e:
+                self.observe(getattr(exchange, 'last_response_headers', None), e)
+                if ccxt is None or not isinstance(e, ccxt.ExchangeError):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                raise
+            self.observe(getattr(exchange, 'last_response_headers', None))
+            breaker.record_success()
+        except BaseException as e:
+            if key is not None:
+                with self.cond:
+                    self.inflight.pop(key).set_exception(e)
+            raise
+        if key is not None:
+            with self.cond:
+                self.inflight.pop(key).set_result(result)
+        return result
+
+
+class ScheduledExchange:
+    """ccxt exchange whose API methods go through a RequestScheduler; everything else passes through."""
+
+    def __init__(self, exchange, scheduler):
+        self.exchange = exchange
+        self.scheduler = scheduler
+
+    def __getattr__(self, name):
+        attr = getattr(self.exchange, name)
+        if callable(attr) and (name == 'load_markets' or name.startswith(('fetch_', 'create_', 'cancel_', 'edit_'))):
+            return functools.partial(self.scheduler.call, self.exchange, name)
+        return attr
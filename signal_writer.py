@@ -0,0 +1,142 @@
+# signal_writer.py
+# Write-behind queue for the rows of the trades table.
+#
+# Every bar of every symbol and timeframe stores a signal, and committing each
+# one on its own costs an fsync while holding the database lock, stalling the
+# trading loop and every Flask route behind it. SignalWriter takes signals
+# from a bounded queue on a background thread and hands them to `write_batch`
+# in groups, one transaction per group: a batch is written once it holds
+# `batch_size` rows or its oldest row has waited `flush_seconds`.
+#
+# Rows whose action is in `durable_actions` (buy and sell by default) are not
+# left in memory: submit() wakes the writer and returns only after the batch
+# holding the row is committed, so an order is never recorded later than it
+# was placed. flush() does the same for everything queued so far (before a
+# backup upload), and stop() flushes and ends the thread (from cleanup).
+# Before start() and after stop(), submit() writes synchronously.
+#
+# A full queue blocks submit() until the writer catches up rather than
+# dropping rows.
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Queue item asking the writer to commit what it holds and exit
+_STOP = object()
+
+
+class SignalWriter:
+    def __init__(self, write_batch, batch_size=100, flush_seconds=1.0, max_queue=10000, durable_actions=('buy', 'sell'), durable_timeout=60.0):
+        self.write_batch = write_batch
+        self.batch_size = max(1, int(batch_size))
+        self.flush_seconds = flush_seconds
+        self.durable_actions = set(durable_actions)
+        self.durable_timeout = durable_timeout
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.thread = None
+        self.lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+        self.last_batch_seconds = 0.0
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        with self.lock:
+            if not self.running:
+                self.thread = threading.Thread(target=self._run, name='signal-writer', daemon=True)
+                self.thread.start()
+
+    def submit(self, signal):
+        """Queue a signal; durable actions return once their row is committed."""
+        if not self.running:
+            self._write([signal], [])
+            return
+        done = threading.Event() if signal.get('action') in self.durable_actions else None
+        if self.queue.full():
+            logger.warning(f"Signal queue full ({self.queue.maxsize} rows), waiting for the writer")
+        self.queue.put((signal, done))
+        if done is not None and not done.wait(self.durable_timeout):
+            logger.error(f"{signal.get('action')} signal at {signal.get('time')} not committed after {self.durable_timeout:.0f}s")
+
+    def flush(self, timeout=None):
+        """Commit everything queued so far. Returns False if the writer did not finish in time."""
+        if not self.running:
+            return True
+        done = threading.Event()
+        self.queue.put((None, done))
+        return done.wait(self.durable_timeout if timeout is None else timeout)
+
+    def stop(self, timeout=None):
+        """Commit the queued signals and end the writer thread."""
+        with self.lock:
+            thread = self.thread
+            if thread is None or not thread.is_alive():
+                return
+            self.queue.put((_STOP, None))
+            thread.join(self.durable_timeout if timeout is None else timeout)
+            if thread.is_alive():
+                logger.error(f"Signal writer did not stop, {self.queue.qsize()} signals still queued")
+            else:
+                self.thread = None
+
+    def status(self):
+        return {
+            'queued': self.queue.qsize(),
+            'written': self.written,
+            'batches': self.batches,
+            'last_batch_seconds': round(self.last_batch_seconds, 4),
+        }
+
+    def _write(self, signals, waiters):
+        start_time = time.time()
+        try:
+            if signals:
+                self.write_batch(signals)
+        except Exception as e:
+            logger.error(f"Error writing {len(signals)} signals: {e}")
+        else:
+            self.written += len(signals)
+            self.batches += 1 if signals else 0
+            self.last_batch_seconds = time.time() - start_time
+        finally:
+            for done in waiters:
+                done.set()
+
+    def _run(self):
+        while True:
+            signals, waiters = [], []
+            stopping = False
+            item = self.queue.get()
+            deadline = time.monotonic() + self.flush_seconds
+            while True:
+                signal, done = item
+                if signal is _STOP:
+                    stopping = True
+                elif signal is not None:
+                    signals.append(signal)
+                if done is not None:
+                    waiters.append(done)
+                if len(signals) >= self.batch_size and not stopping:
+                    break
+                try:
+                    if stopping or waiters:
+                        # Someone is waiting on this batch: take only what is already queued
+                        item = self.queue.get_nowait()
+                    else:
+                        timeout = deadline - time.monotonic()
+                        if timeout <= 0:
+                            break
+                        item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            self._write(signals, waiters)
+            if signals:
+                logger.debug(f"Signal writer committed {len(signals)} signals in {self.last_batch_seconds:.3f}s")
+            if stopping:
+                return
@@ -0,0 +1,54 @@
+# telemetry.py
+# Rows of the telemetry table: the indicator values of every hold bar.
+#
+# A row is keyed like a trade, by `ts`, the epoch ms at which the bot made
+# the decision (the signal's `ts`, or its `time` for rows moved out of an
+# older trades table), plus symbol and timeframe. All other columns are
+# REAL; the Supertrend direction, 'Up'/'Down' in signals and 1/0 in old
+# trades rows, is stored as 1.0/0.0 both when a live signal is written and
+# when old rows are migrated.
+
+# Indicator columns persisted with every signal
+SIGNAL_COLUMNS = [
+    'ema1', 'ema2', 'rsi', 'k', 'd', 'j', 'diff', 'diff1e', 'diff2m', 'diff3k',
+    'macd', 'macd_signal', 'macd_hist', 'macd_hollow', 'lst_diff', 'supertrend',
+    'supertrend_trend', 'stoch_rsi', 'stoch_k', 'stoch_d', 'obv'
+]
+
+# Per-bar indicator values of hold cycles, kept apart from the trades table
+TELEMETRY_COLUMNS = ['price', 'open_price', 'close_price', 'volume', 'percent_change'] + SIGNAL_COLUMNS
+
+INSERT_TELEMETRY_SQL = f"""
+    INSERT INTO telemetry (ts, symbol, timeframe, {', '.join(TELEMETRY_COLUMNS)})
+    VALUES ({', '.join('?' * (len(TELEMETRY_COLUMNS) + 3))})
+"""
+
+
+def supertrend_value(trend):
+    """'Up' -> 1.0, 'Down' -> 0.0; numbers (old rows) -> 1.0 when positive; anything else -> None."""
+    if isinstance(trend, str):
+        label = trend.strip().lower()
+        if label == 'up':
+            return 1.0
+        if label == 'down':
+            return 0.0
+    try:
+        return 1.0 if float(trend) > 0 else 0.0
+    except (TypeError, ValueError):
+        return None
+
+
+def supertrend_sql(column='supertrend_trend'):
+    """supertrend_value() as an SQL expression, for migrating stored rows."""
+    return (
+        f"CASE WHEN lower(trim({column})) = 'up' THEN 1.0"
+        f" WHEN lower(trim({column})) = 'down' THEN 0.0"
+        f" WHEN typeof({column}) IN ('integer', 'real')"
+        f" OR (trim({column}) GLOB '*[0-9]*' AND NOT trim({column}) GLOB '*[^-+0-9.eE]*')"
+        f" THEN CASE WHEN CAST({column} AS REAL) > 0 THEN 1.0 ELSE 0.0 END END"
+    )
+
+
+def telemetry_row(signal):
+    values = [supertrend_value(signal[col]) if col == 'supertrend_trend' else signal[col] for col in TELEMETRY_COLUMNS]
+    return (signal['ts'], signal['symbol'], signal['timeframe'], *values)
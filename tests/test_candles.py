@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from candle_store import MAX_FETCH, CandleStore  # noqa: E402
+from candles import BarAggregator, ohlcv_panel  # noqa: E402
+
+MINUTE = 60_000
+DAY = 1440 * MINUTE
+
+
+class MinuteExchange:
+    """fetch_ohlcv over a continuous 1m history, at most MAX_FETCH candles per call."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        self.calls += 1
+        return [[ts, 1.0, 2.0, 0.5, 1.5, 1.0] for ts in range(since, since + min(limit, MAX_FETCH) * MINUTE, MINUTE)]
+
+
+def test_backfill_pages_through_a_whole_day(tmp_path):
+    store = CandleStore(str(tmp_path / 'candles.db'))
+    exchange = MinuteExchange()
+    since = 20000 * DAY
+    store.backfill(exchange, 'BTC/USDT', '1m', since, now_ms=since + DAY)
+    candles = store.load('BTC/USDT', '1m', since=since)
+    assert exchange.calls == 2
+    assert len(candles) == 1440
+    assert [c[0] for c in candles] == list(range(since, since + DAY, MINUTE))
+
+    aggregator = BarAggregator('1d', '1m', since=since)
+    bars = [bar for candle in candles for bar in aggregator.update(candle)]
+    assert len(bars) == 1 and bars[0][0] == since and bars[0][5] == 1440.0
+    store.close()
+
+
+def test_first_bar_is_dropped_when_base_data_starts_after_its_open():
+    since = 20000 * DAY
+    aggregator = BarAggregator('1d', '1m', since=since)
+    candles = [[ts, 1.0, 2.0, 0.5, 1.5, 1.0] for ts in range(since + 500 * MINUTE, since + 2 * DAY, MINUTE)]
+    bars = [bar for candle in candles for bar in aggregator.update(candle)]
+    assert [bar[0] for bar in bars] == [since + DAY]
+
+
+def test_panel_aligns_symbols_with_different_histories():
+    btc = [[ts, 1.0, 2.0, 0.5, 1.5, 10.0] for ts in range(0, 5 * MINUTE, MINUTE)]
+    eth = [[ts, 3.0, 4.0, 2.5, None, 20.0] for ts in range(2 * MINUTE, 6 * MINUTE, MINUTE)]
+    panel = ohlcv_panel({'BTC/USDT': btc, 'ETH/USDT': eth})
+    close = panel['Close']
+    assert list(close.columns) == ['BTC/USDT', 'ETH/USDT']
+    assert list(close.index) == list(range(0, 6 * MINUTE, MINUTE))
+    assert close['BTC/USDT'].isna().tolist() == [False] * 5 + [True]
+    assert close['ETH/USDT'].isna().all()
+    assert panel['Volume']['ETH/USDT'].tolist()[2:] == [20.0] * 4
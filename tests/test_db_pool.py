@@ -0,0 +1,28 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from db_pool import connect_writer, snapshot  # noqa: E402
+
+
+def test_snapshot_includes_rows_only_in_the_wal(tmp_path):
+    path = str(tmp_path / 'trades.db')
+    writer = connect_writer(path)
+    writer.execute("PRAGMA wal_autocheckpoint=0")
+    writer.execute("CREATE TABLE trades (id INTEGER PRIMARY KEY, action TEXT)")
+    writer.executemany("INSERT INTO trades (action) VALUES (?)", [('buy',), ('sell',)])
+    writer.commit()
+    # An open write transaction is not part of the copy
+    writer.execute("INSERT INTO trades (action) VALUES ('hold')")
+
+    copy_path = tmp_path / 'copy.db'
+    copy_path.write_bytes(snapshot(path))
+    writer.rollback()
+    writer.close()
+
+    copy = sqlite3.connect(str(copy_path))
+    assert copy.execute("SELECT action FROM trades ORDER BY id").fetchall() == [('buy',), ('sell',)]
+    assert copy.execute("PRAGMA integrity_check").fetchone()[0] == 'ok'
+    assert list(tmp_path.glob('tmp*.db')) == []
@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from indicators import (  # noqa: E402
+    EMA1_LENGTH, EMA2_LENGTH, KDJ_LENGTH, KDJ_SIGNAL, MACD_FAST, MACD_SIGNAL, MACD_SLOW, RSI_LENGTH,
+    IndicatorEngine,
+)
+
+ta = pytest.importorskip('pandas_ta')
+
+
+def ohlcv(bars=120, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.002, bars)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.001, bars))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.001, bars))
+    index = pd.date_range('2024-01-01', periods=bars, freq='min', tz='UTC')
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close,
+                         'Volume': rng.uniform(1, 100, bars)}, index=index)
+
+
+def test_engine_matches_pandas_ta():
+    df = ohlcv()
+    kdj = ta.kdj(df['High'], df['Low'], df['Close'], length=KDJ_LENGTH, signal=KDJ_SIGNAL)
+    macd = ta.macd(df['Close'], fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL)
+    kdj_suffix = f"{KDJ_LENGTH}_{KDJ_SIGNAL}"
+    macd_suffix = f"{MACD_FAST}_{MACD_SLOW}_{MACD_SIGNAL}"
+    expected = {
+        'ema1': ta.ema(df['Close'], length=EMA1_LENGTH),
+        'ema2': ta.ema(df['Close'], length=EMA2_LENGTH),
+        'rsi': ta.rsi(df['Close'], length=RSI_LENGTH),
+        'k': kdj[f'K_{kdj_suffix}'],
+        'd': kdj[f'D_{kdj_suffix}'],
+        'j': kdj[f'J_{kdj_suffix}'],
+        'macd': macd[f'MACD_{macd_suffix}'],
+        'macd_signal': macd[f'MACDs_{macd_suffix}'],
+        'macd_hist': macd[f'MACDh_{macd_suffix}'],
+        'obv': (np.sign(df['Close'].diff().fillna(0)) * df['Volume']).cumsum(),
+    }
+
+    actual = IndicatorEngine().warmup(df)
+
+    for col, values in expected.items():
+        np.testing.assert_allclose(actual[col].to_numpy(float), values.to_numpy(float),
+                                   rtol=1e-9, atol=1e-12, equal_nan=True, err_msg=col)
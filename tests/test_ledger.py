@@ -0,0 +1,45 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from ledger import AccountLedger  # noqa: E402
+
+
+class RacingExchange:
+    """fetch_balance() returns the pre-fill balances while a fill lands during the first calls."""
+
+    def __init__(self, races):
+        self.ledger = None
+        self.races = races
+        self.calls = 0
+
+    def fetch_balance(self):
+        self.calls += 1
+        if self.ledger is not None and self.calls <= self.races:
+            self.ledger.apply_fill('BTC/USDT', 'buy', {'filled': 1.0, 'cost': 100.0})
+            return {'BTC': {'free': 0.0}, 'USDT': {'free': 1000.0}}
+        return {'BTC': {'free': self.ledger.balances['BTC']}, 'USDT': {'free': self.ledger.balances['USDT']}}
+
+
+def make_ledger(races):
+    exchange = RacingExchange(races)
+    ledger = AccountLedger(exchange)
+    ledger.balances = {'BTC': 0.0, 'USDT': 1000.0}
+    ledger.synced_at = 0.0
+    exchange.ledger = ledger
+    return ledger
+
+
+def test_reconcile_refetches_when_a_fill_races_the_fetch():
+    ledger = make_ledger(races=1)
+    assert ledger.reconcile()
+    assert ledger.balances == {'BTC': 1.0, 'USDT': 900.0}
+    assert ledger.synced_at > 0
+
+
+def test_reconcile_keeps_local_fills_when_every_fetch_races():
+    ledger = make_ledger(races=3)
+    assert not ledger.reconcile(attempts=3)
+    assert ledger.balances == {'BTC': 3.0, 'USDT': 700.0}
+    assert ledger.due()
@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from markets import MarketCache  # noqa: E402
+
+
+class CountingExchange:
+    id = 'binance'
+
+    def __init__(self):
+        self.loads = 0
+
+    def load_markets(self, reload=False):
+        self.loads += 1
+        return {'BTC/USDT': {'precision': {'amount': 4}, 'limits': {'amount': {'min': 0.0001}}}}
+
+
+def test_unknown_symbol_reloads_once_per_ttl_and_names_the_symbol():
+    exchange = CountingExchange()
+    cache = MarketCache(exchange, ttl=3600)
+    assert cache.get('BTC/USDT').min_amount == 0.0001
+    for _ in range(3):
+        with pytest.raises(ValueError, match='FOO/USDT'):
+            cache.get('FOO/USDT')
+    assert exchange.loads == 2
+    assert cache.get('BTC/USDT').symbol == 'BTC/USDT'
+    assert exchange.loads == 2
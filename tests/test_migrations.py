@@ -0,0 +1,56 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from migrations import SCHEMA_VERSION, TRADES_COLUMNS, migrate  # noqa: E402
+
+# trades as the bot created it before the schema was versioned, without the
+# columns added later (order_id, strategy, ts)
+BASELINE_COLUMNS = [(name, kind) for name, kind in TRADES_COLUMNS if name not in ('order_id', 'strategy', 'ts')]
+
+
+def baseline_db():
+    conn = sqlite3.connect(':memory:')
+    columns = ', '.join(f"{name} {kind}" for name, kind in BASELINE_COLUMNS)
+    conn.execute(f"CREATE TABLE trades (id INTEGER PRIMARY KEY AUTOINCREMENT, {columns})")
+    conn.execute("CREATE INDEX idx_trades_time ON trades(time)")
+    conn.executemany(
+        "INSERT INTO trades (time, action, symbol, price, profit, timeframe) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            ('2024-01-02 03:04:05', 'buy', 'BTC/USDT', 42000.0, 0.0, '1m'),
+            ('2024-01-02 03:09:05', 'sell', 'BTC/USDT', 42100.0, 100.0, '1m'),
+        ],
+    )
+    conn.commit()
+    return conn
+
+
+def test_baseline_database_is_migrated_once():
+    conn = baseline_db()
+    assert migrate(conn) == 0
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(trades)")]
+    assert columns == ['id'] + [name for name, _ in TRADES_COLUMNS]
+    assert conn.execute("SELECT action, ts FROM trades ORDER BY id").fetchall() == [
+        ('buy', 1704164645000), ('sell', 1704164945000),
+    ]
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'trades'")}
+    assert 'idx_trades_time' not in indexes
+    assert {'idx_trades_ts', 'idx_trades_action_ts', 'idx_trades_timeframe_action_ts', 'idx_trades_strategy_action'} <= indexes
+
+    changes = conn.total_changes
+    schema = conn.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall()
+    assert migrate(conn) == SCHEMA_VERSION
+    assert conn.total_changes == changes
+    assert conn.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall() == schema
+
+
+def test_new_database_gets_the_current_schema():
+    conn = sqlite3.connect(':memory:')
+    assert migrate(conn) == 0
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM telemetry").fetchone()[0] == 0
@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import resilience  # noqa: E402
+from resilience import CircuitBreaker, retry_call  # noqa: E402
+
+
+class FloodControl(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Flood control exceeded. Retry in {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+def test_unexpected_exception_counts_against_the_breaker():
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_seconds=60)
+
+    def broken():
+        raise KeyError('price')
+
+    with pytest.raises(KeyError):
+        retry_call(broken, breaker=breaker, retry_on=(ConnectionError,))
+    assert breaker.state == 'open'
+
+
+def test_retry_waits_at_least_retry_after(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(resilience.time, 'sleep', sleeps.append)
+    calls = []
+
+    def flooded():
+        calls.append(1)
+        if len(calls) == 1:
+            raise FloodControl(7)
+        return 'sent'
+
+    assert retry_call(flooded, attempts=2, base_delay=0.1, retry_on=(FloodControl,)) == 'sent'
+    assert sleeps and sleeps[0] >= 7
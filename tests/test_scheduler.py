@@ -0,0 +1,148 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import resilience  # noqa: E402
+from scheduler import PRIORITY_ACCOUNT, PRIORITY_DATA, PRIORITY_ORDER, RequestScheduler  # noqa: E402
+
+ccxt = pytest.importorskip('ccxt')
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers():
+    resilience.breakers.clear()
+    yield
+    resilience.breakers.clear()
+
+
+class FakeExchange:
+    """Records calls; fetch_ohlcv blocks until `release` is set."""
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.last_response_headers = {}
+        self.error = None
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        self.calls.append(('fetch_ohlcv', symbol))
+        self.started.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return [[0, 1.0, 2.0, 0.5, 1.5, 10.0]]
+
+    def create_market_buy_order(self, symbol, amount):
+        self.calls.append(('create_market_buy_order', symbol))
+        self.started.set()
+        self.release.wait(5)
+        return {'id': str(len(self.calls))}
+
+
+def in_thread(func, *args, **kwargs):
+    result = {}
+
+    def run():
+        try:
+            result['value'] = func(*args, **kwargs)
+        except Exception as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, result
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_waiting_requests_are_admitted_by_priority():
+    # 10 weight per second, no reserve, budget empty
+    scheduler = RequestScheduler(weight_per_minute=600, order_reserve=0)
+    scheduler.budget.tokens = 0
+    admitted = []
+
+    def acquire(priority):
+        scheduler.acquire(1, priority)
+        admitted.append(priority)
+
+    threads = [in_thread(acquire, PRIORITY_DATA)[0]]
+    assert wait_for(lambda: len(scheduler.waiting) == 1)
+    threads.append(in_thread(acquire, PRIORITY_ACCOUNT)[0])
+    threads.append(in_thread(acquire, PRIORITY_ORDER)[0])
+    assert wait_for(lambda: len(scheduler.waiting) + len(admitted) == 3)
+    for thread in threads:
+        thread.join(5)
+    # The data request waited longest but is admitted last
+    assert admitted == [PRIORITY_ORDER, PRIORITY_ACCOUNT, PRIORITY_DATA]
+
+
+def test_orders_may_use_the_reserve_that_data_requests_leave():
+    # 1 weight per second, 30 of 60 reserved for orders
+    scheduler = RequestScheduler(weight_per_minute=60, order_reserve=0.5)
+    scheduler.budget.tokens = 30
+    start = time.monotonic()
+    scheduler.acquire(1, PRIORITY_ORDER)
+    assert time.monotonic() - start < 0.1
+    thread, _ = in_thread(scheduler.acquire, 1, PRIORITY_DATA)
+    thread.join(0.3)
+    assert thread.is_alive()
+    assert scheduler.requests == 1
+
+
+def test_identical_data_requests_in_flight_are_coalesced():
+    scheduler = RequestScheduler()
+    exchange = FakeExchange()
+    first, first_result = in_thread(scheduler.call, exchange, 'fetch_ohlcv', 'BTC/USDT', '1m', limit=5)
+    assert exchange.started.wait(5)
+    second, second_result = in_thread(scheduler.call, exchange, 'fetch_ohlcv', 'BTC/USDT', '1m', limit=5)
+    assert wait_for(lambda: scheduler.coalesced == 1)
+    exchange.release.set()
+    first.join(5)
+    second.join(5)
+    assert exchange.calls == [('fetch_ohlcv', 'BTC/USDT')]
+    assert first_result['value'] == second_result['value'] == [[0, 1.0, 2.0, 0.5, 1.5, 10.0]]
+    assert scheduler.inflight == {}
+
+
+def test_orders_are_never_coalesced():
+    scheduler = RequestScheduler()
+    exchange = FakeExchange()
+    exchange.release.set()
+    threads = [in_thread(scheduler.call, exchange, 'create_market_buy_order', 'BTC/USDT', 0.001)[0] for _ in range(2)]
+    for thread in threads:
+        thread.join(5)
+    assert exchange.calls == [('create_market_buy_order', 'BTC/USDT')] * 2
+    assert scheduler.coalesced == 0
+
+
+def test_rate_limit_error_pauses_for_retry_after():
+    scheduler = RequestScheduler()
+    exchange = FakeExchange()
+    exchange.release.set()
+    exchange.error = ccxt.DDoSProtection('429 Too Many Requests')
+    exchange.last_response_headers = {'Retry-After': '2'}
+    with pytest.raises(ccxt.DDoSProtection):
+        scheduler.call(exchange, 'fetch_ohlcv', 'BTC/USDT', '1m', limit=5)
+    assert 1.5 < scheduler.blocked_until - time.monotonic() <= 2
+    thread, _ = in_thread(scheduler.acquire, 1, PRIORITY_ORDER)
+    thread.join(0.3)
+    assert thread.is_alive()
+    thread.join(5)
+    assert not thread.is_alive()
+
+
+def test_used_weight_header_shrinks_the_budget():
+    scheduler = RequestScheduler(weight_per_minute=1200)
+    scheduler.observe({'x-mbx-used-weight-1m': '1000'})
+    assert scheduler.budget.tokens <= 201
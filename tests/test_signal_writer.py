@@ -0,0 +1,88 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from signal_writer import SignalWriter  # noqa: E402
+
+
+class RecordingStore:
+    """write_batch that records batches and can be held back to simulate a slow commit."""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def write_batch(self, signals):
+        self.release.wait(5)
+        self.batches.append([signal['n'] for signal in signals])
+
+    @property
+    def rows(self):
+        return [n for batch in self.batches for n in batch]
+
+
+def signal(n, action='hold'):
+    return {'n': n, 'action': action, 'time': f"2024-01-01 00:00:{n:02d}"}
+
+
+def test_durable_action_returns_only_after_its_commit():
+    store = RecordingStore()
+    writer = SignalWriter(store.write_batch, batch_size=100, flush_seconds=10)
+    writer.start()
+    store.release.clear()
+    done = threading.Event()
+    thread = threading.Thread(target=lambda: (writer.submit(signal(1, 'buy')), done.set()))
+    thread.start()
+    assert not done.wait(0.2)
+    assert store.rows == []
+    store.release.set()
+    assert done.wait(5)
+    assert store.rows == [1]
+    writer.stop()
+
+
+def test_holds_are_committed_in_batches():
+    store = RecordingStore()
+    writer = SignalWriter(store.write_batch, batch_size=5, flush_seconds=10)
+    writer.start()
+    for n in range(12):
+        writer.submit(signal(n))
+    deadline = time.time() + 5
+    while len(store.rows) < 10 and time.time() < deadline:
+        time.sleep(0.01)
+    assert store.batches[:2] == [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9]]
+    assert writer.flush(5)
+    assert store.rows == list(range(12))
+    assert writer.status()['batches'] == 3
+    writer.stop()
+
+
+def test_hold_batch_is_written_after_flush_seconds():
+    store = RecordingStore()
+    writer = SignalWriter(store.write_batch, batch_size=100, flush_seconds=0.1)
+    writer.start()
+    writer.submit(signal(1))
+    writer.submit(signal(2))
+    assert store.rows == []
+    deadline = time.time() + 5
+    while not store.rows and time.time() < deadline:
+        time.sleep(0.01)
+    assert store.batches == [[1, 2]]
+    writer.stop()
+
+
+def test_stop_drains_the_queue_and_later_signals_are_written_synchronously():
+    store = RecordingStore()
+    writer = SignalWriter(store.write_batch, batch_size=100, flush_seconds=60)
+    writer.start()
+    for n in range(7):
+        writer.submit(signal(n))
+    writer.stop(5)
+    assert not writer.running
+    assert store.rows == list(range(7))
+    writer.submit(signal(7))
+    assert store.rows == list(range(8))
@@ -0,0 +1,65 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from indicators import IndicatorEngine  # noqa: E402
+from migrations import migrate  # noqa: E402
+from telemetry import (  # noqa: E402
+    INSERT_TELEMETRY_SQL, SIGNAL_COLUMNS, TELEMETRY_COLUMNS, supertrend_value, telemetry_row,
+)
+
+
+def live_hold_signal(bars=120, seed=0):
+    """A hold signal shaped like create_signal's, from IndicatorEngine output."""
+    rng = np.random.default_rng(seed)
+    engine = IndicatorEngine()
+    price = 100.0
+    for _ in range(bars):
+        price *= 1 + rng.normal(0, 0.01)
+        latest = engine.update(price * 0.999, price * 1.002, price * 0.997, price, float(rng.uniform(1, 10)))
+    signal = {col: latest[col] for col in SIGNAL_COLUMNS}
+    signal['supertrend_trend'] = str(latest['supertrend_trend'])
+    signal.update({
+        'time': '2024-01-02 03:04:05', 'ts': 1704164645123, 'action': 'hold', 'symbol': 'BTC/USDT',
+        'timeframe': '1m', 'price': price, 'open_price': price * 0.999, 'close_price': price,
+        'volume': 5.0, 'percent_change': 0.1, 'candle_ts': 1704164580000,
+    })
+    return signal
+
+
+def test_live_hold_signal_round_trips():
+    conn = sqlite3.connect(':memory:')
+    migrate(conn)
+    for seed in range(4):
+        signal = live_hold_signal(seed=seed)
+        assert signal['supertrend_trend'] in ('Up', 'Down')
+        conn.execute(INSERT_TELEMETRY_SQL, telemetry_row(signal))
+        row = conn.execute(f"SELECT ts, symbol, timeframe, {', '.join(TELEMETRY_COLUMNS)} FROM telemetry ORDER BY rowid DESC LIMIT 1").fetchone()
+        assert row[:3] == (signal['ts'], 'BTC/USDT', '1m')
+        stored = dict(zip(TELEMETRY_COLUMNS, row[3:]))
+        assert stored['supertrend_trend'] == (1.0 if signal['supertrend_trend'] == 'Up' else 0.0)
+        for col in TELEMETRY_COLUMNS:
+            if col != 'supertrend_trend':
+                assert stored[col] == float(signal[col])
+
+
+def test_migrated_rows_match_live_encoding():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE trades (id INTEGER PRIMARY KEY AUTOINCREMENT, time TEXT, action TEXT, symbol TEXT, supertrend_trend TEXT, timeframe TEXT, strategy TEXT)")
+    legacy = ['Up', 'Down', 1, 0, -1, '1.0', 'None', None]
+    conn.executemany(
+        "INSERT INTO trades (time, action, symbol, supertrend_trend, timeframe, strategy) VALUES ('2024-01-02 03:04:05', 'hold', 'BTC/USDT', ?, '1m', 'primary')",
+        [(trend,) for trend in legacy],
+    )
+    conn.execute("INSERT INTO trades (time, action, symbol, supertrend_trend, timeframe, strategy) VALUES ('2024-01-02 03:04:05', 'hold', 'BTC/USDT', 'Up', '1m', 'initial')")
+    conn.commit()
+    migrate(conn)
+    rows = conn.execute("SELECT ts, supertrend_trend FROM telemetry ORDER BY rowid").fetchall()
+    # Same ts as a live signal made at that time, same trend encoding as telemetry_row
+    assert [ts for ts, _ in rows] == [1704164645000] * len(legacy)
+    assert [trend for _, trend in rows] == [supertrend_value(trend) for trend in legacy]
+    assert conn.execute("SELECT strategy FROM trades").fetchall() == [('initial',)]
@@ -0,0 +1,212 @@
+# trade_bars.py
+# Bars built from individual trades instead of exchange time candles.
+#
+# TradeBarBuilder takes trades (epoch ms, price, amount) one by one from a
+# stream or in NumPy batches from a recorded file, and closes a bar every:
+#   time    N milliseconds, aligned on epoch multiples like exchange candles
+#   tick    N trades
+#   volume  N units of the base asset
+#   dollar  N units of the quote asset (price * amount)
+# Activity bars sit on a fixed grid of the running trade count / volume /
+# value: a trade belongs to the bar in which it starts, and the bar closes on
+# the trade that reaches the next multiple of N, so a trade larger than N
+# yields one bar rather than several. Batches are grouped with NumPy
+# reduceat; no pandas is involved until frame() is asked for.
+#
+# Completed bars are ccxt-style [ts, open, high, low, close, volume] rows, ts
+# being the bar's first trade (the bucket start for time bars), so they go
+# through IndicatorEngine.update, CandleBuffer and ai_decision like exchange
+# candles; they are also kept in growable arrays for frame(). Several
+# activity bars can open in the same millisecond and share a ts.
+#
+# Usage: python trade_bars.py trades.csv --kind dollar --threshold 1000000 [--out bars.csv]
+import argparse
+import csv
+import logging
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from indicators import OHLCV_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+BAR_KINDS = ('time', 'tick', 'volume', 'dollar')
+
+
+class TradeBarBuilder:
+    def __init__(self, kind, threshold, capacity=1024):
+        if kind not in BAR_KINDS:
+            raise ValueError(f"Unknown bar kind {kind}, expected one of {', '.join(BAR_KINDS)}")
+        if threshold <= 0:
+            raise ValueError("Bar threshold must be positive")
+        self.kind = kind
+        self.threshold = int(threshold) if kind in ('time', 'tick') else float(threshold)
+        # Running trade count / volume / value before the next trade
+        self.cumulative = 0.0
+        # Open bar: [key, ts, open, high, low, close, volume, trades]
+        self.bar = None
+        self.count = 0
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.ohlcv = np.zeros((capacity, 5), dtype=np.float64)
+        self.trades = np.zeros(capacity, dtype=np.int64)
+
+    @property
+    def label(self):
+        threshold = self.threshold
+        return f"{self.kind}:{int(threshold) if float(threshold).is_integer() else threshold}"
+
+    def _store(self, bar):
+        if self.count == len(self.timestamps):
+            size = 2 * len(self.timestamps)
+            self.timestamps = np.resize(self.timestamps, size)
+            self.ohlcv = np.resize(self.ohlcv, (size, 5))
+            self.trades = np.resize(self.trades, size)
+        self.timestamps[self.count] = bar[1]
+        self.ohlcv[self.count] = bar[2:7]
+        self.trades[self.count] = bar[7]
+        self.count += 1
+        return [int(bar[1])] + [float(value) for value in bar[2:7]]
+
+    def add_trade(self, ts, price, amount):
+        """Add one trade; returns the bars it completes. Same bars as add_trades(), without NumPy overhead."""
+        ts, price, amount = int(ts), float(price), float(amount)
+        end = None
+        if self.kind == 'time':
+            key = ts // self.threshold
+        else:
+            measure = 1.0 if self.kind == 'tick' else amount if self.kind == 'volume' else price * amount
+            key = math.floor(self.cumulative / self.threshold)
+            self.cumulative += measure
+            end = math.floor(self.cumulative / self.threshold)
+        done = []
+        bar = self.bar
+        if bar is not None and bar[0] == key:
+            bar[3] = max(bar[3], price)
+            bar[4] = min(bar[4], price)
+            bar[5] = price
+            bar[6] += amount
+            bar[7] += 1
+        else:
+            if bar is not None:
+                done.append(self._store(bar))
+            self.bar = [key, key * self.threshold if self.kind == 'time' else ts, price, price, price, price, amount, 1]
+        if end is not None and end > key:
+            done.append(self._store(self.bar))
+            self.bar = None
+        return done
+
+    def add_trades(self, timestamps, prices, amounts):
+        """Add trades in time order; returns the completed bars as ccxt rows."""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        amounts = np.asarray(amounts, dtype=np.float64)
+        if not len(timestamps):
+            return []
+        if self.kind == 'time':
+            keys = timestamps // self.threshold
+            ends = None
+        else:
+            measure = np.ones(len(prices)) if self.kind == 'tick' else amounts if self.kind == 'volume' else prices * amounts
+            cumulative = np.cumsum(np.concatenate(([self.cumulative], measure)))
+            self.cumulative = cumulative[-1]
+            # Same division for where a trade starts and ends, so the two never disagree on a boundary
+            grid = np.floor(cumulative / self.threshold).astype(np.int64)
+            keys = grid[:-1]
+            ends = grid[1:]
+
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+        stops = np.append(starts[1:], len(keys))
+        highs = np.maximum.reduceat(prices, starts)
+        lows = np.minimum.reduceat(prices, starts)
+        volumes = np.add.reduceat(amounts, starts)
+        done = []
+        for group, (start, stop) in enumerate(zip(starts, stops)):
+            key = int(keys[start])
+            bar_ts = key * self.threshold if self.kind == 'time' else int(timestamps[start])
+            if self.bar is not None and self.bar[0] == key:
+                bar = self.bar
+                bar[3] = max(bar[3], highs[group])
+                bar[4] = min(bar[4], lows[group])
+                bar[5] = prices[stop - 1]
+                bar[6] += volumes[group]
+                bar[7] += stop - start
+            else:
+                if self.bar is not None:
+                    done.append(self._store(self.bar))
+                self.bar = [key, bar_ts, prices[start], highs[group], lows[group], prices[stop - 1], volumes[group], stop - start]
+            if ends is not None and ends[stop - 1] > key:
+                done.append(self._store(self.bar))
+                self.bar = None
+        return done
+
+    def flush(self, now_ms=None):
+        """Close the open time bar once `now_ms` is past its end; returns it as a list of rows."""
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        if self.kind == 'time' and self.bar is not None and now_ms >= (self.bar[0] + 1) * self.threshold:
+            bar, self.bar = self.bar, None
+            return [self._store(bar)]
+        return []
+
+    def bars(self, start=0):
+        """Completed bars from index `start` as ccxt rows."""
+        return [[int(ts)] + row for ts, row in zip(self.timestamps[start:self.count], self.ohlcv[start:self.count].tolist())]
+
+    def frame(self, tz='UTC'):
+        """Completed bars as an Open/High/Low/Close/Volume frame, as IndicatorEngine.warmup expects."""
+        index = pd.to_datetime(self.timestamps[:self.count], unit='ms').tz_localize('UTC').tz_convert(tz)
+        frame = pd.DataFrame(self.ohlcv[:self.count].copy(), columns=OHLCV_COLUMNS, index=index)
+        frame['trades'] = self.trades[:self.count]
+        return frame
+
+
+def parse_bar_spec(spec):
+    """'dollar:1000000' -> ('dollar', 1000000.0)."""
+    kind, _, threshold = spec.partition(':')
+    return kind.strip(), float(threshold)
+
+
+def load_trades_csv(path):
+    """(timestamps, prices, amounts) arrays from a recorded trades CSV.
+
+    Accepts timestamp,price,amount rows, and Binance's public aggTrades dumps
+    (agg id, price, quantity, first id, last id, timestamp, buyer maker, ...).
+    """
+    timestamps, prices, amounts = [], [], []
+    with open(path, newline='') as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip().isdigit():
+                continue
+            if len(row) >= 7:
+                ts, price, amount = row[5], row[1], row[2]
+            else:
+                ts, price, amount = row[0], row[1], row[2]
+            ts = int(ts)
+            # Newer dumps are in microseconds
+            timestamps.append(ts // 1000 if ts > 10 ** 14 else ts)
+            prices.append(float(price))
+            amounts.append(float(amount))
+    return np.array(timestamps, dtype=np.int64), np.array(prices, dtype=np.float64), np.array(amounts, dtype=np.float64)
+
+
+if __name__ == "__main__":
+    from feeds import save_candles_csv
+
+    parser = argparse.ArgumentParser(description="Build time, tick, volume or dollar bars from recorded trades")
+    parser.add_argument('path', help="trades CSV (timestamp,price,amount or a Binance aggTrades dump)")
+    parser.add_argument('--kind', choices=BAR_KINDS, default='dollar')
+    parser.add_argument('--threshold', type=float, required=True, help="ms for time bars, trades, base or quote amount per bar")
+    parser.add_argument('--out', help="write the bars as a candle CSV that feeds.py can replay")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    timestamps, prices, amounts = load_trades_csv(args.path)
+    builder = TradeBarBuilder(args.kind, args.threshold)
+    start_time = time.time()
+    builder.add_trades(timestamps, prices, amounts)
+    logger.info(f"{len(timestamps)} trades -> {builder.count} {builder.label} bars in {time.time() - start_time:.3f}s")
+    if args.out:
+        save_candles_csv(args.out, builder.bars())
+        logger.info(f"Bars written to {args.out}")